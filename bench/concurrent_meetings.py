@@ -0,0 +1,76 @@
+"""
+Runs N simulated meetings concurrently against a local fake Gemini server and
+compares the wall-clock time with a single meeting.
+
+    python -m bench.concurrent_meetings --meetings 10 --latency 0.5
+
+With the async transport, N meetings should finish in roughly the time of one.
+Pass --blocking to replay the old synchronous call path for comparison.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from bench.fake_gemini import FakeGeminiServer
+
+TURNS_PER_MEETING = 16  # 3 rounds x 5 speakers + Chairman summary
+
+
+async def blocking_generate(client, persona_instruction, history, user_input):
+    # Old behaviour: the sync SDK call runs directly on the event loop
+    from google.genai import types
+    response = client.client.models.generate_content(
+        model=client.model_name,
+        contents=f"{client._build_context(history)}\n\n{user_input}",
+        config=types.GenerateContentConfig(system_instruction=persona_instruction)
+    )
+    return response.text
+
+
+async def run_meeting(client, meeting_no, turns, blocking):
+    history = []
+    for turn in range(turns):
+        prompt = f"Toplantı {meeting_no}, tur {turn}: görüşünü bildir."
+        if blocking:
+            text = await blocking_generate(client, "Sen bir yönetim kurulu üyesisin.", history, prompt)
+        else:
+            text = await client.generate_response("Sen bir yönetim kurulu üyesisin.", history, prompt)
+        history.append({"bot_name": f"Bot{turn % 5}", "content": text})
+
+
+async def timed(client, meetings, turns, blocking):
+    start = time.perf_counter()
+    await asyncio.gather(*(run_meeting(client, i, turns, blocking) for i in range(meetings)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--meetings', type=int, default=10)
+    parser.add_argument('--turns', type=int, default=TURNS_PER_MEETING)
+    parser.add_argument('--latency', type=float, default=0.5, help="Fake Gemini latency per call (seconds)")
+    parser.add_argument('--blocking', action='store_true', help="Use the old blocking generate_content call")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(latency=args.latency).start()
+    os.environ["GEMINI_BASE_URL"] = server.base_url
+    os.environ.setdefault("GOOGLE_API_KEY", "fake-key")
+
+    from src.ai_engine import GeminiClient
+    client = GeminiClient()
+
+    try:
+        single = await timed(client, 1, args.turns, args.blocking)
+        many = await timed(client, args.meetings, args.turns, args.blocking)
+    finally:
+        server.stop()
+
+    mode = "blocking" if args.blocking else "async"
+    print(f"mode={mode} latency={args.latency}s turns/meeting={args.turns}")
+    print(f"1 meeting:  {single:.2f}s")
+    print(f"{args.meetings} meetings: {many:.2f}s  (ratio {many / single:.2f}x, requests served {server.request_count})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Kills a meeting mid-round (as a crash would: buffered rows are lost and no
+cleanup runs) and checks that a fresh orchestrator resumes it from the last
+persisted checkpoint: every speaker talks exactly once per round, the summary
+is written and only turns lost with the write buffer are generated again.
+
+    python -m bench.crash_resume
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from collections import Counter
+
+from bench.fakes import FakeBotManager, FakeLLMClient, use_sqlite
+
+CHAT_ID = 1
+CRASH_AFTER_TURNS = 7  # round 2, after its second speaker
+FLUSH_BATCH_SIZE = 3   # the opening + 5 turns are written in two batches, turns 6-7 are still buffered
+
+
+async def _dead(*args, **kwargs):
+    pass
+
+
+async def crash_mid_meeting(orchestrator_module):
+    from src.persistence import MessageWriter
+
+    orchestrator = orchestrator_module.Orchestrator(FakeBotManager(), FakeLLMClient(latency=0.01))
+    orchestrator.writer = MessageWriter(flush_interval=60, batch_size=FLUSH_BATCH_SIZE)
+    loop_task = await orchestrator.start_new_meeting(CHAT_ID, "Yeni ürün fikri", 0)
+    meeting_id = orchestrator.active_meetings[CHAT_ID]['meeting_id']
+    transcript = orchestrator.active_meetings[CHAT_ID]['transcript']
+
+    # Opening message + CRASH_AFTER_TURNS delivered turns; the next generation may already be under way
+    while len(transcript) < CRASH_AFTER_TURNS + 1:
+        await asyncio.sleep(0)
+
+    # The process dies: buffered rows and checkpoints are gone and nothing else reaches the database.
+    # The tasks still have to be stopped, but their cleanup (flush, status update) must not write.
+    writer = orchestrator.writer
+    if writer._flusher:
+        writer._flusher.cancel()
+    writer._buffers.clear()
+    writer._meeting_updates.clear()
+    for name in ("add_message", "checkpoint", "update_meeting", "flush", "close"):
+        setattr(writer, name, _dead)
+    loop_task.cancel()
+    await asyncio.gather(loop_task, return_exceptions=True)
+    return meeting_id, len(transcript) - 1
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    use_sqlite(os.path.join(tempfile.gettempdir(), "board_bench_crash_resume.db"))
+    os.environ["PACING_PRESET"] = "zero"
+
+    import src.orchestrator as orchestrator_module
+    from sqlalchemy import select
+    from src.db import AsyncSessionLocal, engine, init_db
+    from src.models import Meeting, Message
+
+    await init_db()
+
+    meeting_id, turns_before = await crash_mid_meeting(orchestrator_module)
+    async with AsyncSessionLocal() as session:
+        persisted_turns = len((await session.execute(
+            select(Message.id).where(Message.meeting_id == meeting_id, Message.round_number.in_((1, 2, 3)))
+        )).all())
+
+    # "Restart": a new process with empty in-memory state
+    llm = FakeLLMClient(latency=0)
+    orchestrator = orchestrator_module.Orchestrator(FakeBotManager(), llm)
+    resumed = await orchestrator.resume_meetings()
+    await asyncio.gather(*resumed)
+    await orchestrator.shutdown()
+
+    async with AsyncSessionLocal() as session:
+        meeting = await session.get(Meeting, meeting_id)
+        messages = (await session.execute(
+            select(Message).where(Message.meeting_id == meeting_id).order_by(Message.id)
+        )).scalars().all()
+    await engine.dispose()
+
+    turns = Counter((m.round_number, m.bot_name) for m in messages if m.round_number in (1, 2, 3))
+    expected_turns = {(r, p) for r in (1, 2, 3) for p in orchestrator.turn_order}
+    total_turns = len(expected_turns)
+    checks = {
+        "one resumed meeting": len(resumed) == 1,
+        "every turn played exactly once": set(turns) == expected_turns and set(turns.values()) == {1},
+        "summary written": any(m.round_number == 99 for m in messages),
+        "meeting completed": meeting.status == "completed",
+        "buffered turns were lost": persisted_turns < turns_before,
+        # Unpersisted turns plus the summary; persisted turns are never generated again
+        "only lost turns generated again": llm.calls == total_turns - persisted_turns + 1,
+    }
+
+    print(f"Crashed after {turns_before} turns ({persisted_turns} persisted), resumed with {llm.calls} more generations")
+    for name, ok in checks.items():
+        print(f"  {'OK  ' if ok else 'FAIL'} {name}")
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,115 @@
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGeminiServer:
+    """
+    Minimal stand-in for the Gemini REST API (generateContent, streamGenerateContent and cachedContents).
+    Every request sleeps for `latency` seconds before answering, like a slow completion would.
+    Point GeminiClient at it with GEMINI_BASE_URL=server.base_url.
+    """
+
+    def __init__(self, latency=0.5, host='127.0.0.1', port=0, stream_interval=0.05):
+        self.latency = latency
+        self.stream_interval = stream_interval
+        self.request_count = 0
+        self.cached_contents = {}  # name -> request body
+        self._cache_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                with server._lock:
+                    server.request_count += 1
+
+                if self.path.split('?')[0].endswith('/cachedContents'):
+                    name = f"cachedContents/fake-{next(server._cache_ids)}"
+                    server.cached_contents[name] = body
+                    self._send_json({"name": name, "model": "fake"})
+                    return
+
+                match = re.search(r'/models/([^:/]+):(\w+)', self.path)
+                method = match.group(2) if match else ''
+                if method not in ('generateContent', 'streamGenerateContent'):
+                    self.send_error(404)
+                    return
+
+                time.sleep(server.latency)
+                prompt_chars = len(body)
+                cached_chars = 0
+                cache_match = re.search(rb'"cachedContent"\s*:\s*"([^"]+)"', body)
+                if cache_match:
+                    cached_chars = len(server.cached_contents.get(cache_match.group(1).decode(), b''))
+                    prompt_chars += cached_chars
+                payload = {
+                    "candidates": [{
+                        "content": {"role": "model", "parts": [{"text": "Bence bu fikir uygulanabilir ama riskli."}]},
+                        "finishReason": "STOP"
+                    }],
+                    "usageMetadata": {
+                        "promptTokenCount": prompt_chars // 4,
+                        "cachedContentTokenCount": cached_chars // 4,
+                        "candidatesTokenCount": 12,
+                        "totalTokenCount": prompt_chars // 4 + 12
+                    }
+                }
+                if method == 'streamGenerateContent':
+                    self._send_stream(payload)
+                else:
+                    self._send_json(payload)
+
+            def do_DELETE(self):
+                name = self.path.split('?')[0].split('/v1beta/')[-1]
+                server.cached_contents.pop(name, None)
+                self._send_json({})
+
+            def _send_json(self, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, payload):
+                # Server-sent events, one word per chunk; usage metadata rides on the last chunk
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                text = payload["candidates"][0]["content"]["parts"][0]["text"]
+                words = text.split(" ")
+                for i, word in enumerate(words):
+                    chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": word + ("" if i == len(words) - 1 else " ")}]}}]}
+                    if i == len(words) - 1:
+                        chunk["usageMetadata"] = payload["usageMetadata"]
+                    self.wfile.write(b"data: " + json.dumps(chunk).encode('utf-8') + b"\n\n")
+                    self.wfile.flush()
+                    time.sleep(server.stream_interval)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
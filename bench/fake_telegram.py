@@ -0,0 +1,126 @@
+import asyncio
+import itertools
+import json
+import time
+
+import aiohttp
+from aiohttp import web
+
+
+class FakeTelegramServer:
+    """
+    Local stand-in for the Telegram Bot API, enough for BotManager:
+    getMe, sendMessage, editMessageText, sendChatAction, setWebhook,
+    deleteWebhook and getUpdates. Every call waits `latency` seconds.
+
+    Point the bots at it with TELEGRAM_API_BASE_URL=server.base_url.
+    post_update() delivers an update to a registered webhook, like Telegram would.
+    """
+
+    def __init__(self, latency=0.0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.calls = []      # (method, token)
+        self.messages = []   # sent messages as dicts
+        self.webhooks = {}   # token -> (url, secret)
+        self._message_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self._runner = None
+        self._session = None
+
+        self.app = web.Application()
+        self.app.router.add_route('*', '/bot{token}/{method}', self.handle)
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._session:
+            await self._session.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def handle(self, request):
+        token = request.match_info['token']
+        method = request.match_info['method']
+        params = dict(await request.post()) if request.can_read_body else {}
+        if not params and request.content_type == 'application/json':
+            params = await request.json()
+        self.calls.append((method, token))
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        handler = getattr(self, f"_api_{method}", None)
+        if handler is None:
+            return web.json_response({"ok": False, "error_code": 404, "description": "Not Found: method not found"})
+        return web.json_response({"ok": True, "result": handler(token, params)})
+
+    def _bot_user(self, token):
+        bot_id = int(token.split(':')[0]) if token.split(':')[0].isdigit() else abs(hash(token)) % 10 ** 9
+        return {"id": bot_id, "is_bot": True, "first_name": f"Bot{bot_id}", "username": f"bot{bot_id}_bot"}
+
+    def _api_getMe(self, token, params):
+        return self._bot_user(token)
+
+    def _api_sendMessage(self, token, params):
+        chat_id = int(params['chat_id'])
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "group" if chat_id < 0 else "private", "title": "Board"},
+            "from": self._bot_user(token),
+            "text": params.get('text', ''),
+        }
+        self.messages.append({**message, "token": token, "reply_to_message_id": params.get('reply_to_message_id')})
+        return message
+
+    def _api_editMessageText(self, token, params):
+        return True
+
+    def _api_sendChatAction(self, token, params):
+        return True
+
+    def _api_setWebhook(self, token, params):
+        self.webhooks[token] = (params.get('url'), params.get('secret_token'))
+        return True
+
+    def _api_deleteWebhook(self, token, params):
+        self.webhooks.pop(token, None)
+        return True
+
+    def _api_getUpdates(self, token, params):
+        return []
+
+    def _api_close(self, token, params):
+        return True
+
+    async def post_update(self, token, chat_id, text, user_id=1000):
+        """Delivers a text message update to the bot's webhook. Returns the HTTP status."""
+        url, secret = self.webhooks[token]
+        update = {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "group" if chat_id < 0 else "private", "title": "Board"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Tester"},
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}] if text.startswith('/') else [],
+            },
+        }
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+        async with self._session.post(url, data=json.dumps(update), headers={**headers, "Content-Type": "application/json"}) as response:
+            return response.status
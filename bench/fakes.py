@@ -0,0 +1,63 @@
+import asyncio
+import json
+import os
+import time
+
+PERSONAS_FILE = os.path.join(os.path.dirname(__file__), '..', 'src', 'personas.json')
+
+
+class FakeSentMessage:
+    def __init__(self, message_id):
+        self.message_id = message_id
+
+
+class FakeBot:
+    async def send_chat_action(self, chat_id, action):
+        return True
+
+
+class FakeApplication:
+    def __init__(self):
+        self.bot = FakeBot()
+
+
+class FakeBotManager:
+    """In-process stand-in for BotManager that records every message instead of calling Telegram."""
+
+    def __init__(self, personas_file=PERSONAS_FILE):
+        with open(personas_file, 'r', encoding='utf-8') as f:
+            self.bot_info = json.load(f)
+        self.apps = {key: FakeApplication() for key in self.bot_info}
+        self.sent = []  # (timestamp, bot_key, chat_id, text)
+        self._next_id = 1
+
+    async def send_message(self, bot_key, chat_id, text, reply_to_message_id=None):
+        self.sent.append((time.perf_counter(), bot_key, chat_id, text))
+        self._next_id += 1
+        return FakeSentMessage(self._next_id)
+
+    async def send_chat_action(self, bot_key, chat_id, action="typing"):
+        return True
+
+    def get_bot_app(self, bot_key):
+        return self.apps.get(bot_key)
+
+
+class FakeLLMClient:
+    """Stand-in for GeminiClient that answers after a fixed latency."""
+
+    def __init__(self, latency=1.0):
+        self.latency = latency
+        self.calls = 0
+
+    async def generate_response(self, persona_instruction, history, user_input, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return f"Görüşüm (geçmişte {len(history)} mesaj var)."
+
+
+def use_sqlite(path):
+    """Points src.db at a fresh SQLite file. Must run before any src module is imported."""
+    if os.path.exists(path):
+        os.remove(path)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
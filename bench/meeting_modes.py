@@ -0,0 +1,66 @@
+"""
+End-to-end timing of one meeting per execution mode (sequential, parallel, pipelined)
+with an in-process fake Telegram and a fake LLM of fixed latency, on SQLite.
+
+    pip install aiosqlite
+    python -m bench.meeting_modes --latency 2 --pacing realistic
+
+--pacing picks the delays between messages (realistic, fast or zero, see src.pacing).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from bench.fakes import FakeBotManager, FakeLLMClient, use_sqlite
+from src.pacing import PacingPolicy
+
+MODES = ("sequential", "parallel", "pipelined")
+
+
+async def run_mode(mode, latency, pacing):
+    import src.orchestrator as orchestrator_module
+
+    bot_manager = FakeBotManager()
+    llm = FakeLLMClient(latency=latency)
+    orchestrator = orchestrator_module.Orchestrator(bot_manager, llm)
+    orchestrator.execution_mode = mode
+    orchestrator.pacing = PacingPolicy.preset(pacing)
+
+    chat_id = 1
+    start = time.perf_counter()
+    await orchestrator.start_new_meeting(chat_id, "Mobil uygulama geliştirmeli miyiz?", 0)
+    while chat_id in orchestrator.active_meetings:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    board_messages = [sent for sent in bot_manager.sent if sent[1] != "Chairman"]
+    first_opinion = board_messages[0][0] - start if board_messages else float('nan')
+    return elapsed, first_opinion, llm.calls
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=2.0, help="Fake LLM latency per call (seconds)")
+    parser.add_argument('--pacing', default="realistic", choices=PacingPolicy.PRESETS, help="Pacing preset")
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    use_sqlite(os.path.join(tempfile.gettempdir(), "board_bench_modes.db"))
+    from src.db import engine, init_db
+    await init_db()
+
+    print(f"latency={args.latency}s pacing={args.pacing}")
+    for mode in args.modes:
+        elapsed, first_opinion, calls = await run_mode(mode, args.latency, args.pacing)
+        print(f"{mode:<11} total {elapsed:7.2f}s  first opinion after {first_opinion:6.2f}s  llm calls {calls}")
+
+    # Pooled aiosqlite connections run on threads that keep the process alive
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Counts database commits and statements for one full meeting, write-through
+(one commit per message, the old behaviour) versus write-behind batching.
+
+    pip install aiosqlite
+    python -m bench.persistence
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from bench.fakes import FakeBotManager, FakeLLMClient, use_sqlite
+
+
+async def run_meeting(batch_size, counters):
+    import src.orchestrator as orchestrator_module
+    from src.persistence import MessageWriter
+
+    orchestrator = orchestrator_module.Orchestrator(FakeBotManager(), FakeLLMClient(latency=0))
+    orchestrator.writer = MessageWriter(flush_interval=2.0, batch_size=batch_size)
+
+    counters.update(commits=0, statements=0)
+    chat_id = 1
+    start = time.perf_counter()
+    await orchestrator.start_new_meeting(chat_id, "Yeni ürün fikri", 0)
+    while chat_id in orchestrator.active_meetings:
+        await asyncio.sleep(0.005)
+    await orchestrator.shutdown()
+    return dict(counters), time.perf_counter() - start
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    use_sqlite(os.path.join(tempfile.gettempdir(), "board_bench_persistence.db"))
+    os.environ["PACING_PRESET"] = "zero"
+
+    from sqlalchemy import event
+    from src.db import engine, init_db
+    await init_db()
+
+    counters = {}
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def on_commit(conn):
+        counters["commits"] += 1
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def on_statement(conn, cursor, statement, parameters, context, executemany):
+        counters["statements"] += 1
+
+    for label, batch_size in (("write-through (before)", 1), ("write-behind (after)", 50)):
+        result, elapsed = await run_meeting(batch_size, counters)
+        print(f"{label:<24} commits/meeting {result['commits']:3d}  statements {result['statements']:3d}  ({elapsed:.2f}s)")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,217 @@
+"""
+End-to-end load test of the meeting pipeline: N chats each run a full meeting
+(start_new_meeting -> run_meeting_loop -> summarize_meeting) at the same time,
+with the stub LLM backend and a fake Telegram, on SQLite or a local Postgres.
+
+    python -m bench.pipeline --chats 1 10 100 500 --latency lognormal:0.8:0.4
+    python -m bench.pipeline --chats 50 --telegram http --json results.json
+    python -m bench.pipeline --database-url postgresql+asyncpg://localhost/board_bench
+
+Reports, per chat count:
+  - meetings per minute (completed meetings / wall-clock time)
+  - turn latency p50/p95/p99: time from the previous message in a chat to each
+    board member's reply and to the summary, as a user in the chat sees it
+  - event-loop lag p50/p99/max: how late a 50 ms ticker wakes up
+  - DB round-trips per turn (statements sent to the database)
+  - peak memory (tracemalloc peak with --trace-memory, else process max RSS,
+    which only grows, so run chat counts in ascending order)
+
+--telegram inproc records messages in memory; --telegram http sends them through
+BotManager to a local fake Bot API server. --pacing picks the delays between
+messages (zero by default, realistic for production-like timings). Use a scratch database: meetings are
+written to it like in production.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+from bench.fakes import FakeBotManager, use_sqlite
+from bench.webhook_roundtrip import TOKENS
+from src.pacing import PacingPolicy
+
+LAG_INTERVAL = 0.05
+CHAIRMAN_NOTICES = ("🔔", "📢", "⏳")  # meeting opening, round announcements, busy notice
+
+
+def is_summary(bot_key, text):
+    return bot_key == "Chairman" and not text.startswith(CHAIRMAN_NOTICES)
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def measure_loop_lag(samples):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(time.perf_counter() - start - LAG_INTERVAL)
+
+
+def record_sends(bot_manager, sent):
+    """Wraps send_message so every delivered message is timestamped per chat."""
+    send_message = bot_manager.send_message
+
+    async def timed_send(bot_key, chat_id, text, reply_to_message_id=None):
+        result = await send_message(bot_key, chat_id, text, reply_to_message_id=reply_to_message_id)
+        sent[chat_id].append((time.perf_counter(), bot_key, text))
+        return result
+
+    bot_manager.send_message = timed_send
+
+
+def turn_latencies(sent, board):
+    latencies = []
+    for messages in sent.values():
+        for (prev_at, _, _), (at, bot_key, text) in zip(messages, messages[1:]):
+            if bot_key in board or is_summary(bot_key, text):
+                latencies.append(at - prev_at)
+    return latencies
+
+
+async def run(chats, args, telegram, db_counter):
+    import src.orchestrator as orchestrator_module
+    from src.llm import StubLLMClient
+
+    if telegram is None:
+        bot_manager = FakeBotManager()
+    else:
+        from src.bot_manager import BotManager
+        bot_manager = BotManager()
+        await bot_manager.initialize_bots()
+
+    sent = defaultdict(list)
+    record_sends(bot_manager, sent)
+    llm = StubLLMClient(latency=args.latency, tokens_per_second=args.tokens_per_sec,
+                        rate_limit_rate=args.rate_limit, seed=args.seed)
+    orchestrator = orchestrator_module.Orchestrator(bot_manager, llm)
+    orchestrator.execution_mode = args.mode
+    orchestrator.pacing = PacingPolicy.preset(args.pacing)
+
+    lag_samples = []
+    lag_task = asyncio.create_task(measure_loop_lag(lag_samples))
+    if args.trace_memory:
+        tracemalloc.start()
+    db_counter[0] = 0
+
+    start = time.perf_counter()
+    loops = await asyncio.gather(*(
+        orchestrator.start_new_meeting(chat_id, f"Fikir #{chat_id}: abonelikli ürün", 0)
+        for chat_id in range(1, chats + 1)
+    ))
+    await asyncio.gather(*(loop for loop in loops if loop is not None))
+    # The summary may still be writing when the loop returns
+    while orchestrator.active_meetings:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    await orchestrator.shutdown()
+    lag_task.cancel()
+    peak_memory = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    if args.trace_memory:
+        tracemalloc.stop()
+    if telegram is not None:
+        await bot_manager.stop()
+
+    latencies = turn_latencies(sent, set(orchestrator.turn_order))
+    completed = sum(1 for messages in sent.values() if any(is_summary(bot_key, text) for _, bot_key, text in messages))
+    return {
+        "chats": chats,
+        "completed": completed,
+        "seconds": round(elapsed, 3),
+        "meetings_per_min": round(completed / elapsed * 60, 2),
+        "turns": len(latencies),
+        "turn_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "turn_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "turn_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "loop_lag_p50_ms": round(percentile(lag_samples, 50) * 1000, 2),
+        "loop_lag_p99_ms": round(percentile(lag_samples, 99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lag_samples, default=0) * 1000, 2),
+        "db_roundtrips_per_turn": round(db_counter[0] / max(1, len(latencies)), 2),
+        "llm_calls": llm.calls,
+        "peak_traced_mb": round(peak_memory / 2 ** 20, 1) if peak_memory is not None else None,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chats', type=int, nargs='+', default=[1, 10, 100], help="Concurrent chats per run (1-500)")
+    parser.add_argument('--latency', default="lognormal:0.8:0.4", help="Stub LLM latency spec (see src.llm.parse_latency)")
+    parser.add_argument('--tokens-per-sec', type=float, default=0, help="Stub LLM streaming speed (0 = instant)")
+    parser.add_argument('--rate-limit', type=float, default=0, help="Share of LLM calls answered with a 429")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--pacing', default="zero", choices=PacingPolicy.PRESETS, help="Pacing preset")
+    parser.add_argument('--mode', default="sequential", choices=("sequential", "parallel", "pipelined"))
+    parser.add_argument('--telegram', default="inproc", choices=("inproc", "http"))
+    parser.add_argument('--database-url', help="Scratch database (default: a temporary SQLite file)")
+    parser.add_argument('--trace-memory', action='store_true', help="Measure peak Python allocations with tracemalloc (slower)")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+    if any(not 1 <= chats <= 500 for chats in args.chats):
+        parser.error("--chats must be between 1 and 500")
+
+    logging.disable(logging.WARNING)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        use_sqlite(os.path.join(tempfile.gettempdir(), "board_bench_pipeline.db"))
+    # Writer defaults as in production; only the in-memory meeting state makes sense in one process
+    os.environ["MEETING_STATE_BACKEND"] = "memory"
+
+    telegram = None
+    if args.telegram == "http":
+        from bench.fake_telegram import FakeTelegramServer
+        telegram = await FakeTelegramServer().start()
+        os.environ.update(TOKENS)
+        os.environ["TELEGRAM_API_BASE_URL"] = telegram.base_url
+
+    from sqlalchemy import event
+    from src.db import engine, init_db
+    await init_db()
+
+    db_counter = [0]
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*_):
+        db_counter[0] += 1
+
+    print(f"latency={args.latency} mode={args.mode} telegram={args.telegram} db={engine.dialect.name} "
+          f"pacing={args.pacing}")
+    print(f"{'chats':>5} {'mtg/min':>8} {'turn p50/p95/p99 ms':>22} {'lag p50/p99/max ms':>21} {'db/turn':>7} {'mem MB':>7}")
+    results = []
+    for chats in args.chats:
+        result = await run(chats, args, telegram, db_counter)
+        results.append(result)
+        memory = result["peak_traced_mb"] if args.trace_memory else result["max_rss_mb"]
+        print(f"{chats:>5} {result['meetings_per_min']:>8.1f} "
+              f"{result['turn_p50_ms']:>8.0f}/{result['turn_p95_ms']:.0f}/{result['turn_p99_ms']:.0f} "
+              f"{result['loop_lag_p50_ms']:>9.1f}/{result['loop_lag_p99_ms']:.1f}/{result['loop_lag_max_ms']:.1f} "
+              f"{result['db_roundtrips_per_turn']:>7.2f} {memory:>7.1f}")
+        if result["completed"] != chats:
+            print(f"      only {result['completed']}/{chats} meetings completed", file=sys.stderr)
+
+    if telegram is not None:
+        await telegram.stop()
+    # Pooled aiosqlite connections run on threads that keep the process alive
+    await engine.dispose()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    return all(result["completed"] == result["chats"] for result in results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,114 @@
+"""
+Measures cold-start time against a local fake Telegram API (every call takes
+--latency seconds) and a SQLite database:
+
+- bots: BotManager construction, initialization and polling start for the
+  previous sequential startup, concurrent eager startup and lazy send-only bots,
+  plus the first message of a lazily initialized bot
+- schema: migrations on an empty database, then a boot against a current schema
+  with and without the up-to-date check
+
+    python -m bench.startup --latency 0.1
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from bench.fake_telegram import FakeTelegramServer
+from bench.fakes import use_sqlite
+from bench.webhook_roundtrip import TOKENS
+
+
+async def sequential_start(bot_manager):
+    """The startup before concurrent initialization: one handshake after another."""
+    for app in bot_manager.bots.values():
+        await app.initialize()
+    bot_manager._initialized.update(bot_manager.bots)
+    for key, app in bot_manager.bots.items():
+        if bot_manager.is_listening(key):
+            await app.start()
+            if app.updater:
+                await app.updater.start_polling(allowed_updates=["message", "callback_query"])
+
+
+async def concurrent_start(bot_manager):
+    await bot_manager.initialize_bots()
+    await bot_manager.start_polling()
+
+
+async def measure_bots(label, lazy, start, telegram):
+    from src.bot_manager import BotManager
+
+    os.environ["TELEGRAM_LAZY_BOTS"] = "1" if lazy else "0"
+    began = time.perf_counter()
+    bot_manager = BotManager()
+    built = time.perf_counter()
+    await start(bot_manager)
+    ready = time.perf_counter()
+
+    calls_before = len(telegram.calls)
+    await bot_manager.send_message("CTO", -100, "ilk mesaj")
+    first_send = time.perf_counter() - ready
+    handshakes = sum(1 for method, _ in telegram.calls[calls_before:] if method == "getMe")
+
+    await bot_manager.stop()
+    print(f"{label:<26} build {(built - began) * 1000:6.1f} ms  ready {(ready - began) * 1000:7.1f} ms  "
+          f"first CTO message {first_send * 1000:6.1f} ms ({handshakes} getMe)")
+
+
+async def measure_schema(path):
+    from alembic import command
+    from src import db
+
+    async def timed(label, fn):
+        began = time.perf_counter()
+        await fn()
+        print(f"{label:<26} {(time.perf_counter() - began) * 1000:7.1f} ms")
+
+    async def full_upgrade():
+        def upgrade(connection):
+            config = db._alembic_config(connection)
+            connection.commit()
+            command.upgrade(config, "head")
+
+        async with db.engine.connect() as conn:
+            await conn.run_sync(upgrade)
+
+    await timed("migrate empty database", db.init_db)
+    await timed("boot, upgrade run", full_upgrade)
+    await timed("boot, schema check", db.init_db)
+    await db.engine.dispose()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds every fake Telegram API call takes")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)  # also the fake server's errors for polls cut off at stop
+    path = os.path.join(tempfile.gettempdir(), "board_bench_startup.db")
+    use_sqlite(path)
+
+    telegram = await FakeTelegramServer(latency=args.latency).start()
+    os.environ.update(TOKENS)
+    os.environ.update({
+        "TELEGRAM_API_BASE_URL": telegram.base_url,
+        "TELEGRAM_UPDATE_MODE": "polling",
+        "TELEGRAM_LISTEN_BOTS": "Chairman",
+        "TELEGRAM_CHAT_RATE": "1000",
+    })
+
+    print(f"fake Telegram latency {args.latency * 1000:.0f} ms per call, {len(TOKENS)} bots")
+    await measure_bots("sequential (before)", False, sequential_start, telegram)
+    await measure_bots("concurrent, eager", False, concurrent_start, telegram)
+    await measure_bots("concurrent, lazy", True, concurrent_start, telegram)
+    await telegram.stop()
+
+    await measure_schema(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
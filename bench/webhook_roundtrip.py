@@ -0,0 +1,82 @@
+"""
+Starts BotManager in webhook mode against a local fake Telegram server, posts
+/start commands to the Chairman's webhook and measures update -> reply latency.
+Also checks that send-only bots never call getUpdates.
+
+    python -m bench.webhook_roundtrip --updates 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from bench.fake_telegram import FakeTelegramServer
+
+TOKENS = {
+    "TOKEN_CHAIRMAN": "1001:chairman",
+    "TOKEN_CTO": "1002:cto",
+    "TOKEN_CFO": "1003:cfo",
+    "TOKEN_GROWTH": "1004:growth",
+    "TOKEN_PRODUCT": "1005:product",
+    "TOKEN_DEVIL": "1006:devil",
+}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=50)
+    parser.add_argument('--port', type=int, default=18080, help="Local webhook port")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    telegram = await FakeTelegramServer().start()
+    os.environ.update(TOKENS)
+    os.environ.update({
+        "TELEGRAM_API_BASE_URL": telegram.base_url,
+        "TELEGRAM_UPDATE_MODE": "webhook",
+        "TELEGRAM_LISTEN_BOTS": "Chairman",
+        "WEBHOOK_URL": f"http://127.0.0.1:{args.port}",
+        "WEBHOOK_LISTEN_HOST": "127.0.0.1",
+        "WEBHOOK_PORT": str(args.port),
+        "WEBHOOK_SECRET": "bench-secret",
+    })
+
+    from telegram.ext import CommandHandler
+    from src.bot_manager import BotManager
+
+    bot_manager = BotManager()
+    await bot_manager.initialize_bots()
+
+    replies = {}
+
+    async def start_command(update, context):
+        await update.message.reply_text("pong")
+        replies[update.update_id] = time.perf_counter()
+
+    bot_manager.get_bot_app("Chairman").add_handler(CommandHandler("start", start_command))
+    await bot_manager.start_webhook()
+
+    chairman_token = TOKENS["TOKEN_CHAIRMAN"]
+    latencies = []
+    for i in range(args.updates):
+        sent_at = time.perf_counter()
+        status = await telegram.post_update(chairman_token, chat_id=-100, text="/start")
+        update_id = i + 1
+        while update_id not in replies:
+            await asyncio.sleep(0.001)
+        latencies.append(replies[update_id] - sent_at)
+        assert status == 200, status
+
+    latencies.sort()
+    polled = sorted({token for method, token in telegram.calls if method == "getUpdates"})
+    print(f"webhook updates: {len(latencies)}  p50 {latencies[len(latencies) // 2] * 1000:.1f} ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+    print(f"bots with getUpdates calls: {polled or 'none'}")
+
+    await bot_manager.stop()
+    await telegram.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
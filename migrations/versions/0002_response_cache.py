@@ -0,0 +1,32 @@
+"""Response cache table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases bootstrapped with create_all may already have it
+    if sa.inspect(op.get_bind()).has_table('response_cache'):
+        return
+    op.create_table(
+        'response_cache',
+        sa.Column('key', sa.String(64), primary_key=True),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table('response_cache')
@@ -0,0 +1,43 @@
+"""Archive tables for finished meetings
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'meetings_archive',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('topic', sa.String(), nullable=False),
+        sa.Column('status', sa.String()),
+        sa.Column('created_at', sa.DateTime(timezone=True)),
+        sa.Column('is_processed', sa.Boolean()),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_meetings_archive_created_at', 'meetings_archive', ['created_at'])
+    op.create_table(
+        'messages_archive',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('meeting_id', sa.Integer(), nullable=False),
+        sa.Column('bot_name', sa.String(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('round_number', sa.Integer()),
+        sa.Column('telegram_message_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True)),
+    )
+    op.create_index('ix_messages_archive_meeting_id_id', 'messages_archive', ['meeting_id', 'id'])
+
+
+def downgrade():
+    op.drop_table('messages_archive')
+    op.drop_table('meetings_archive')
@@ -0,0 +1,32 @@
+"""Meeting progress checkpoint columns
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('meetings') as batch:
+        batch.add_column(sa.Column('chat_id', sa.BigInteger(), nullable=True))
+        batch.add_column(sa.Column('current_round', sa.Integer(), nullable=True))
+        batch.add_column(sa.Column('next_speaker_index', sa.Integer(), nullable=True))
+        batch.add_column(sa.Column('reply_to_message_id', sa.Integer(), nullable=True))
+    # Meetings left active by earlier versions have no chat to resume in
+    op.execute("UPDATE meetings SET status = 'interrupted' WHERE status = 'active'")
+
+
+def downgrade():
+    with op.batch_alter_table('meetings') as batch:
+        batch.drop_column('reply_to_message_id')
+        batch.drop_column('next_speaker_index')
+        batch.drop_column('current_round')
+        batch.drop_column('chat_id')
@@ -0,0 +1,37 @@
+"""Full-text search indexes on message content (PostgreSQL only)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+# Expression indexes; src/search.py must query with the same to_tsvector(...) expression
+INDEXES = [
+    ('ix_messages_content_fts', 'messages'),
+    ('ix_messages_archive_content_fts', 'messages_archive'),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return  # SQLite falls back to LIKE scans
+    with op.get_context().autocommit_block():
+        for name, table in INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} "
+                f"USING gin (to_tsvector('turkish', content))"
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
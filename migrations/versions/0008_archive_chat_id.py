@@ -0,0 +1,29 @@
+"""Chat id on archived meetings, chat lookups for /ara
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('meetings_archive') as batch:
+        batch.add_column(sa.Column('chat_id', sa.BigInteger(), nullable=True))
+    # Search results are limited to the requesting chat's meetings
+    op.create_index('ix_meetings_chat_id', 'meetings', ['chat_id'])
+    op.create_index('ix_meetings_archive_chat_id', 'meetings_archive', ['chat_id'])
+
+
+def downgrade():
+    op.drop_index('ix_meetings_archive_chat_id', table_name='meetings_archive')
+    op.drop_index('ix_meetings_chat_id', table_name='meetings')
+    with op.batch_alter_table('meetings_archive') as batch:
+        batch.drop_column('chat_id')
@@ -1,87 +1,631 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
 import os
+import random
+import re
 import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 import logging
 
+from src.ratelimit import TokenBucket
+from src import metrics
+
 load_dotenv()
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Request priorities (lower value is served first)
+PRIORITY_SUMMARY = 0  # Chairman closing summary
+PRIORITY_TURN = 1     # Regular debate turn
+PRIORITY_INTRO = 2    # /tanis introductions
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for TPM budgeting."""
+    return max(1, len(text) // 4)
+
+
+def format_prompt(context_text: str, user_input: str) -> str:
+    """The per-turn prompt every backend sends: meeting history, then the current task."""
+    return f"""
+--- TOPLANTI GEÇMİŞİ ---
+{context_text}
+
+--- ŞİMDİKİ GÖREV ---
+{user_input}
+"""
+
+
+class RequestScheduler:
+    """
+    Shared gate in front of every Gemini call.
+
+    - RPM and TPM budgets are enforced with token buckets.
+    - Waiting requests are served by priority, and within a priority in
+      per-chat fair order (start-time fair queueing), so one busy chat
+      cannot starve the others.
+    - A 429 pauses the whole scheduler instead of every caller retrying
+      on its own, which avoids synchronized retry storms.
+    """
+
+    def __init__(self, rpm=0, tpm=0, base_backoff=25, max_backoff=120):
+        self.request_bucket = TokenBucket(rpm, rpm / 60)
+        self.token_bucket = TokenBucket(tpm, tpm / 60)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._queue = []  # heap of (priority, fair_tag, seq, tokens, chat_id, future)
+        self._seq = itertools.count()
+        self._chat_tags = {}  # chat_id -> last assigned fair tag
+        self._virtual_time = 0
+        self._paused_until = 0.0
+        self._wakeup = None
+        self._dispatcher = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            rpm=int(os.getenv("GEMINI_RPM", "0")),
+            tpm=int(os.getenv("GEMINI_TPM", "0")),
+            base_backoff=float(os.getenv("GEMINI_BACKOFF_BASE", "25")),
+            max_backoff=float(os.getenv("GEMINI_BACKOFF_MAX", "120")),
+        )
+
+    @property
+    def queue_depth(self):
+        return sum(1 for entry in self._queue if not entry[-1].done())
+
+    async def acquire(self, chat_id=None, priority=PRIORITY_TURN, tokens=1):
+        """Waits until the request may be sent according to priority, fairness and budgets."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        fair_tag = max(self._virtual_time, self._chat_tags.get(chat_id, 0)) + 1
+        self._chat_tags[chat_id] = fair_tag
+        heapq.heappush(self._queue, (priority, fair_tag, next(self._seq), tokens, chat_id, future))
+
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        await future
+
+    def record_usage(self, reserved_tokens, actual_tokens):
+        """Corrects the TPM bucket once the real token count of a call is known."""
+        if actual_tokens is None:
+            return
+        if actual_tokens > reserved_tokens:
+            self.token_bucket.consume(actual_tokens - reserved_tokens)
+        else:
+            self.token_bucket.refund(reserved_tokens - actual_tokens)
+
+    def backoff_delay(self, attempt, retry_hint=None):
+        """Jittered exponential backoff. A server retry hint wins over the computed delay."""
+        if retry_hint is not None:
+            return retry_hint + random.uniform(0, 1)
+        delay = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def pause(self, seconds):
+        """Holds back every queued request for `seconds` (used after a 429)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def _dispatch(self):
+        while self._queue:
+            priority, fair_tag, _, tokens, chat_id, future = self._queue[0]
+            if future.done():
+                # Caller went away (cancelled) while waiting
+                heapq.heappop(self._queue)
+                continue
+
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self.request_bucket.delay_for(1),
+                self.token_bucket.delay_for(tokens),
+            )
+            if wait > 0:
+                # Sleep, but wake up early if a more urgent request arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._queue)
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(tokens)
+            self._virtual_time = fair_tag
+            if self._chat_tags.get(chat_id, 0) <= self._virtual_time:
+                self._chat_tags.pop(chat_id, None)
+            future.set_result(None)
+
+
+class ContextBuilder:
+    """
+    Turns meeting history into the context block of a prompt within a token budget.
+
+    The full transcript is used as long as it fits. Otherwise earlier rounds are
+    replaced (oldest first) by short per-round digests, which are cached because a
+    finished round never changes. The latest round always stays verbatim; only if
+    it alone exceeds the budget are its oldest messages dropped.
+    """
+
+    def __init__(self, token_budget=6000, digest_chars=160, max_cached_digests=512):
+        self.token_budget = token_budget
+        self.digest_chars = digest_chars
+        self.max_cached_digests = max_cached_digests
+        self._digests = OrderedDict()  # digest key -> digest text (LRU)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            token_budget=int(os.getenv("GEMINI_CONTEXT_TOKEN_BUDGET", "6000")),
+            digest_chars=int(os.getenv("GEMINI_DIGEST_CHARS", "160")),
+        )
+
+    def build(self, history: list) -> str:
+        if not history:
+            return "(Henüz konuşma yok)"
+
+        # Group consecutive messages by round, keeping their order
+        groups = []
+        for msg in history:
+            round_number = msg.get('round_number')
+            if groups and groups[-1][0] == round_number:
+                groups[-1][1].append(msg)
+            else:
+                groups.append((round_number, [msg]))
+
+        blocks = [self._render(messages) for _, messages in groups]
+        sizes = [estimate_tokens(block) for block in blocks]
+
+        # Compress earlier rounds, oldest first, until the context fits
+        for i in range(len(groups) - 1):
+            if sum(sizes) <= self.token_budget:
+                break
+            round_number, messages = groups[i]
+            blocks[i] = self._digest(round_number, messages)
+            sizes[i] = estimate_tokens(blocks[i])
+
+        # Last resort: trim the oldest messages of the current round
+        if sum(sizes) > self.token_budget and self.token_budget > 0:
+            remaining = self.token_budget - sum(sizes[:-1])
+            current = groups[-1][1]
+            kept = []
+            for msg in reversed(current):
+                line = self._render([msg])
+                if kept and estimate_tokens(line) > remaining:
+                    break
+                kept.insert(0, line)
+                remaining -= estimate_tokens(line)
+            dropped = len(current) - len(kept)
+            blocks[-1] = "\n".join(([f"(... {dropped} mesaj kısaltıldı)"] if dropped else []) + kept)
+
+        return "\n".join(blocks)
+
+    def _render(self, messages) -> str:
+        return "\n".join(
+            f"[{msg.get('bot_name', 'Bilinmeyen')}]: {msg.get('content', '')}" for msg in messages
+        )
+
+    def _digest(self, round_number, messages) -> str:
+        """Extractive digest of a finished round: the first sentence of each message."""
+        key_source = f"{round_number}\x00" + "\x00".join(
+            f"{msg.get('bot_name')}\x01{msg.get('content')}" for msg in messages
+        )
+        key = hashlib.sha1(key_source.encode('utf-8')).hexdigest()
+        if key in self._digests:
+            self._digests.move_to_end(key)
+            return self._digests[key]
+
+        if round_number is None:
+            label = "Önceki konuşmalar"
+        elif round_number == 0:
+            label = "Açılış"
+        else:
+            label = f"Tur {round_number}"
+        lines = [f"({label} özeti)"]
+        for msg in messages:
+            content = " ".join(str(msg.get('content', '')).split())
+            first_sentence = re.split(r'(?<=[.!?])\s', content, maxsplit=1)[0]
+            if len(first_sentence) > self.digest_chars:
+                first_sentence = first_sentence[:self.digest_chars].rstrip() + "…"
+            lines.append(f"[{msg.get('bot_name', 'Bilinmeyen')}]: {first_sentence}")
+        digest = "\n".join(lines)
+
+        self._digests[key] = digest
+        if len(self._digests) > self.max_cached_digests:
+            self._digests.popitem(last=False)
+        return digest
+
+
+class PrefixRegistry:
+    """
+    Content-addressed registry of static prompt prefixes (persona system
+    instruction + company context) and the Gemini context caches created for them.
+
+    Entries are keyed by a hash of the prefix content, so a new persona text or
+    context version (see src.prompts) gets a new entry automatically, while
+    meetings still on the previous version keep using theirs until it expires.
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self.entries = {}  # key -> {'name': str | None, 'expires_at': float}
+        self._locks = {}
+
+    @staticmethod
+    def key_for(model, system_instruction, static_context):
+        content = f"{model}\x00{system_instruction}\x00{static_context}"
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry and entry['expires_at'] > time.monotonic():
+            return entry
+        return None
+
+    def lock(self, key):
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    def store(self, key, name):
+        # Refresh a minute before the server-side TTL runs out
+        self.entries[key] = {'name': name, 'expires_at': time.monotonic() + max(self.ttl - 60, 0)}
+
+    def mark_unsupported(self, key):
+        """Remembers that no remote cache can be used for this prefix (until the TTL passes)."""
+        self.entries[key] = {'name': None, 'expires_at': time.monotonic() + self.ttl}
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+
+
+class ResponseCache:
+    """
+    Cache of complete responses for deterministic prompts (e.g. /tanis introductions).
+
+    Keyed by a hash of (model, system instruction, static context, prompt). The
+    in-memory tier has TTL and LRU eviction; with `persist=True` entries are also
+    stored in the response_cache table so they survive restarts.
+    Debate turns never use it unless a call explicitly opts in.
+    """
+
+    def __init__(self, max_entries=256, ttl=86400, persist=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist = persist
+        self._entries = OrderedDict()  # key -> (expires_at, text)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+            ttl=int(os.getenv("RESPONSE_CACHE_TTL", "86400")),
+            persist=os.getenv("RESPONSE_CACHE_PERSIST", "0") == "1",
+        )
+
+    @staticmethod
+    def key_for(model, system_instruction, static_context, prompt):
+        content = f"{model}\x00{system_instruction}\x00{static_context}\x00{prompt}"
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry:
+            expires_at, text = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+            del self._entries[key]
+
+        if self.persist:
+            text, remaining = await self._load(key)
+            if text is not None:
+                self._remember(key, text, remaining)
+                self.hits += 1
+                return text
+
+        self.misses += 1
+        return None
+
+    async def set(self, key, model, text, ttl=None):
+        ttl = ttl or self.ttl
+        self._remember(key, text, ttl)
+        if self.persist:
+            await self._store(key, model, text, ttl)
+
+    def _remember(self, key, text, ttl):
+        self._entries[key] = (time.monotonic() + ttl, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _load(self, key):
+        # Imported lazily so the engine can run without a database (benchmarks, stubs)
+        from src.db import AsyncSessionLocal
+        from src.models import ResponseCacheEntry
+        try:
+            async with AsyncSessionLocal() as session:
+                row = await session.get(ResponseCacheEntry, key)
+                if row is None:
+                    return None, 0
+                expires_at = row.expires_at
+                if expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=timezone.utc)
+                remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+                if remaining <= 0:
+                    return None, 0
+                return row.response, remaining
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return None, 0
+
+    async def _store(self, key, model, text, ttl):
+        from src.db import AsyncSessionLocal
+        from src.models import ResponseCacheEntry
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.merge(ResponseCacheEntry(
+                    key=key,
+                    model=model,
+                    response=text,
+                    expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl),
+                ))
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"Response cache store failed: {e}")
+
+
+def _is_rate_limit_error(error) -> bool:
+    if getattr(error, 'code', None) == 429:
+        return True
+    error_str = str(error)
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+
+
+def _retry_hint(error):
+    """Extracts the server's suggested wait (RetryInfo.retryDelay or Retry-After), if any."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    retry_after = headers.get('Retry-After') if hasattr(headers, 'get') else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
 class GeminiClient:
-    def __init__(self):
+    def __init__(self, model_name=None):
         self.api_key = os.getenv("GOOGLE_API_KEY")
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY is missing in .env")
         
         # Gemini uses genai.Client() with API key
-        self.client = genai.Client(api_key=self.api_key)
-        # Gemini 3 Flash - latest and most capable model
-        self.model_name = "gemini-3-flash-preview"
+        # GEMINI_BASE_URL points the SDK at a different endpoint (e.g. a local fake server for benchmarks)
+        base_url = os.getenv("GEMINI_BASE_URL")
+        http_options = {'base_url': base_url} if base_url else None
+        self.client = genai.Client(api_key=self.api_key, http_options=http_options)
+        # Gemini 3 Flash - latest and most capable model (personas may pick another one)
+        self.model_name = model_name or os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
         self.max_retries = 5
-        self.retry_delay = 25  # 25 seconds for rate limit recovery
+        # Shared RPM/TPM budget, priorities and backoff for all calls of this process
+        self.scheduler = RequestScheduler.from_env()
+        # Token-budgeted history windowing
+        self.context_builder = ContextBuilder.from_env()
+        self.last_usage = {}
+        # Gemini context caching for static prefixes (persona instruction + company context)
+        self.prefix_cache_enabled = os.getenv("GEMINI_PREFIX_CACHE", "1") == "1"
+        self.prefix_cache_min_tokens = int(os.getenv("GEMINI_PREFIX_CACHE_MIN_TOKENS", "1024"))
+        self.prefix_registry = PrefixRegistry(ttl=int(os.getenv("GEMINI_PREFIX_CACHE_TTL", "3600")))
+        # Opt-in cache of complete responses for deterministic prompts
+        self.response_cache = ResponseCache.from_env()
 
-    async def generate_response(self, persona_instruction: str, history: list, user_input: str) -> str:
+    async def generate_response(self, persona_instruction: str, history: list, user_input: str,
+                                chat_id=None, priority=PRIORITY_TURN, static_context: str = "",
+                                cache=False, cache_ttl=None) -> str:
         """
         Generates a response from a specific AI persona using Gemini.
-        Includes retry logic for rate limit errors.
+        `static_context` is prompt text that is identical across turns (e.g. company info);
+        together with the persona instruction it forms a cacheable prefix.
+        With `cache=True` the complete response is served from / stored in the response
+        cache; a hit skips the scheduler and the API entirely.
+        Calls go through the shared scheduler; rate limit errors are retried with backoff.
         """
-        
-        # Build context from history
-        context_text = self._build_context(history)
-        
-        # Combine context + user input into contents
-        full_prompt = f"""
---- TOPLANTI GEÇMİŞİ ---
-{context_text}
+        full_prompt = self._build_prompt(history, user_input)
+
+        response_key = None
+        if cache:
+            response_key = ResponseCache.key_for(self.model_name, persona_instruction, static_context, full_prompt)
+            cached_text = await self.response_cache.get(response_key)
+            if cached_text is not None:
+                return cached_text
+
+        reserved_tokens = estimate_tokens(persona_instruction + static_context) + estimate_tokens(full_prompt)
+        prefix_key, cache_name = await self._resolve_prefix_cache(persona_instruction, static_context, chat_id, priority)
 
---- ŞİMDİKİ GÖREV ---
-{user_input}
-"""
-        
         for attempt in range(self.max_retries):
+            await self.scheduler.acquire(chat_id=chat_id, priority=priority, tokens=reserved_tokens)
             try:
-                # Gemini API format with system_instruction in config
-                response = self.client.models.generate_content(
+                contents, config = self._request_payload(persona_instruction, static_context, full_prompt, cache_name)
+                # Use the async surface (client.aio) so a slow completion never blocks the event loop
+                response = await self.client.aio.models.generate_content(
                     model=self.model_name,
-                    contents=full_prompt,
-                    config=types.GenerateContentConfig(
-                        system_instruction=persona_instruction
-                    )
+                    contents=contents,
+                    config=config
                 )
-                
+
+                usage = getattr(response, 'usage_metadata', None)
+                self.scheduler.record_usage(reserved_tokens, getattr(usage, 'total_token_count', None))
+                self._report_usage(chat_id, reserved_tokens, usage, retries=attempt)
+                if response_key and response.text:
+                    await self.response_cache.set(response_key, self.model_name, response.text, cache_ttl)
                 return response.text
             
             except Exception as e:
-                error_str = str(e)
-                
-                # Check if it's a rate limit error (429)
-                if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
-                    wait_time = self.retry_delay * (attempt + 1)  # Exponential backoff
-                    logger.warning(f"Rate limit hit. Waiting {wait_time}s before retry {attempt + 1}/{self.max_retries}")
-                    time.sleep(wait_time)
+                action = self._handle_error(e, attempt, cache_name, prefix_key)
+                if action == "retry_without_cache":
+                    cache_name = None
+                if action != "fail":
                     continue
-                else:
-                    logger.error(f"Gemini API Error: {e}")
-                    return "Beyinlerim yandı... (API Error)"
+                return "Beyinlerim yandı... (API Error)"
         
         logger.error("Max retries exceeded for Gemini API")
         return "Beyinlerim yandı... (Rate Limit)"
 
+    async def stream_response(self, persona_instruction: str, history: list, user_input: str,
+                              chat_id=None, priority=PRIORITY_TURN, static_context: str = ""):
+        """
+        Streaming variant of generate_response: an async generator yielding text chunks
+        as Gemini produces them. Retries only happen before the first chunk was yielded.
+        """
+        full_prompt = self._build_prompt(history, user_input)
+        reserved_tokens = estimate_tokens(persona_instruction + static_context) + estimate_tokens(full_prompt)
+        prefix_key, cache_name = await self._resolve_prefix_cache(persona_instruction, static_context, chat_id, priority)
+
+        for attempt in range(self.max_retries):
+            await self.scheduler.acquire(chat_id=chat_id, priority=priority, tokens=reserved_tokens)
+            emitted = False
+            try:
+                contents, config = self._request_payload(persona_instruction, static_context, full_prompt, cache_name)
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=self.model_name,
+                    contents=contents,
+                    config=config
+                )
+                usage = None
+                async for chunk in stream:
+                    usage = getattr(chunk, 'usage_metadata', None) or usage
+                    if chunk.text:
+                        emitted = True
+                        yield chunk.text
+
+                self.scheduler.record_usage(reserved_tokens, getattr(usage, 'total_token_count', None))
+                self._report_usage(chat_id, reserved_tokens, usage, retries=attempt)
+                return
+
+            except Exception as e:
+                if emitted:
+                    # Part of the answer is already on screen; keep it rather than starting over
+                    logger.error(f"Gemini stream interrupted: {e}")
+                    return
+                action = self._handle_error(e, attempt, cache_name, prefix_key)
+                if action == "retry_without_cache":
+                    cache_name = None
+                if action != "fail":
+                    continue
+                yield "Beyinlerim yandı... (API Error)"
+                return
+
+        logger.error("Max retries exceeded for Gemini API")
+        yield "Beyinlerim yandı... (Rate Limit)"
+
+    def _build_prompt(self, history, user_input):
+        # Combine context (from history) + user input into contents
+        return format_prompt(self._build_context(history), user_input)
+
+    def _request_payload(self, persona_instruction, static_context, full_prompt, cache_name):
+        """Returns (contents, config) for a call, with or without the cached prefix."""
+        if cache_name:
+            # Static prefix is served from the Gemini context cache
+            return full_prompt, types.GenerateContentConfig(cached_content=cache_name)
+        # Static part first so the prompt prefix stays identical across turns
+        contents = f"{static_context}\n{full_prompt}" if static_context else full_prompt
+        return contents, types.GenerateContentConfig(system_instruction=persona_instruction)
+
+    def _handle_error(self, error, attempt, cache_name, prefix_key):
+        """Decides what to do after a failed call: 'retry', 'retry_without_cache' or 'fail'."""
+        # Check if it's a rate limit error (429)
+        if _is_rate_limit_error(error):
+            wait_time = self.scheduler.backoff_delay(attempt, _retry_hint(error))
+            logger.warning(f"Rate limit hit. Waiting {wait_time:.1f}s before retry {attempt + 1}/{self.max_retries}")
+            # Pause the shared scheduler so queued calls don't hit the same 429
+            self.scheduler.pause(wait_time)
+            metrics.record_llm_retry(self.model_name, "rate_limit")
+            return "retry"
+        if cache_name and getattr(error, 'code', None) in (400, 403, 404):
+            # Cache expired or was deleted server-side; fall back to the full prompt
+            logger.warning(f"Prefix cache {cache_name} unusable ({error}), retrying without it")
+            self.prefix_registry.discard(prefix_key)
+            metrics.record_llm_retry(self.model_name, "cache")
+            return "retry_without_cache"
+        logger.error(f"Gemini API Error: {error}")
+        return "fail"
+
+    async def _resolve_prefix_cache(self, system_instruction, static_context, chat_id, priority):
+        """Returns (prefix_key, cache_name); cache_name is None when context caching is not used."""
+        if not self.prefix_cache_enabled:
+            return None, None
+
+        key = PrefixRegistry.key_for(self.model_name, system_instruction, static_context)
+        entry = self.prefix_registry.get(key)
+        if entry:
+            return key, entry['name']
+
+        prefix_tokens = estimate_tokens(system_instruction + static_context)
+        if prefix_tokens < self.prefix_cache_min_tokens:
+            # Gemini rejects caches below a minimum size; don't waste a call on it
+            self.prefix_registry.mark_unsupported(key)
+            return key, None
+
+        async with self.prefix_registry.lock(key):
+            entry = self.prefix_registry.get(key)
+            if entry:
+                return key, entry['name']
+            try:
+                await self.scheduler.acquire(chat_id=chat_id, priority=priority, tokens=prefix_tokens)
+                cache = await self.client.aio.caches.create(
+                    model=self.model_name,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_instruction,
+                        contents=[static_context] if static_context else None,
+                        ttl=f"{self.prefix_registry.ttl}s",
+                        display_name=f"board-prefix-{key[:12]}",
+                    )
+                )
+                self.prefix_registry.store(key, cache.name)
+                logger.info(f"Created Gemini context cache {cache.name} for prefix {key[:12]} (~{prefix_tokens} tokens)")
+                return key, cache.name
+            except Exception as e:
+                logger.warning(f"Context caching unavailable for prefix {key[:12]}: {e}")
+                self.prefix_registry.mark_unsupported(key)
+                return key, None
+
     def _build_context(self, history: list) -> str:
         """
-        Converts internal history list to a readable context string.
+        Converts internal history list to a readable context string within the token budget.
         """
-        if not history:
-            return "(Henüz konuşma yok)"
-        
-        context_lines = []
-        for msg in history:
-            bot_name = msg.get('bot_name', 'Bilinmeyen')
-            content = msg.get('content', '')
-            context_lines.append(f"[{bot_name}]: {content}")
-        
-        return "\n".join(context_lines)
+        return self.context_builder.build(history)
+
+    def _report_usage(self, chat_id, estimated_prompt_tokens, usage, retries=0):
+        """Logs prompt/response token counts of a call, keeps them in last_usage and exports them as metrics."""
+        self.last_usage = {
+            'chat_id': chat_id,
+            'estimated_prompt_tokens': estimated_prompt_tokens,
+            'prompt_tokens': getattr(usage, 'prompt_token_count', None),
+            'cached_tokens': getattr(usage, 'cached_content_token_count', None),
+            'response_tokens': getattr(usage, 'candidates_token_count', None),
+        }
+        logger.info(
+            f"Gemini call (chat {chat_id}): prompt_tokens={self.last_usage['prompt_tokens']} "
+            f"(estimated {estimated_prompt_tokens}, cached {self.last_usage['cached_tokens']}), "
+            f"response_tokens={self.last_usage['response_tokens']}"
+        )
+        metrics.record_llm_usage(self.model_name, self.last_usage['prompt_tokens'], self.last_usage['response_tokens'],
+                                 self.last_usage['cached_tokens'], retries)
@@ -0,0 +1,72 @@
+"""
+Moves finished meetings (and their messages) older than a cutoff into the
+*_archive tables, keeping the hot messages table and its indexes small.
+
+    python -m src.archive --days 90
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+
+from src.db import AsyncSessionLocal, engine
+from src.models import Meeting, MeetingArchive, Message, MessageArchive
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "stopped")
+MEETING_COLUMNS = ["id", "topic", "status", "created_at", "is_processed", "chat_id"]
+MESSAGE_COLUMNS = ["id", "meeting_id", "bot_name", "content", "round_number", "telegram_message_id", "created_at"]
+
+
+async def archive_meetings(older_than_days=90, batch_size=500):
+    """Archives finished meetings created more than `older_than_days` ago, one transaction per batch. Returns the meeting count."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            stmt = (
+                select(Meeting.id)
+                .where(Meeting.status.in_(FINISHED_STATUSES), Meeting.created_at < cutoff)
+                .order_by(Meeting.created_at)
+                .limit(batch_size)
+            )
+            meeting_ids = (await session.execute(stmt)).scalars().all()
+            if not meeting_ids:
+                break
+
+            await session.execute(insert(MeetingArchive).from_select(
+                MEETING_COLUMNS,
+                select(*[getattr(Meeting, c) for c in MEETING_COLUMNS]).where(Meeting.id.in_(meeting_ids)),
+            ))
+            await session.execute(insert(MessageArchive).from_select(
+                MESSAGE_COLUMNS,
+                select(*[getattr(Message, c) for c in MESSAGE_COLUMNS]).where(Message.meeting_id.in_(meeting_ids)),
+            ))
+            await session.execute(delete(Message).where(Message.meeting_id.in_(meeting_ids)))
+            await session.execute(delete(Meeting).where(Meeting.id.in_(meeting_ids)))
+            await session.commit()
+
+        archived += len(meeting_ids)
+        logger.info(f"Archived {archived} meeting(s) so far")
+    return archived
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Archive finished meetings older than N days.")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    try:
+        archived = await archive_meetings(args.days, args.batch_size)
+        print(f"{archived} toplantı arşivlendi.")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
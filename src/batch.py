@@ -0,0 +1,209 @@
+"""
+Runs board meetings headlessly for a list of topics (one per line; blank lines
+and lines starting with # are ignored), e.g. to evaluate product ideas overnight.
+
+    python -m src.batch topics.txt --concurrency 20 --output results.jsonl
+
+Meetings use the normal round configs and summary prompt with zero pacing,
+and messages go to a sink instead of Telegram. Each finished meeting is appended
+to the JSONL output right away. Topics already completed by an earlier batch run
+are skipped, so an interrupted run can simply be started again.
+
+Every meeting gets a chat id no earlier run used, so batch meetings never quote
+each other's decisions (past decisions are retrieved per chat).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select, update
+
+from src.db import AsyncSessionLocal, engine, init_db
+from src.llm import LLMRouter
+from src.meeting_state import InMemoryMeetingState
+from src.models import Meeting, MeetingArchive, Message
+from src.orchestrator import BATCH_CHAT_ID_BASE, Orchestrator
+from src.pacing import PacingPolicy
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+PERSONAS_FILE = os.path.join(os.path.dirname(__file__), 'personas.json')
+
+
+class SentMessage:
+    def __init__(self, message_id):
+        self.message_id = message_id
+
+
+class BatchSink:
+    """
+    Stands in for BotManager in batch runs. Messages are discarded, or kept
+    per chat with record=True so they can be written out with the results.
+    """
+
+    def __init__(self, personas, record=False):
+        self.bot_info = personas
+        self.record = record
+        self.messages = {}  # chat_id -> [{'bot': ..., 'text': ...}]
+        self._next_id = 0
+
+    async def send_message(self, bot_key, chat_id, text, reply_to_message_id=None):
+        self._next_id += 1
+        if self.record:
+            self.messages.setdefault(chat_id, []).append({'bot': bot_key, 'text': text})
+        return SentMessage(self._next_id)
+
+    async def send_streaming_message(self, bot_key, chat_id, chunks, reply_to_message_id=None):
+        text = "".join([chunk async for chunk in chunks])
+        return await self.send_message(bot_key, chat_id, text, reply_to_message_id), text
+
+    async def send_chat_action(self, bot_key, chat_id, action="typing"):
+        return True
+
+    def pop_messages(self, chat_id):
+        return self.messages.pop(chat_id, [])
+
+
+def read_topics(path):
+    topics = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            topic = line.strip()
+            if topic and not topic.startswith('#') and topic not in topics:
+                topics.append(topic)
+    return topics
+
+
+async def completed_topics(topics):
+    """Topics an earlier batch run already took to a completed meeting."""
+    async with AsyncSessionLocal() as session:
+        stmt = select(Meeting.topic).where(
+            Meeting.topic.in_(topics), Meeting.status == "completed", Meeting.chat_id >= BATCH_CHAT_ID_BASE
+        )
+        return set((await session.execute(stmt)).scalars().all())
+
+
+async def next_batch_chat_id():
+    """First batch chat id above every one stored, archive included."""
+    async with AsyncSessionLocal() as session:
+        highest = [
+            (await session.execute(select(func.max(model.chat_id)).where(model.chat_id >= BATCH_CHAT_ID_BASE))).scalar()
+            for model in (Meeting, MeetingArchive)
+        ]
+    return max([BATCH_CHAT_ID_BASE - 1] + [chat_id for chat_id in highest if chat_id is not None]) + 1
+
+
+async def interrupt_orphaned_meetings():
+    """Meetings of a batch run that crashed stay 'active'; they are re-run, not resumed."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Meeting)
+            .where(Meeting.status == "active", Meeting.chat_id >= BATCH_CHAT_ID_BASE)
+            .values(status="interrupted")
+        )
+        await session.commit()
+    if result.rowcount:
+        logger.info(f"Marked {result.rowcount} meeting(s) of an earlier batch run as interrupted")
+
+
+async def meeting_result(meeting_id):
+    async with AsyncSessionLocal() as session:
+        meeting = await session.get(Meeting, meeting_id)
+        messages = (await session.execute(
+            select(Message).where(Message.meeting_id == meeting_id).order_by(Message.id)
+        )).scalars().all()
+    summary = next((m.content for m in messages if m.round_number == 99), None)
+    return {
+        'meeting_id': meeting_id,
+        'status': meeting.status,
+        'summary': summary,
+        'transcript': [
+            {'bot': m.bot_name, 'round': m.round_number, 'content': m.content}
+            for m in messages if m.round_number != 99
+        ],
+    }
+
+
+class BatchRunner:
+    def __init__(self, orchestrator, sink, output, concurrency=10, chat_base=BATCH_CHAT_ID_BASE):
+        self.orchestrator = orchestrator
+        self.chat_base = chat_base  # chat id of this run's first topic
+        self.sink = sink
+        self.output = output
+        self.slots = asyncio.Semaphore(concurrency)
+        self.done = 0
+        self.completed = 0
+        self.total = 0
+
+    async def run_topic(self, index, topic):
+        async with self.slots:
+            chat_id = self.chat_base + index
+            start = time.monotonic()
+            record = {'topic': topic}
+            try:
+                loop_task = await self.orchestrator.start_new_meeting(chat_id, topic, 0)
+                meeting_id = self.orchestrator.active_meetings[chat_id]['meeting_id']
+                await loop_task
+                record.update(await meeting_result(meeting_id))
+            except Exception as e:
+                logger.error(f"Meeting for '{topic}' failed: {e}")
+                record.update(status="failed", error=str(e))
+            record['seconds'] = round(time.monotonic() - start, 2)
+            if self.sink.record:
+                record['messages'] = self.sink.pop_messages(chat_id)
+
+            self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.output.flush()
+            self.done += 1
+            self.completed += record['status'] == "completed"
+            logger.info(f"[{self.done}/{self.total}] {record['status']} in {record['seconds']}s: {topic[:60]}")
+
+    async def run(self, topics):
+        self.total = len(topics)
+        await asyncio.gather(*(self.run_topic(index, topic) for index, topic in enumerate(topics)))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("topics", help="File with one topic per line")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=10, help="Meetings running at the same time")
+    parser.add_argument("--record", action="store_true", help="Include the messages as posted in each result")
+    parser.add_argument("--rerun", action="store_true", help="Also run topics that already have a completed batch meeting")
+    args = parser.parse_args()
+
+    await init_db()
+    try:
+        topics = read_topics(args.topics)
+        await interrupt_orphaned_meetings()
+        skipped = set() if args.rerun else await completed_topics(topics)
+        pending = [topic for topic in topics if topic not in skipped]
+        logger.info(f"{len(topics)} topic(s), {len(skipped)} already completed, running {len(pending)}")
+
+        with open(PERSONAS_FILE, 'r', encoding='utf-8') as f:
+            personas = json.load(f)
+        sink = BatchSink(personas, record=args.record)
+        orchestrator = Orchestrator(sink, LLMRouter.from_personas(personas))
+        orchestrator.pacing = PacingPolicy.preset("zero")
+        orchestrator.stream_responses = False
+        orchestrator.state = InMemoryMeetingState()  # batch chats are private to this process
+
+        try:
+            with open(args.output, 'a', encoding='utf-8') as output:
+                runner = BatchRunner(orchestrator, sink, output, args.concurrency, await next_batch_chat_id())
+                await runner.run(pending)
+        finally:
+            await orchestrator.shutdown()
+        print(f"{runner.completed}/{len(pending)} toplantı tamamlandı, sonuçlar: {args.output}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
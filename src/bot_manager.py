@@ -2,18 +2,205 @@ import asyncio
 import logging
 import os
 import json
-from telegram import Bot
-from telegram.ext import Application, ApplicationBuilder, CommandHandler, MessageHandler, filters
+import time
+from collections import deque
+from telegram.error import BadRequest, NetworkError, RetryAfter
+from telegram.ext import ApplicationBuilder
 from dotenv import load_dotenv
 
+from src.ratelimit import TokenBucket
+from src import metrics
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+def _is_parse_error(error_str):
+    return "can't parse" in error_str or "parse entities" in error_str
+
+
+class OutboundQueue:
+    """
+    Outbound Telegram calls, paced to Telegram's published limits.
+
+    Every call for a chat goes through that chat's FIFO worker, so messages keep
+    their order. Before each call the worker waits on token buckets:
+    - per bot: ~30 messages per second overall
+    - per bot and chat: ~1 message per second
+    - per bot and group: 20 messages per minute
+    RetryAfter (flood wait) is honoured and network errors are retried, so board
+    messages are delayed under load instead of being dropped. Identical pending
+    chat actions (e.g. 'typing') are coalesced into one call.
+    """
+
+    def __init__(self, bot_rate=30, chat_rate=1, group_per_minute=20, max_retries=5):
+        self.bot_rate = bot_rate
+        self.chat_rate = chat_rate
+        self.group_per_minute = group_per_minute
+        self.max_retries = max_retries
+        self._bot_buckets = {}    # bot_key -> TokenBucket
+        self._chat_buckets = {}   # (bot_key, chat_id) -> TokenBucket
+        self._group_buckets = {}  # (bot_key, chat_id) -> TokenBucket, group chats only
+        self._queues = {}         # chat_id -> deque of jobs
+        self._workers = {}        # chat_id -> worker task
+        self._pending_actions = {}  # (bot_key, chat_id, action) -> future
+
+        # Metrics
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0   # calls that raised after retries (caller may still recover)
+        self.dropped = 0  # messages that could not be delivered at all
+        self.latencies = deque(maxlen=1000)  # seconds from submit to completion
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            bot_rate=float(os.getenv("TELEGRAM_BOT_RATE", "30")),
+            chat_rate=float(os.getenv("TELEGRAM_CHAT_RATE", "1")),
+            group_per_minute=float(os.getenv("TELEGRAM_GROUP_PER_MINUTE", "20")),
+            max_retries=int(os.getenv("TELEGRAM_SEND_RETRIES", "5")),
+        )
+
+    async def submit(self, bot_key, chat_id, operation, is_message=True):
+        """
+        Queues `operation` (a zero-argument coroutine function) for the chat and
+        returns its result. Chat actions should pass is_message=False.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(chat_id, deque()).append((bot_key, operation, is_message, future, time.monotonic()))
+        worker = self._workers.get(chat_id)
+        if worker is None or worker.done():
+            self._workers[chat_id] = asyncio.create_task(self._run_chat(chat_id))
+        return await future
+
+    async def submit_action(self, bot_key, chat_id, action, operation):
+        """Queues a chat action, reusing an identical one that is still pending."""
+        key = (bot_key, chat_id, action)
+        pending = self._pending_actions.get(key)
+        if pending is not None and not pending.done():
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(self.submit(bot_key, chat_id, operation, is_message=False))
+        self._pending_actions[key] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._pending_actions.get(key) is task and task.done():
+                del self._pending_actions[key]
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+        return {
+            'queue_depth': sum(len(queue) for queue in self._queues.values()),
+            'active_chats': sum(1 for worker in self._workers.values() if not worker.done()),
+            'sent': self.sent,
+            'retries': self.retries,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'latency_avg': sum(latencies) / len(latencies) if latencies else 0.0,
+            'latency_p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+            'latency_max': latencies[-1] if latencies else 0.0,
+        }
+
+    def _buckets_for(self, bot_key, chat_id, is_message):
+        buckets = [self._bot_buckets.setdefault(bot_key, TokenBucket(self.bot_rate, self.bot_rate))]
+        if is_message:
+            key = (bot_key, chat_id)
+            buckets.append(self._chat_buckets.setdefault(key, TokenBucket(1, self.chat_rate)))
+            if isinstance(chat_id, int) and chat_id < 0:
+                buckets.append(self._group_buckets.setdefault(
+                    key, TokenBucket(self.group_per_minute, self.group_per_minute / 60)
+                ))
+        return buckets
+
+    async def _run_chat(self, chat_id):
+        queue = self._queues[chat_id]
+        while queue:
+            bot_key, operation, is_message, future, submitted_at = queue.popleft()
+            if future.done():
+                continue
+            call = asyncio.create_task(self._execute(bot_key, chat_id, operation, is_message))
+            # A caller cancelled mid-call (e.g. /sus) aborts the call and its retries
+            future.add_done_callback(lambda f, call=call: call.cancel() if f.cancelled() else None)
+            try:
+                result = await call
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # the worker itself is being cancelled
+                continue
+            except Exception as e:
+                self.failed += 1
+                outcome = "failed"
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self.sent += 1
+                outcome = "sent"
+                if not future.done():
+                    future.set_result(result)
+            latency = time.monotonic() - submitted_at
+            self.latencies.append(latency)
+            metrics.record_outbound_call(outcome, latency)
+        self._queues.pop(chat_id, None)
+        self._workers.pop(chat_id, None)
+
+    async def _execute(self, bot_key, chat_id, operation, is_message):
+        buckets = self._buckets_for(bot_key, chat_id, is_message)
+        for attempt in range(self.max_retries + 1):
+            wait = max(bucket.delay_for(1) for bucket in buckets)
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = max(bucket.delay_for(1) for bucket in buckets)
+            for bucket in buckets:
+                bucket.consume(1)
+
+            try:
+                return await operation()
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else float(e.retry_after)
+                logger.warning(f"Flood control for {bot_key} in chat {chat_id}, retrying in {retry_after}s")
+                self.retries += 1
+                metrics.record_telegram_retry("flood_wait")
+                await asyncio.sleep(retry_after)
+            except BadRequest:
+                # Not transient (bad reply target, invalid Markdown, ...); caller decides
+                raise
+            except NetworkError as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(30, 2 ** attempt)
+                logger.warning(f"Network error for {bot_key} in chat {chat_id} ({e}), retrying in {delay}s")
+                self.retries += 1
+                metrics.record_telegram_retry("network")
+                await asyncio.sleep(delay)
+
+
 class BotManager:
     def __init__(self, personas_file='src/personas.json'):
         self.bots = {} # { 'CTO': ApplicationObject, 'Chairman': ApplicationObject ... }
         self.bot_info = {} # { 'CTO': {name, role...} }
+        self.tokens = {} # { 'CTO': token }
         self.personas_file = personas_file
+        # How updates are received: 'polling' (getUpdates) or 'webhook' (one HTTP endpoint for all bots)
+        self.update_mode = os.getenv("TELEGRAM_UPDATE_MODE", "polling").lower()
+        # Only these bots receive updates; the rest are send-only and never fetch updates ('*' = all)
+        listen = os.getenv("TELEGRAM_LISTEN_BOTS", "Chairman")
+        self.listen_bots = None if listen.strip() == "*" else [k.strip() for k in listen.split(",") if k.strip()]
+        # Alternative Bot API server (e.g. a local fake Telegram for tests and benchmarks)
+        self.api_base_url = os.getenv("TELEGRAM_API_BASE_URL")
+        self.webhook_server = None
+        # Minimum seconds between edits of a streamed message (Telegram allows ~1 edit/s per chat)
+        self.stream_edit_interval = float(os.getenv("TELEGRAM_STREAM_EDIT_INTERVAL", "1.5"))
+        # All outbound calls are paced and retried through this queue
+        self.outbound = OutboundQueue.from_env()
+        metrics.track_outbound(self.outbound_metrics)
+        # Seconds each bot's handshake (getMe, start, polling/webhook setup) may take at startup
+        self.init_timeout = float(os.getenv("TELEGRAM_INIT_TIMEOUT", "10"))
+        # Initialize send-only bots on their first message instead of at startup
+        self.lazy_bots = os.getenv("TELEGRAM_LAZY_BOTS", "1") == "1"
+        self._initialized = set()  # bot keys whose Application is initialized
+        self._init_locks = {}  # bot key -> asyncio.Lock
         self.load_personas()
         self.group_id =  os.getenv("TELEGRAM_GROUP_ID") 
         if self.group_id:
@@ -31,78 +218,253 @@ class BotManager:
             token = os.getenv(token_env_var)
             
             if token:
-                logger.info(f"Initializing bot for {key}...")
-                # We build an Application for each bot to handle updates if needed
-                app = ApplicationBuilder().token(token).build()
-                self.bots[key] = app
                 self.bot_info[key] = p
+                self.tokens[key] = token
+                # Building an Application takes ~0.1s (HTTP clients); send-only bots are built on first use
+                if not self.lazy_bots or self.is_listening(key):
+                    self.bots[key] = self._build_app(key)
             else:
                 logger.warning(f"Token not found for {key} ({token_env_var})")
 
+    def _build_app(self, bot_key):
+        logger.info(f"Initializing bot for {bot_key}...")
+        # We build an Application for each bot to handle updates if needed
+        builder = ApplicationBuilder().token(self.tokens[bot_key])
+        if self.api_base_url:
+            base = self.api_base_url.rstrip('/')
+            builder = builder.base_url(f"{base}/bot").base_file_url(f"{base}/file/bot")
+        if self.update_mode == "webhook" or not self.is_listening(bot_key):
+            # No getUpdates loop for webhook mode or send-only bots
+            builder = builder.updater(None)
+        return builder.build()
+
     async def initialize_bots(self):
-        """Initializes all bot applications."""
-        for app in self.bots.values():
-            await app.initialize()
+        """
+        Initializes the listening bots (all bots with TELEGRAM_LAZY_BOTS=0) concurrently.
+        A bot that fails or times out is logged and retried on its first use.
+        """
+        keys = list(self.bots)
+        started = time.monotonic()
+        results = await asyncio.gather(*(self.activate(key) for key in keys))
+        logger.info(f"Initialized {sum(1 for app in results if app)}/{len(keys)} bot(s) in "
+                    f"{time.monotonic() - started:.2f}s ({len(self.tokens) - len(keys)} deferred to first use)")
+
+    async def activate(self, bot_key):
+        """Returns the bot's initialized Application, building and initializing it on first use (None if unavailable)."""
+        if bot_key in self._initialized:
+            return self.bots[bot_key]
+        if bot_key not in self.tokens:
+            return None
+        async with self._init_locks.setdefault(bot_key, asyncio.Lock()):
+            if bot_key not in self.bots:
+                self.bots[bot_key] = await asyncio.to_thread(self._build_app, bot_key)
+            app = self.bots[bot_key]
+            if bot_key not in self._initialized:
+                try:
+                    await asyncio.wait_for(app.initialize(), self.init_timeout)
+                except Exception as e:
+                    logger.error(f"Initializing bot {bot_key} failed: {e!r}")
+                    return None
+                self._initialized.add(bot_key)
+        return app
+
+    def is_listening(self, bot_key):
+        return self.listen_bots is None or bot_key in self.listen_bots
+
+    async def start(self):
+        """Starts receiving updates for the listening bots and keeps running."""
+        if self.update_mode == "webhook":
+            await self.start_webhook()
+        else:
+            await self.start_polling()
 
-    async def start_polling(self):
-        """Starts polling for all bots concurrently."""
-        # Note: In a production environment with limiting, we might want to prioritize the Chairman for commands
-        # For simplicity, we start all. Be aware of race conditions on signal handling if using run_polling.
-        # Here we use start() + updater.start_polling() pattern for "manual" control or 
-        # use asyncio.gather on run_polling if supported. 
-        # python-telegram-bot v20 recommends only one run_polling per process usually due to signals.
-        # We will use start() and updater.start_polling() manually to avoid signal conflicts.
-        
-        tasks = []
-        for key, app in self.bots.items():
-            await app.start()
-            # We assume we want them to process updates (listen for mentions/replies)
-            # For the MVP, mainly Chairman needs to listen for /toplanti
-            # But we turn them all on.
-            if app.updater:
-                await app.updater.start_polling(allowed_updates=["message", "callback_query"])
-                logger.info(f"Started polling for {key}")
-        
         # Keep the loop alive
         # A simple event to keep the main loop running
         stop_signal = asyncio.Event()
         await stop_signal.wait()
 
+    async def start_polling(self):
+        """Starts polling for the listening bots."""
+        # python-telegram-bot v20 recommends only one run_polling per process usually due to signals.
+        # We will use start() and updater.start_polling() manually to avoid signal conflicts.
+        # Send-only bots never poll. Bots are started concurrently.
+        await asyncio.gather(*(self._start_bot(key, polling=True) for key in self.bots if self.is_listening(key)))
+
+    async def _start_bot(self, bot_key, polling):
+        """Starts a listening bot's update processing (and polling); returns whether it is running."""
+        app = await self.activate(bot_key)
+        if app is None:
+            return False
+        try:
+            await asyncio.wait_for(app.start(), self.init_timeout)
+            if polling and app.updater:
+                await asyncio.wait_for(
+                    app.updater.start_polling(allowed_updates=["message", "callback_query"]), self.init_timeout
+                )
+                logger.info(f"Started polling for {bot_key}")
+        except Exception as e:
+            logger.error(f"Starting bot {bot_key} failed: {e!r}")
+            return False
+        return True
+
+    async def start_webhook(self):
+        """Serves all listening bots from one webhook endpoint instead of one long-poll per bot."""
+        from src.webhook import WebhookServer
+
+        # start() runs the update processor that consumes app.update_queue
+        keys = [key for key in self.bots if self.is_listening(key)]
+        running = await asyncio.gather(*(self._start_bot(key, polling=False) for key in keys))
+        applications = {self.tokens[key]: self.bots[key] for key, ok in zip(keys, running) if ok}
+
+        self.webhook_server = WebhookServer.from_env(applications)
+        await self.webhook_server.start()
+        await self.webhook_server.register_webhooks(allowed_updates=["message", "callback_query"])
+
+    async def stop(self):
+        """Stops update processing and shuts all bots down."""
+        if self.webhook_server:
+            await self.webhook_server.stop()
+        await asyncio.gather(*(self._stop_bot(self.bots[key]) for key in self._initialized))
+        self._initialized.clear()
+
+    async def _stop_bot(self, app):
+        try:
+            if app.updater and app.updater.running:
+                await app.updater.stop()
+            if app.running:
+                await app.stop()
+            await app.shutdown()
+        except Exception as e:
+            logger.warning(f"Stopping bot failed: {e!r}")
+
     async def send_message(self, bot_key, chat_id, text, reply_to_message_id=None):
         """Sends a message using a specific persona's bot."""
-        app = self.bots.get(bot_key)
+        app = await self.activate(bot_key)
         if not app:
             logger.error(f"Bot {bot_key} not found or initialized.")
             return None
-        
-        try:
-            # First try with reply
-            sent_msg = await app.bot.send_message(
-                chat_id=chat_id,
-                text=text,
-                reply_to_message_id=reply_to_message_id,
-                parse_mode='Markdown'
-            )
-            return sent_msg
-        except Exception as e:
-            error_str = str(e)
-            
-            # If reply target not found, retry without reply
-            if "Message to be replied not found" in error_str or "replied" in error_str.lower():
-                logger.warning(f"Reply target not found for {bot_key}, sending without reply")
-                try:
-                    sent_msg = await app.bot.send_message(
-                        chat_id=chat_id,
-                        text=text,
-                        parse_mode='Markdown'
-                    )
-                    return sent_msg
-                except Exception as e2:
-                    logger.error(f"Error sending message as {bot_key} (retry): {e2}")
-                    return None
-            else:
+
+        parse_mode = 'Markdown'
+        # At most: original try, retry without reply target, retry as plain text
+        for _ in range(3):
+            try:
+                return await self.outbound.submit(bot_key, chat_id, lambda: app.bot.send_message(
+                    chat_id=chat_id,
+                    text=text,
+                    reply_to_message_id=reply_to_message_id,
+                    parse_mode=parse_mode
+                ))
+            except Exception as e:
+                error_str = str(e).lower()
+
+                # If reply target not found, retry without reply
+                if reply_to_message_id and "replied" in error_str:
+                    logger.warning(f"Reply target not found for {bot_key}, sending without reply")
+                    reply_to_message_id = None
+                    continue
+                # Invalid Markdown from the model: send the text as is instead of dropping it
+                if parse_mode and _is_parse_error(error_str):
+                    logger.warning(f"Markdown rejected for {bot_key}, sending as plain text")
+                    parse_mode = None
+                    continue
+
                 logger.error(f"Error sending message as {bot_key}: {e}")
+                self.outbound.dropped += 1
+                metrics.record_dropped_message()
                 return None
+        return None
+
+    async def send_streaming_message(self, bot_key, chat_id, chunks, reply_to_message_id=None):
+        """
+        Posts a placeholder and edits it as `chunks` (an async iterator of text) arrive.
+        Edits are throttled to stream_edit_interval; the final edit uses Markdown and
+        falls back to plain text if Telegram rejects it.
+        Returns (sent_message, full_text).
+        """
+        app = await self.activate(bot_key)
+        if not app:
+            logger.error(f"Bot {bot_key} not found or initialized.")
+            text = "".join([chunk async for chunk in chunks])
+            return None, text
+
+        text = ""
+        placeholder = None
+        shown = ""
+        next_edit_at = 0.0
+
+        async for chunk in chunks:
+            text += chunk
+            if not text.strip():
+                continue
+
+            if placeholder is None:
+                # First tokens: post the message (plain text, Markdown may still be incomplete)
+                placeholder = await self._send_plain(app, bot_key, chat_id, text.rstrip() + " ▌", reply_to_message_id)
+                if placeholder is None:
+                    break
+                shown = text
+                next_edit_at = time.monotonic() + self.stream_edit_interval
+            elif time.monotonic() >= next_edit_at and text != shown:
+                wait = await self._edit_message(app, bot_key, chat_id, placeholder.message_id, text.rstrip() + " ▌")
+                shown = text
+                next_edit_at = time.monotonic() + max(self.stream_edit_interval, wait)
+
+        if placeholder is None:
+            # Streaming could not start; drain the rest and send normally
+            text += "".join([chunk async for chunk in chunks])
+            return await self.send_message(bot_key, chat_id, text, reply_to_message_id), text
+
+        # Final edit: formatted text, plain text if the Markdown is invalid
+        delay = await self._edit_message(app, bot_key, chat_id, placeholder.message_id, text, parse_mode='Markdown')
+        if delay:
+            await asyncio.sleep(delay)
+            await self._edit_message(app, bot_key, chat_id, placeholder.message_id, text, parse_mode='Markdown')
+        return placeholder, text
+
+    async def _send_plain(self, app, bot_key, chat_id, text, reply_to_message_id):
+        try:
+            return await self.outbound.submit(bot_key, chat_id, lambda: app.bot.send_message(
+                chat_id=chat_id, text=text, reply_to_message_id=reply_to_message_id
+            ))
+        except Exception as e:
+            if reply_to_message_id and "replied" in str(e).lower():
+                return await self._send_plain(app, bot_key, chat_id, text, None)
+            logger.error(f"Error sending streamed message as {bot_key}: {e}")
+            return None  # caller falls back to send_message
+
+    async def _edit_message(self, app, bot_key, chat_id, message_id, text, parse_mode=None):
+        """Edits a message. Returns the number of seconds Telegram asked us to wait (0 if none)."""
+        try:
+            await self.outbound.submit(bot_key, chat_id, lambda: app.bot.edit_message_text(
+                chat_id=chat_id, message_id=message_id, text=text, parse_mode=parse_mode
+            ))
+        except RetryAfter as e:
+            return float(e.retry_after)
+        except Exception as e:
+            error_str = str(e).lower()
+            if "not modified" in error_str:
+                return 0
+            if parse_mode and _is_parse_error(error_str):
+                return await self._edit_message(app, bot_key, chat_id, message_id, text)
+            logger.warning(f"Could not edit message {message_id}: {e}")
+        return 0
+
+    async def send_chat_action(self, bot_key, chat_id, action="typing"):
+        """Sends a chat action (e.g. 'typing'); identical pending actions are coalesced."""
+        app = await self.activate(bot_key)
+        if not app:
+            return False
+        try:
+            return await self.outbound.submit_action(bot_key, chat_id, action, lambda: app.bot.send_chat_action(
+                chat_id=chat_id, action=action
+            ))
+        except Exception as e:
+            logger.warning(f"Could not send {action} action as {bot_key}: {e}")
+            return False
+
+    def outbound_metrics(self):
+        """Queue depth, retry/drop counters and latency of outbound Telegram calls."""
+        return self.outbound.metrics()
 
     def get_bot_app(self, bot_key):
         return self.bots.get(bot_key)
@@ -1,22 +1,95 @@
+import logging
 import os
+import time
+from collections import deque
+from sqlalchemy import exc, inspect
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
-from src.models import Base
+from src import metrics
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# A missing URL is a deployment error; local SQLite has to be asked for explicitly
+if not DATABASE_URL:
+    raise RuntimeError("DATABASE_URL is not set (use sqlite:///board.db for a local SQLite database)")
+
 # Fix for Coolify/Heroku-style URLs that use "postgres://" instead of "postgresql://"
 # SQLAlchemy requires "postgresql" and for async we need "postgresql+asyncpg"
-if DATABASE_URL:
-    if DATABASE_URL.startswith("postgres://"):
-        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
-    elif DATABASE_URL.startswith("postgresql://"):
-        DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
+elif DATABASE_URL.startswith("postgresql://"):
+    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+elif DATABASE_URL.startswith("sqlite://"):
+    DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# Logging every SQL statement is expensive; enable only for debugging
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+
+
+class PoolStats:
+    """Checkout latency and saturation figures of the connection pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_max = 0.0
+        self.waits = deque(maxlen=1000)  # recent checkout waits in seconds
+
+    def record_checkout(self, wait):
+        self.checkouts += 1
+        self.wait_max = max(self.wait_max, wait)
+        self.waits.append(wait)
+        metrics.record_db_checkout(wait)
+
+    def record_timeout(self):
+        self.timeouts += 1
+        metrics.record_db_checkout_timeout()
+
+
+pool_stats_data = PoolStats()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that measures how long each connection checkout waits."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats_data.record_timeout()
+            raise
+        finally:
+            pool_stats_data.record_checkout(time.perf_counter() - start)
+
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine_options = {
+    "echo": DB_ECHO,
+    "poolclass": InstrumentedPool,
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+}
+if IS_SQLITE:
+    # Wait for the file lock instead of failing when several sessions write at once
+    engine_options["connect_args"] = {"timeout": 30}
+else:
+    engine_options["connect_args"] = {
+        # Set to 0 behind pgbouncer in transaction mode
+        "statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")),
+        "server_settings": {"statement_timeout": os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000")},
+    }
+
+engine = create_async_engine(DATABASE_URL, **engine_options)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -24,10 +97,71 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Revision matching the schema the old create_all bootstrap produced
+BASELINE_REVISION = "0001"
+
+
+def _alembic_config(connection=None):
+    from alembic.config import Config
+
+    config = Config(os.path.join(ROOT_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT_DIR, "migrations"))
+    config.attributes["connection"] = connection
+    config.attributes["configure_logging"] = False
+    return config
+
+
+def _schema_is_current(connection, config):
+    """True when the database is already at the newest migration, so boot can skip alembic's upgrade run."""
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    current = MigrationContext.configure(connection).get_current_heads()
+    return set(current) == set(ScriptDirectory.from_config(config).get_heads())
+
+
+def _run_migrations(connection):
+    from alembic import command
+
+    config = _alembic_config(connection)
+    tables = inspect(connection).get_table_names()
+    if "alembic_version" in tables and _schema_is_current(connection, config):
+        logger.info("Database schema is current, no migrations to run")
+        return
+    connection.commit()  # alembic manages its own transactions from here on
+    if "meetings" in tables and "alembic_version" not in tables:
+        # Database created before migrations existed: adopt it at the baseline
+        logger.info("Existing schema without migration history, stamping baseline")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
+
 async def init_db():
-    async with engine.begin() as conn:
-        # Create tables
-        await conn.run_sync(Base.metadata.create_all)
+    """Brings the schema up to the latest migration (DB_AUTO_MIGRATE=0 leaves it to `alembic upgrade head`)."""
+    if os.getenv("DB_AUTO_MIGRATE", "1") != "1":
+        return
+    async with engine.connect() as conn:
+        await conn.run_sync(_run_migrations)
+
+def pool_stats():
+    """Current pool usage plus checkout wait statistics."""
+    pool = engine.pool
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    waits = sorted(pool_stats_data.waits)
+    return {
+        'size': pool.size(),
+        'checked_out': checked_out,
+        'overflow': pool.overflow(),
+        'capacity': capacity,
+        'saturation': checked_out / capacity if capacity else 0.0,
+        'checkouts': pool_stats_data.checkouts,
+        'timeouts': pool_stats_data.timeouts,
+        'checkout_wait_avg': sum(waits) / len(waits) if waits else 0.0,
+        'checkout_wait_p95': waits[int(len(waits) * 0.95) - 1] if waits else 0.0,
+        'checkout_wait_max': pool_stats_data.wait_max,
+    }
 
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -0,0 +1,414 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+from typing import AsyncIterator, Protocol
+
+import aiohttp
+
+from src import metrics
+from src.ai_engine import (
+    PRIORITY_TURN, ContextBuilder, RequestScheduler, ResponseCache, estimate_tokens, format_prompt,
+)
+
+logger = logging.getLogger(__name__)
+
+API_ERROR_TEXT = "Beyinlerim yandı... (API Error)"
+RATE_LIMIT_TEXT = "Beyinlerim yandı... (Rate Limit)"
+
+
+class LLMBackend(Protocol):
+    """What the orchestrator needs from a model backend (GeminiClient is the reference implementation)."""
+
+    model_name: str
+
+    async def generate_response(self, persona_instruction: str, history: list, user_input: str,
+                                chat_id=None, priority=PRIORITY_TURN, static_context: str = "",
+                                cache=False, cache_ttl=None) -> str:
+        ...
+
+    def stream_response(self, persona_instruction: str, history: list, user_input: str,
+                        chat_id=None, priority=PRIORITY_TURN, static_context: str = "") -> AsyncIterator[str]:
+        ...
+
+
+class LLMHTTPError(Exception):
+    def __init__(self, code, message, retry_after=None):
+        super().__init__(f"HTTP {code}: {message}")
+        self.code = code
+        self.retry_after = retry_after
+
+
+class OpenAICompatibleClient:
+    """
+    Backend for any server speaking the OpenAI Chat Completions API
+    (vLLM, llama.cpp server, Ollama, LM Studio, hosted gateways).
+    429 and 5xx responses are retried with backoff, honouring Retry-After.
+    """
+
+    def __init__(self, base_url, model_name, api_key=None, timeout=120.0, max_retries=5):
+        self.base_url = base_url.rstrip('/')
+        self.model_name = model_name
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.scheduler = RequestScheduler(
+            rpm=int(os.getenv("OPENAI_RPM", "0")),
+            base_backoff=float(os.getenv("OPENAI_BACKOFF_BASE", "2")),
+            max_backoff=60,
+        )
+        self.context_builder = ContextBuilder.from_env()
+        self.response_cache = ResponseCache.from_env()
+        self.last_usage = {}
+        self._session = None
+
+    @classmethod
+    def from_env(cls, model_name=None):
+        return cls(
+            base_url=os.getenv("OPENAI_BASE_URL", "http://localhost:8000/v1"),
+            model_name=model_name or os.getenv("OPENAI_MODEL", "local-model"),
+            api_key=os.getenv("OPENAI_API_KEY") or None,
+            timeout=float(os.getenv("OPENAI_TIMEOUT", "120")),
+        )
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+            self._session = aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    def _payload(self, persona_instruction, static_context, full_prompt, stream):
+        # Static part first so servers with prefix caching (vLLM, llama.cpp) can reuse it
+        contents = f"{static_context}\n{full_prompt}" if static_context else full_prompt
+        return {
+            "model": self.model_name,
+            "messages": [
+                {"role": "system", "content": persona_instruction},
+                {"role": "user", "content": contents},
+            ],
+            "stream": stream,
+        }
+
+    async def _post(self, payload):
+        response = await self._get_session().post(f"{self.base_url}/chat/completions", json=payload)
+        if response.status != 200:
+            body = await response.text()
+            response.release()
+            raise LLMHTTPError(response.status, body[:200], response.headers.get("Retry-After"))
+        return response
+
+    def _retry_delay(self, error, attempt):
+        """Seconds to back off before retrying, or None if the error is not transient."""
+        if isinstance(error, LLMHTTPError):
+            if error.code != 429 and error.code < 500:
+                return None
+            try:
+                hint = float(error.retry_after) if error.retry_after else None
+            except ValueError:
+                hint = None
+            return self.scheduler.backoff_delay(attempt, hint)
+        if isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+            return self.scheduler.backoff_delay(attempt)
+        return None
+
+    def _handle_error(self, error, attempt):
+        delay = self._retry_delay(error, attempt)
+        if delay is None:
+            logger.error(f"{self.model_name} API Error: {error}")
+            return "fail"
+        if isinstance(error, LLMHTTPError):
+            metrics.record_llm_retry(self.model_name, "rate_limit" if error.code == 429 else "server_error")
+        else:
+            metrics.record_llm_retry(self.model_name, "network")
+        logger.warning(f"{self.model_name} call failed ({error}). Waiting {delay:.1f}s before retry {attempt + 1}/{self.max_retries}")
+        self.scheduler.pause(delay)
+        return "retry"
+
+    async def generate_response(self, persona_instruction: str, history: list, user_input: str,
+                                chat_id=None, priority=PRIORITY_TURN, static_context: str = "",
+                                cache=False, cache_ttl=None) -> str:
+        full_prompt = format_prompt(self.context_builder.build(history), user_input)
+
+        response_key = None
+        if cache:
+            response_key = ResponseCache.key_for(self.model_name, persona_instruction, static_context, full_prompt)
+            cached_text = await self.response_cache.get(response_key)
+            if cached_text is not None:
+                return cached_text
+
+        reserved_tokens = estimate_tokens(persona_instruction + static_context) + estimate_tokens(full_prompt)
+        payload = self._payload(persona_instruction, static_context, full_prompt, stream=False)
+        for attempt in range(self.max_retries):
+            await self.scheduler.acquire(chat_id=chat_id, priority=priority, tokens=reserved_tokens)
+            try:
+                response = await self._post(payload)
+                async with response:
+                    data = await response.json()
+                text = data["choices"][0]["message"]["content"] or ""
+                usage = data.get("usage") or {}
+                self.scheduler.record_usage(reserved_tokens, usage.get("total_tokens"))
+                self.last_usage = {
+                    'chat_id': chat_id,
+                    'estimated_prompt_tokens': reserved_tokens,
+                    'prompt_tokens': usage.get("prompt_tokens"),
+                    'response_tokens': usage.get("completion_tokens"),
+                }
+                metrics.record_llm_usage(self.model_name, usage.get("prompt_tokens"), usage.get("completion_tokens"),
+                                         retries=attempt)
+                if response_key and text:
+                    await self.response_cache.set(response_key, self.model_name, text, cache_ttl)
+                return text
+            except Exception as e:
+                if self._handle_error(e, attempt) == "fail":
+                    return API_ERROR_TEXT
+
+        logger.error(f"Max retries exceeded for {self.model_name}")
+        return RATE_LIMIT_TEXT
+
+    async def stream_response(self, persona_instruction: str, history: list, user_input: str,
+                              chat_id=None, priority=PRIORITY_TURN, static_context: str = ""):
+        """Yields text deltas from the server-sent event stream; retries only before the first one."""
+        full_prompt = format_prompt(self.context_builder.build(history), user_input)
+        reserved_tokens = estimate_tokens(persona_instruction + static_context) + estimate_tokens(full_prompt)
+        payload = self._payload(persona_instruction, static_context, full_prompt, stream=True)
+
+        for attempt in range(self.max_retries):
+            await self.scheduler.acquire(chat_id=chat_id, priority=priority, tokens=reserved_tokens)
+            emitted = False
+            try:
+                response = await self._post(payload)
+                async with response:
+                    async for line in response.content:
+                        line = line.strip()
+                        if not line.startswith(b"data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == b"[DONE]":
+                            break
+                        choices = json.loads(data).get("choices") or [{}]
+                        delta = (choices[0].get("delta") or {}).get("content")
+                        if delta:
+                            emitted = True
+                            yield delta
+                self.scheduler.record_usage(reserved_tokens, None)
+                metrics.record_llm_usage(self.model_name, reserved_tokens, retries=attempt)
+                return
+            except Exception as e:
+                if emitted:
+                    logger.error(f"{self.model_name} stream interrupted: {e}")
+                    return
+                if self._handle_error(e, attempt) == "fail":
+                    yield API_ERROR_TEXT
+                    return
+
+        logger.error(f"Max retries exceeded for {self.model_name}")
+        yield RATE_LIMIT_TEXT
+
+
+def parse_latency(spec):
+    """
+    Turns a latency spec into a sampler returning seconds:
+    'fixed:S', 'uniform:LOW:HIGH', 'normal:MEAN:STD' or 'lognormal:MEDIAN:SIGMA'.
+    """
+    kind, *params = spec.split(':')
+    values = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+
+class StubRateLimitError(Exception):
+    code = 429
+
+
+STUB_WORDS = (
+    "bütçe", "risk", "kullanıcı", "altyapı", "maliyet", "pazar", "rakip", "ölçek", "güvenlik",
+    "MVP", "gelir", "müşteri", "süre", "ekip", "öncelik", "deneme", "veri", "sunucu", "büyüme",
+)
+
+
+class StubLLMClient:
+    """
+    In-process backend for offline load tests of the orchestration pipeline.
+    Replies are deterministic for a given prompt; the first token arrives after a
+    delay drawn from `latency` (see parse_latency) and the rest stream at
+    `tokens_per_second` (0 = all at once). A share of calls can be made to fail
+    with a 429 (retried with backoff, like Gemini) or to hang for `timeout`
+    seconds and then fail.
+    """
+
+    def __init__(self, model_name="stub", latency="fixed:0.5", tokens_per_second=0.0, response_tokens=60,
+                 rate_limit_rate=0.0, timeout_rate=0.0, timeout=30.0, seed=None, max_retries=5, backoff_base=1.0):
+        self.model_name = model_name
+        self.latency_spec = latency
+        self._sample_latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._rng = random.Random(seed)
+        self.scheduler = RequestScheduler(base_backoff=backoff_base, max_backoff=backoff_base * 8)
+        self.context_builder = ContextBuilder.from_env()
+        self.last_usage = {}
+
+        # Counters for benchmarks
+        self.calls = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_env(cls, model_name=None):
+        seed = os.getenv("LLM_STUB_SEED")
+        return cls(
+            model_name=model_name or "stub",
+            latency=os.getenv("LLM_STUB_LATENCY", "lognormal:0.8:0.4"),
+            tokens_per_second=float(os.getenv("LLM_STUB_TOKENS_PER_SEC", "0")),
+            response_tokens=int(os.getenv("LLM_STUB_RESPONSE_TOKENS", "60")),
+            rate_limit_rate=float(os.getenv("LLM_STUB_429_RATE", "0")),
+            timeout_rate=float(os.getenv("LLM_STUB_TIMEOUT_RATE", "0")),
+            timeout=float(os.getenv("LLM_STUB_TIMEOUT", "30")),
+            seed=int(seed) if seed else None,
+            backoff_base=float(os.getenv("LLM_STUB_BACKOFF_BASE", "1")),
+        )
+
+    def _reply(self, persona_instruction, full_prompt):
+        digest = hashlib.sha256(f"{self.model_name}\n{persona_instruction}\n{full_prompt}".encode('utf-8')).digest()
+        rng = random.Random(digest)
+        words = [rng.choice(STUB_WORDS) for _ in range(self.response_tokens)]
+        sentences = [" ".join(words[i:i + 10]).capitalize() + "." for i in range(0, len(words), 10)]
+        return " ".join(sentences)
+
+    async def _attempt(self, attempt):
+        """Waits out one simulated call. Returns 'ok', 'retry' or 'fail'."""
+        self.calls += 1
+        roll = self._rng.random()
+        if roll < self.timeout_rate:
+            self.timeouts += 1
+            await asyncio.sleep(self.timeout)
+            logger.error(f"{self.model_name} API Error: simulated timeout")
+            return "fail"
+        await asyncio.sleep(self._sample_latency(self._rng))
+        if roll < self.timeout_rate + self.rate_limit_rate:
+            self.rate_limited += 1
+            wait_time = self.scheduler.backoff_delay(attempt)
+            logger.warning(f"Rate limit hit ({self.model_name}). Waiting {wait_time:.1f}s before retry {attempt + 1}/{self.max_retries}")
+            self.scheduler.pause(wait_time)
+            metrics.record_llm_retry(self.model_name, "rate_limit")
+            return "retry"
+        return "ok"
+
+    async def generate_response(self, persona_instruction: str, history: list, user_input: str,
+                                chat_id=None, priority=PRIORITY_TURN, static_context: str = "",
+                                cache=False, cache_ttl=None) -> str:
+        full_prompt = format_prompt(self.context_builder.build(history), user_input)
+        reserved_tokens = estimate_tokens(persona_instruction + static_context) + estimate_tokens(full_prompt)
+        for attempt in range(self.max_retries):
+            await self.scheduler.acquire(chat_id=chat_id, priority=priority, tokens=reserved_tokens)
+            outcome = await self._attempt(attempt)
+            if outcome == "fail":
+                return API_ERROR_TEXT
+            if outcome == "retry":
+                continue
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(self.response_tokens / self.tokens_per_second)
+            self.last_usage = {'chat_id': chat_id, 'estimated_prompt_tokens': reserved_tokens,
+                               'response_tokens': self.response_tokens}
+            metrics.record_llm_usage(self.model_name, reserved_tokens, self.response_tokens, retries=attempt)
+            return self._reply(persona_instruction, full_prompt)
+        return RATE_LIMIT_TEXT
+
+    async def stream_response(self, persona_instruction: str, history: list, user_input: str,
+                              chat_id=None, priority=PRIORITY_TURN, static_context: str = ""):
+        full_prompt = format_prompt(self.context_builder.build(history), user_input)
+        reserved_tokens = estimate_tokens(persona_instruction + static_context) + estimate_tokens(full_prompt)
+        for attempt in range(self.max_retries):
+            await self.scheduler.acquire(chat_id=chat_id, priority=priority, tokens=reserved_tokens)
+            outcome = await self._attempt(attempt)
+            if outcome == "fail":
+                yield API_ERROR_TEXT
+                return
+            if outcome == "retry":
+                continue
+            words = self._reply(persona_instruction, full_prompt).split(" ")
+            metrics.record_llm_usage(self.model_name, reserved_tokens, len(words), retries=attempt)
+            for i, word in enumerate(words):
+                if i and self.tokens_per_second > 0:
+                    await asyncio.sleep(1 / self.tokens_per_second)
+                yield word if i == len(words) - 1 else word + " "
+            return
+        yield RATE_LIMIT_TEXT
+
+
+def create_backend(name, model_name=None):
+    """Builds a backend by name: 'gemini', 'openai' (any OpenAI-compatible server) or 'stub'."""
+    if name == "gemini":
+        from src.ai_engine import GeminiClient
+        return GeminiClient(model_name=model_name)
+    if name == "openai":
+        return OpenAICompatibleClient.from_env(model_name)
+    if name == "stub":
+        return StubLLMClient.from_env(model_name)
+    raise ValueError(f"Unknown LLM backend '{name}'")
+
+
+class LLMRouter:
+    """
+    Picks the backend for each persona. A persona in personas.json may set
+    "backend" (gemini, openai, stub) and "model"; the rest use LLM_BACKEND
+    with that backend's default model. Personas sharing a backend and model
+    share one client, and with it one rate limit budget.
+    """
+
+    def __init__(self, default, persona_backends=None):
+        self.default = default
+        self.persona_backends = dict(persona_backends or {})  # persona key -> backend
+
+    @classmethod
+    def from_personas(cls, personas):
+        default_name = os.getenv("LLM_BACKEND", "gemini").lower()
+        clients = {}
+
+        def client_for(name, model_name):
+            key = (name, model_name)
+            if key not in clients:
+                clients[key] = create_backend(name, model_name)
+            return clients[key]
+
+        persona_backends = {}
+        for persona_key, persona in personas.items():
+            name = persona.get("backend", default_name).lower()
+            persona_backends[persona_key] = client_for(name, persona.get("model"))
+            logger.info(f"{persona_key} uses {name} ({persona_backends[persona_key].model_name})")
+
+        # Personas without an entry (and callers outside a persona) get LLM_BACKEND
+        return cls(client_for(default_name, None), persona_backends)
+
+    def for_persona(self, persona_key) -> LLMBackend:
+        return self.persona_backends.get(persona_key, self.default)
+
+    def backends(self):
+        unique = {id(self.default): self.default}
+        for backend in self.persona_backends.values():
+            unique.setdefault(id(backend), backend)
+        return list(unique.values())
+
+    async def close(self):
+        for backend in self.backends():
+            close = getattr(backend, 'close', None)
+            if close:
+                await close()
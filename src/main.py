@@ -1,14 +1,15 @@
 import asyncio
 import logging
-import os
+import signal
 from dotenv import load_dotenv
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 
-from src.db import init_db
+from src.db import init_db, engine, pool_stats
 from src.bot_manager import BotManager
-from src.ai_engine import GeminiClient
+from src.llm import LLMRouter
 from src.orchestrator import Orchestrator
+from src.metrics import MetricsServer, setup_tracing, shutdown_tracing, track_db_pool
 
 # Setup Logging
 logging.basicConfig(
@@ -54,6 +55,8 @@ Bu sistem, 5 farklı yapay zeka karakterinin fikirlerinizi tartıştığı bir s
 - `/tanis`: Tüm botlar sırayla kendilerini tanıtır.
 - `/ozet`: Mevcut toplantıyı özetleyip kapatır.
 - `/sus`: Aktif toplantıyı acil olarak durdurur.
+- `/durum`: Toplantının ve kurulun anlık durumunu gösterir.
+- `/ara [Kelime]`: Geçmiş toplantılarda arama yapar.
 - `/info`: Bu bilgi mesajını gösterir.
 - `/start`: Botu selamlar.
 
@@ -75,15 +78,16 @@ async def toplanti_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text(f"📁 Konu alındı: **{topic}**\nKurul toplanıyor, lütfen bekleyin...")
     
-    # Start the async meeting flow
-    # logic is handled in orchestrator, completely detached from this handler to avoid timeout
-    asyncio.create_task(orchestrator.start_new_meeting(chat_id, topic, user.id))
+    # Queue the meeting; a worker (this process or another replica) runs it detached from this handler
+    queued = await orchestrator.request_meeting(chat_id, topic, user.id)
+    if queued:
+        await update.message.reply_text(f"⏳ Kurul şu an dolu, toplantınız sıraya alındı (sırada {queued} toplantı var).")
 
 async def tanis_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     if orchestrator:
         await update.message.reply_text("📢 **Yönetim Kurulu Üyeleri Takdim Ediliyor...**")
-        asyncio.create_task(orchestrator.introduce_team(chat_id))
+        orchestrator.supervisor.spawn(chat_id, orchestrator.introduce_team(chat_id), "intro")
 
 async def sus_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
@@ -101,23 +105,78 @@ async def ozet_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not summarized:
             await update.message.reply_text("ℹ️ Özetlenecek aktif bir toplantı bulunamadı.")
 
+async def durum_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    if not orchestrator:
+        return
+    status = await orchestrator.status(chat_id)
+
+    lines = ["📊 **Kurul Durumu**", ""]
+    meeting = status['meeting']
+    if meeting:
+        state = "durduruluyor" if meeting['stopped'] else f"Tur {meeting.get('round') or 0}/3"
+        lines.append(f"📋 **Toplantı:** {meeting['topic']} ({state})")
+    elif status['running_elsewhere']:
+        lines.append("📋 Bu sohbetin toplantısı başka bir sunucuda sürüyor.")
+    else:
+        lines.append("📋 Bu sohbette aktif toplantı yok.")
+
+    if status['tasks']:
+        tasks = ", ".join(f"{task['name']} ({task['age']:.0f} sn)" for task in status['tasks'])
+        lines.append(f"⚙️ **Görevler:** {tasks}")
+    lines.append(f"🏛 **Kapasite:** {status['running']}/{status['capacity']} toplantı, sırada {status['queued']}")
+    await update.message.reply_text("\n".join(lines))
+
+async def ara_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args:
+        await update.message.reply_text("Lütfen aranacak kelimeleri yazın. Örnek: `/ara abonelik fiyatlandırma`")
+        return
+    if not orchestrator:
+        return
+
+    query = " ".join(context.args)
+    results = await orchestrator.search.search(query, update.effective_chat.id)
+    if not results:
+        await update.message.reply_text(f"🔎 \"{query}\" için sonuç bulunamadı.")
+        return
+
+    lines = [f"🔎 **\"{query}\"** için {len(results)} toplantı bulundu:", ""]
+    for index, result in enumerate(results, 1):
+        date = result['created_at'].strftime('%d.%m.%Y') if result['created_at'] else "?"
+        lines.append(f"{index}. **{result['topic']}** ({date}, #{result['meeting_id']})")
+        for hit in result['hits']:
+            lines.append(f"   • {hit['bot_name']}: {hit['snippet']}")
+        lines.append("")
+    await update.message.reply_text("\n".join(lines).strip())
+
 async def main():
     global bot_manager, orchestrator
 
-    # 1. Database Init
-    logger.info("Initializing Database...")
-    await init_db()
-
-    # 2. Components Init
-    logger.info("Initializing Components...")
+    # SIGTERM (docker stop, deploys) and SIGINT cancel main() so the shutdown in its finally block runs
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, main_task.cancel)
+
+    # 0. Observability: OTLP traces (if configured) and a standalone /metrics endpoint for polling mode
+    setup_tracing()
+    track_db_pool(pool_stats)
+    metrics_server = MetricsServer.from_env()
+    if metrics_server:
+        await metrics_server.start()
+
+    # 1. Database and listening bots are initialized concurrently (send-only bots on first use)
+    logger.info("Initializing Database and Bots...")
     bot_manager = BotManager()
-    gemini_client = GeminiClient()
-    orchestrator = Orchestrator(bot_manager, gemini_client)
+    await asyncio.gather(init_db(), bot_manager.initialize_bots())
 
-    # 3. Initialize Bots
-    await bot_manager.initialize_bots()
+    # 2. Components Init (resumes orphaned meetings, so the schema must be ready)
+    logger.info("Initializing Components...")
+    llm = LLMRouter.from_personas(bot_manager.personas)
+    orchestrator = Orchestrator(bot_manager, llm)
+    await orchestrator.start()
 
-    # 4. Attach Handlers to Chairman Bot
+    # 3. Attach Handlers to Chairman Bot
     # Only Chairman listens for commands to avoid duplicate replies if all bots are in group
     chairman_app = bot_manager.get_bot_app("Chairman")
     if chairman_app:
@@ -127,16 +186,29 @@ async def main():
         chairman_app.add_handler(CommandHandler("tanis", tanis_command))
         chairman_app.add_handler(CommandHandler("sus", sus_command))
         chairman_app.add_handler(CommandHandler("ozet", ozet_command))
+        chairman_app.add_handler(CommandHandler("durum", durum_command))
+        chairman_app.add_handler(CommandHandler("ara", ara_command))
         logger.info("Handlers attached to Chairman.")
     else:
         logger.error("Chairman bot not found! Check personas.json and .env")
 
-    # 5. Start EVERYTHING
+    # 4. Start EVERYTHING
     logger.info("Starting Bot Symphony...")
-    await bot_manager.start_polling()
+    try:
+        await bot_manager.start()
+    finally:
+        # Flush buffered meeting messages before exiting
+        await orchestrator.shutdown()
+        # Then stop polling / the webhook server and shut the bots down
+        await bot_manager.stop()
+        logger.info(f"DB pool stats: {pool_stats()}")
+        await engine.dispose()
+        if metrics_server:
+            await metrics_server.stop()
+        shutdown_tracing()
 
 if __name__ == "__main__":
     try:
         asyncio.run(main())
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         pass
@@ -0,0 +1,434 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_STOP = "stop"
+SIGNAL_SUMMARY = "summary"
+
+
+class MeetingStateBackend:
+    """
+    Meeting state shared by every worker process.
+
+    - Ownership: `claim(chat_id)` succeeds for exactly one worker at a time; the
+      owner runs the chat's meeting and releases the chat when it ends.
+    - Signals: `publish(chat_id, signal)` delivers /sus and /ozet to every worker,
+      and the owner acts on them (handlers registered with `subscribe`).
+    - Ownership loss: when the backend can no longer guarantee a chat is this
+      worker's alone (connection dropped, key expired), the chat leaves `owned`
+      and the handlers registered with `on_ownership_lost` stop its meeting.
+    - Jobs: meeting start requests are queued with `enqueue` and each one is
+      handed to a single worker by `next_job`.
+    """
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.owned = set()  # chat ids this worker holds
+        self._handlers = []
+        self._ownership_handlers = []
+        self._handler_tasks = set()  # running handlers, referenced until they finish
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def subscribe(self, handler):
+        """Registers `async handler(chat_id, signal)`, called for every published signal."""
+        self._handlers.append(handler)
+
+    def on_ownership_lost(self, handler):
+        """Registers `async handler(chat_id)`, called for every chat this worker held and lost."""
+        self._ownership_handlers.append(handler)
+
+    def _dispatch(self, chat_id, signal):
+        for handler in self._handlers:
+            self._run_handler(handler(chat_id, signal), f"Handling signal '{signal}' for chat {chat_id}")
+
+    def _lose_ownership(self, chat_ids):
+        for chat_id in chat_ids:
+            self.owned.discard(chat_id)
+            for handler in self._ownership_handlers:
+                self._run_handler(handler(chat_id), f"Handling lost ownership of chat {chat_id}")
+
+    def _run_handler(self, coro, description):
+        task = asyncio.create_task(coro)
+        self._handler_tasks.add(task)
+        task.add_done_callback(lambda task: self._on_handler_done(task, description))
+
+    def _on_handler_done(self, task, description):
+        self._handler_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"{description} failed", exc_info=task.exception())
+
+    async def claim(self, chat_id):
+        raise NotImplementedError
+
+    async def release(self, chat_id):
+        raise NotImplementedError
+
+    async def is_claimed(self, chat_id):
+        """True if any worker currently owns the chat."""
+        raise NotImplementedError
+
+    async def publish(self, chat_id, signal):
+        raise NotImplementedError
+
+    async def enqueue(self, job):
+        raise NotImplementedError
+
+    async def next_job(self):
+        """Waits for the next queued job (a dict with at least 'chat_id')."""
+        raise NotImplementedError
+
+    async def pending_jobs(self):
+        """Number of queued jobs no worker has taken yet."""
+        raise NotImplementedError
+
+
+class InMemoryMeetingState(MeetingStateBackend):
+    """Single-process backend; the default."""
+
+    def __init__(self):
+        super().__init__()
+        self._jobs = asyncio.Queue()
+
+    async def claim(self, chat_id):
+        if chat_id in self.owned:
+            return False
+        self.owned.add(chat_id)
+        return True
+
+    async def release(self, chat_id):
+        self.owned.discard(chat_id)
+
+    async def is_claimed(self, chat_id):
+        return chat_id in self.owned
+
+    async def publish(self, chat_id, signal):
+        self._dispatch(chat_id, signal)
+
+    async def enqueue(self, job):
+        await self._jobs.put(job)
+
+    async def next_job(self):
+        return await self._jobs.get()
+
+    async def pending_jobs(self):
+        return self._jobs.qsize()
+
+
+class PostgresMeetingState(MeetingStateBackend):
+    """
+    Ownership through session-level advisory locks held on a dedicated connection,
+    so a crashed worker's chats are released as soon as its connection drops.
+    Signals go over LISTEN/NOTIFY; jobs live in the meeting_jobs table and are
+    claimed with FOR UPDATE SKIP LOCKED, with a NOTIFY to wake idle workers.
+
+    If the connection drops, every chat it held is reported lost (the locks
+    went with it) and the connection is re-established in the background.
+    """
+
+    SIGNAL_CHANNEL = "board_meeting_signals"
+    JOB_CHANNEL = "board_meeting_jobs"
+
+    def __init__(self, dsn, poll_interval=5.0):
+        super().__init__()
+        self.dsn = dsn
+        self.poll_interval = poll_interval  # fallback job poll in case a NOTIFY is missed
+        self._conn = None
+        self._lock = asyncio.Lock()  # asyncpg connections run one query at a time
+        self._job_event = asyncio.Event()
+        self._reconnect_task = None
+        self._closing = False
+
+    async def start(self):
+        await self._connect()
+
+    async def _connect(self):
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn)
+        await conn.add_listener(self.SIGNAL_CHANNEL, self._on_signal)
+        await conn.add_listener(self.JOB_CHANNEL, self._on_job)
+        conn.add_termination_listener(self._on_terminated)
+        self._conn = conn
+
+    async def close(self):
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._conn is not None:
+            await self._conn.close()  # also releases every advisory lock
+            self._conn = None
+        self.owned.clear()
+
+    def _on_signal(self, connection, pid, channel, payload):
+        data = json.loads(payload)
+        self._dispatch(data["chat_id"], data["signal"])
+
+    def _on_job(self, connection, pid, channel, payload):
+        self._job_event.set()
+
+    def _on_terminated(self, connection):
+        if self._closing or connection is not self._conn:
+            return
+        logger.error(f"Meeting state connection lost, ownership of {len(self.owned)} chat(s) released")
+        self._lose_ownership(list(self.owned))
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        """Until it succeeds; queries fail meanwhile and their callers retry or report it."""
+        delay = 1
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                async with self._lock:
+                    await self._connect()
+            except Exception as e:
+                delay = min(delay * 2, 30)
+                logger.warning(f"Reconnecting meeting state failed, retrying in {delay}s: {e}")
+                continue
+            logger.info("Meeting state connection re-established")
+            self._job_event.set()  # jobs queued meanwhile sent no NOTIFY we saw
+            return
+
+    async def _fetchval(self, query, *args):
+        async with self._lock:
+            return await self._conn.fetchval(query, *args)
+
+    @staticmethod
+    def _lock_name(chat_id):
+        return f"board:chat:{chat_id}"
+
+    async def claim(self, chat_id):
+        # Advisory locks are re-entrant per session, so check local ownership first
+        if chat_id in self.owned:
+            return False
+        acquired = await self._fetchval(
+            "SELECT pg_try_advisory_lock(hashtextextended($1, 0))", self._lock_name(chat_id)
+        )
+        if acquired:
+            self.owned.add(chat_id)
+        return acquired
+
+    async def release(self, chat_id):
+        if chat_id not in self.owned:
+            return
+        self.owned.discard(chat_id)
+        await self._fetchval("SELECT pg_advisory_unlock(hashtextextended($1, 0))", self._lock_name(chat_id))
+
+    async def is_claimed(self, chat_id):
+        if chat_id in self.owned:
+            return True
+        # Nobody owns it if we can take the lock; give it straight back
+        async with self._lock:
+            acquired = await self._conn.fetchval(
+                "SELECT pg_try_advisory_lock(hashtextextended($1, 0))", self._lock_name(chat_id)
+            )
+            if acquired:
+                await self._conn.fetchval(
+                    "SELECT pg_advisory_unlock(hashtextextended($1, 0))", self._lock_name(chat_id)
+                )
+        return not acquired
+
+    async def publish(self, chat_id, signal):
+        payload = json.dumps({"chat_id": chat_id, "signal": signal})
+        await self._fetchval("SELECT pg_notify($1, $2)", self.SIGNAL_CHANNEL, payload)
+
+    async def enqueue(self, job):
+        async with self._lock:
+            async with self._conn.transaction():
+                await self._conn.execute(
+                    "INSERT INTO meeting_jobs (chat_id, payload) VALUES ($1, $2)", job["chat_id"], json.dumps(job)
+                )
+                await self._conn.execute("SELECT pg_notify($1, '')", self.JOB_CHANNEL)
+
+    async def next_job(self):
+        while True:
+            self._job_event.clear()
+            payload = await self._fetchval(
+                """
+                DELETE FROM meeting_jobs
+                WHERE id = (SELECT id FROM meeting_jobs ORDER BY id FOR UPDATE SKIP LOCKED LIMIT 1)
+                RETURNING payload
+                """
+            )
+            if payload is not None:
+                return json.loads(payload)
+            try:
+                await asyncio.wait_for(self._job_event.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def pending_jobs(self):
+        return await self._fetchval("SELECT count(*) FROM meeting_jobs")
+
+
+class RedisMeetingState(MeetingStateBackend):
+    """
+    Ownership through `SET NX PX` keys that the owner keeps refreshing, so a
+    crashed worker's chats free up after `owner_ttl` seconds. Signals go over
+    pub/sub; jobs are a list popped with BRPOP.
+
+    A chat whose key could not be refreshed for two thirds of `owner_ttl` is
+    reported lost before the key can expire and another worker claim it.
+    """
+
+    # Only touch the key if this worker still owns it
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+    _REFRESH = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+
+    def __init__(self, url, prefix="board", owner_ttl=30, poll_interval=5.0):
+        super().__init__()
+        self.url = url
+        self.prefix = prefix
+        self.owner_ttl = owner_ttl
+        self.poll_interval = poll_interval
+        self._redis = None
+        self._pubsub = None
+        self._tasks = []
+        self._refreshed_at = {}  # chat_id -> monotonic time its key was last set or refreshed
+
+    @property
+    def _signal_channel(self):
+        return f"{self.prefix}:meeting:signals"
+
+    @property
+    def _jobs_key(self):
+        return f"{self.prefix}:meeting:jobs"
+
+    def _owner_key(self, chat_id):
+        return f"{self.prefix}:meeting:owner:{chat_id}"
+
+    async def start(self):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("MEETING_STATE_BACKEND=redis requires the 'redis' package")
+
+        self._redis = redis.from_url(self.url, decode_responses=True)
+        await self._subscribe()
+        self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._refresh_ownership())]
+        for task in self._tasks:
+            task.add_done_callback(self._on_task_done)
+
+    @staticmethod
+    def _on_task_done(task):
+        if not task.cancelled():
+            logger.error(f"Meeting state task {task.get_coro().__name__} stopped", exc_info=task.exception())
+
+    async def _subscribe(self):
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(self._signal_channel)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        for chat_id in list(self.owned):
+            await self.release(chat_id)
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    async def _listen(self):
+        """Dispatches published signals; resubscribes after a connection error."""
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                async for message in self._pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    data = json.loads(message["data"])
+                    self._dispatch(data["chat_id"], data["signal"])
+                logger.error("Meeting signal subscription ended")
+            except Exception as e:
+                logger.error(f"Meeting signal subscription failed: {e}")
+            # Signals published until the resubscribe are missed
+            pubsub, self._pubsub = self._pubsub, None
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(self.poll_interval)
+
+    async def _refresh_ownership(self):
+        while True:
+            await asyncio.sleep(self.owner_ttl / 3)
+            for chat_id in list(self.owned):
+                try:
+                    kept = await self._redis.eval(self._REFRESH, 1, self._owner_key(chat_id), self.worker_id, int(self.owner_ttl * 1000))
+                except Exception as e:
+                    logger.warning(f"Refreshing ownership of chat {chat_id} failed: {e}")
+                    if time.monotonic() - self._refreshed_at.get(chat_id, 0) < self.owner_ttl * 2 / 3:
+                        continue
+                    kept = False  # the key may expire before the next attempt
+                if not kept:
+                    logger.error(f"Lost ownership of chat {chat_id}")
+                    self._refreshed_at.pop(chat_id, None)
+                    self._lose_ownership([chat_id])
+                else:
+                    self._refreshed_at[chat_id] = time.monotonic()
+
+    async def claim(self, chat_id):
+        if chat_id in self.owned:
+            return False
+        acquired = await self._redis.set(self._owner_key(chat_id), self.worker_id, nx=True, px=int(self.owner_ttl * 1000))
+        if acquired:
+            self.owned.add(chat_id)
+            self._refreshed_at[chat_id] = time.monotonic()
+        return bool(acquired)
+
+    async def release(self, chat_id):
+        if chat_id not in self.owned:
+            return
+        self.owned.discard(chat_id)
+        self._refreshed_at.pop(chat_id, None)
+        await self._redis.eval(self._RELEASE, 1, self._owner_key(chat_id), self.worker_id)
+
+    async def is_claimed(self, chat_id):
+        return chat_id in self.owned or bool(await self._redis.exists(self._owner_key(chat_id)))
+
+    async def publish(self, chat_id, signal):
+        await self._redis.publish(self._signal_channel, json.dumps({"chat_id": chat_id, "signal": signal}))
+
+    async def enqueue(self, job):
+        await self._redis.lpush(self._jobs_key, json.dumps(job))
+
+    async def next_job(self):
+        while True:
+            item = await self._redis.brpop(self._jobs_key, timeout=self.poll_interval)
+            if item is not None:
+                return json.loads(item[1])
+
+    async def pending_jobs(self):
+        return await self._redis.llen(self._jobs_key)
+
+
+def meeting_state_from_env():
+    """Builds the backend selected by MEETING_STATE_BACKEND (memory, postgres or redis)."""
+    backend = os.getenv("MEETING_STATE_BACKEND", "memory").lower()
+    if backend == "postgres":
+        from src.db import engine
+
+        if engine.dialect.name != "postgresql":
+            raise RuntimeError("MEETING_STATE_BACKEND=postgres requires a PostgreSQL DATABASE_URL")
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresMeetingState(dsn)
+    if backend == "redis":
+        return RedisMeetingState(
+            os.getenv("MEETING_STATE_REDIS_URL", "redis://localhost:6379/0"),
+            owner_ttl=float(os.getenv("MEETING_STATE_OWNER_TTL", "30")),
+        )
+    return InMemoryMeetingState()
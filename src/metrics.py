@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+try:
+    import prometheus_client
+except ImportError:  # metrics become no-ops
+    prometheus_client = None
+
+
+class _NullMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def set_function(self, function):
+        pass
+
+
+def _metric(kind, name, documentation, labelnames=(), **kwargs):
+    if prometheus_client is None:
+        return _NullMetric()
+    return getattr(prometheus_client, kind)(name, documentation, labelnames, **kwargs)
+
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+TURN_STAGE_SECONDS = _metric(
+    "Histogram", "board_turn_stage_seconds",
+    "Time spent in each stage of a meeting turn (history, llm, reply_target, telegram, db_log, stream)",
+    ["stage"], buckets=STAGE_BUCKETS,
+)
+LLM_CALLS = _metric("Counter", "board_llm_calls_total", "Completed LLM calls", ["model"])
+LLM_TOKENS = _metric("Counter", "board_llm_tokens_total", "LLM tokens by kind (prompt, response, cached)", ["model", "kind"])
+LLM_RETRIES = _metric("Counter", "board_llm_retries_total", "Retried LLM calls by reason", ["model", "reason"])
+RATE_LIMITED = _metric("Counter", "board_rate_limited_total", "429 / flood-control responses", ["service"])
+TELEGRAM_DROPPED = _metric("Counter", "board_telegram_dropped_total", "Messages that could not be delivered")
+TELEGRAM_OUTBOUND_CALLS = _metric(
+    "Counter", "board_telegram_outbound_calls_total", "Completed outbound Telegram calls by outcome (sent, failed)", ["outcome"]
+)
+TELEGRAM_OUTBOUND_RETRIES = _metric(
+    "Counter", "board_telegram_outbound_retries_total", "Retried outbound Telegram calls by reason (flood_wait, network)", ["reason"]
+)
+TELEGRAM_OUTBOUND_SECONDS = _metric(
+    "Histogram", "board_telegram_outbound_seconds", "Time from queueing an outbound Telegram call to its completion",
+    buckets=STAGE_BUCKETS,
+)
+TELEGRAM_OUTBOUND_QUEUE = _metric(
+    "Gauge", "board_telegram_outbound_queue", "Outbound Telegram queue (queue_depth, active_chats)", ["state"]
+)
+ACTIVE_MEETINGS = _metric("Gauge", "board_active_meetings", "Meetings running in this process")
+EVENT_LOOP_LAG = _metric("Gauge", "board_event_loop_lag_seconds", "How late the last event loop tick woke up")
+DB_POOL_CHECKOUT_WAIT = _metric(
+    "Histogram", "board_db_pool_checkout_wait_seconds", "Time a session waited for a pooled database connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_TIMEOUTS = _metric("Counter", "board_db_pool_timeouts_total", "Connection checkouts that hit DB_POOL_TIMEOUT")
+DB_POOL_CONNECTIONS = _metric(
+    "Gauge", "board_db_pool_connections", "Database pool connections (size, checked_out, overflow, capacity)", ["state"]
+)
+DB_POOL_SATURATION = _metric("Gauge", "board_db_pool_saturation", "Checked out connections / pool capacity")
+
+_tracer = None
+
+
+def setup_tracing():
+    """Exports spans over OTLP/HTTP when OTEL_EXPORTER_OTLP_ENDPOINT is set (needs opentelemetry-sdk)."""
+    global _tracer
+    if not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk / the OTLP exporter is not installed")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "board-bot")}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(__name__)
+    logger.info(f"Exporting traces to {os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')}")
+
+
+def shutdown_tracing():
+    """Flushes pending spans."""
+    if _tracer is not None:
+        from opentelemetry import trace
+        trace.get_tracer_provider().shutdown()
+
+
+def span(name, **attributes):
+    """Tracing span (no-op without OTLP export)."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes={k: v for k, v in attributes.items() if v is not None})
+
+
+@contextmanager
+def stage(name, **attributes):
+    """Times a turn stage into board_turn_stage_seconds and a span of the same name."""
+    start = time.perf_counter()
+    with span(name, **attributes) as current:
+        try:
+            yield current
+        finally:
+            TURN_STAGE_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+
+def _annotate(**attributes):
+    """Adds attributes to the current span, if any."""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+
+
+def record_llm_usage(model, prompt_tokens=None, response_tokens=None, cached_tokens=None, retries=0):
+    """Counts a completed LLM call and tags the enclosing 'llm' span with its token counts."""
+    LLM_CALLS.labels(model).inc()
+    for kind, tokens in (("prompt", prompt_tokens), ("response", response_tokens), ("cached", cached_tokens)):
+        if tokens:
+            LLM_TOKENS.labels(model, kind).inc(tokens)
+    _annotate(**{"llm.model": model, "llm.prompt_tokens": prompt_tokens, "llm.response_tokens": response_tokens,
+                 "llm.cached_tokens": cached_tokens, "llm.retries": retries})
+
+
+def record_llm_retry(model, reason):
+    """reason: 'rate_limit', 'server_error', 'network' or 'cache'."""
+    LLM_RETRIES.labels(model, reason).inc()
+    if reason == "rate_limit":
+        RATE_LIMITED.labels("llm").inc()
+
+
+def record_telegram_retry(reason):
+    """reason: 'flood_wait' or 'network'."""
+    TELEGRAM_OUTBOUND_RETRIES.labels(reason).inc()
+    if reason == "flood_wait":
+        RATE_LIMITED.labels("telegram").inc()
+
+
+def record_outbound_call(outcome, seconds):
+    """outcome: 'sent' or 'failed'; seconds from queueing to completion."""
+    TELEGRAM_OUTBOUND_CALLS.labels(outcome).inc()
+    TELEGRAM_OUTBOUND_SECONDS.observe(seconds)
+
+
+def record_dropped_message():
+    TELEGRAM_DROPPED.inc()
+
+
+def track_active_meetings(count):
+    """`count` is a zero-argument function read at scrape time."""
+    ACTIVE_MEETINGS.set_function(count)
+
+
+def record_db_checkout(wait):
+    DB_POOL_CHECKOUT_WAIT.observe(wait)
+
+
+def record_db_checkout_timeout():
+    DB_POOL_TIMEOUTS.inc()
+
+
+def track_outbound(stats):
+    """`stats` is BotManager.outbound_metrics, read at scrape time."""
+    for state in ("queue_depth", "active_chats"):
+        TELEGRAM_OUTBOUND_QUEUE.labels(state).set_function(lambda state=state: stats()[state])
+
+
+def track_db_pool(stats):
+    """`stats` is src.db.pool_stats, read at scrape time."""
+    for state in ("size", "checked_out", "overflow", "capacity"):
+        DB_POOL_CONNECTIONS.labels(state).set_function(lambda state=state: stats()[state])
+    DB_POOL_SATURATION.set_function(lambda: stats()['saturation'])
+
+
+async def monitor_event_loop(interval=0.5):
+    """Keeps board_event_loop_lag_seconds up to date; run it as a background task."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, time.perf_counter() - start - interval))
+
+
+async def handle_metrics(request):
+    """aiohttp handler serving the Prometheus text format."""
+    if prometheus_client is None:
+        return web.Response(status=501, text="prometheus_client is not installed\n")
+    return web.Response(body=prometheus_client.generate_latest(),
+                        headers={"Content-Type": prometheus_client.CONTENT_TYPE_LATEST})
+
+
+class MetricsServer:
+    """Standalone /metrics endpoint for polling mode (the webhook server serves it too)."""
+
+    def __init__(self, host="0.0.0.0", port=9100):
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    @classmethod
+    def from_env(cls):
+        """Returns None unless METRICS_PORT is set."""
+        port = int(os.getenv("METRICS_PORT", "0"))
+        if not port:
+            return None
+        return cls(host=os.getenv("METRICS_HOST", "0.0.0.0"), port=port)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
 
@@ -9,12 +9,23 @@ class Meeting(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     topic = Column(String, nullable=False)
-    status = Column(String, default="active") # active, completed
+    status = Column(String, default="active") # active, completed, stopped, interrupted
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_processed = Column(Boolean, default=False)
+
+    # Progress checkpoint, so a meeting can resume after a restart
+    chat_id = Column(BigInteger, nullable=True)
+    current_round = Column(Integer, default=0)
+    next_speaker_index = Column(Integer, default=0)  # index into Orchestrator.turn_order
+    reply_to_message_id = Column(Integer, nullable=True)  # Telegram id the next turn replies to
     
     messages = relationship("Message", back_populates="meeting", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ix_meetings_status_created_at', 'status', 'created_at'),
+        Index('ix_meetings_chat_id', 'chat_id'),
+    )
+
     def __repr__(self):
         return f"<Meeting(id={self.id}, topic='{self.topic}', status='{self.status}')>"
 
@@ -31,5 +42,67 @@ class Message(Base):
 
     meeting = relationship("Meeting", back_populates="messages")
 
+    __table_args__ = (
+        # History and reply-target lookups: WHERE meeting_id = ? ORDER BY id
+        Index('ix_messages_meeting_id_id', 'meeting_id', 'id'),
+    )
+
     def __repr__(self):
         return f"<Message(id={self.id}, bot='{self.bot_name}', round={self.round_number})>"
+
+
+class ResponseCacheEntry(Base):
+    __tablename__ = 'response_cache'
+
+    key = Column(String(64), primary_key=True)  # sha256 of (model, system instruction, context, prompt)
+    model = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ResponseCacheEntry(key='{self.key[:12]}', model='{self.model}')>"
+
+
+class MeetingArchive(Base):
+    """Finished meetings moved out of the hot tables by src.archive."""
+    __tablename__ = 'meetings_archive'
+
+    id = Column(Integer, primary_key=True)
+    topic = Column(String, nullable=False)
+    status = Column(String)
+    created_at = Column(DateTime(timezone=True))
+    is_processed = Column(Boolean)
+    chat_id = Column(BigInteger, nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_meetings_archive_created_at', 'created_at'),
+        Index('ix_meetings_archive_chat_id', 'chat_id'),
+    )
+
+
+class MessageArchive(Base):
+    __tablename__ = 'messages_archive'
+
+    id = Column(Integer, primary_key=True)
+    meeting_id = Column(Integer, nullable=False)
+    bot_name = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    round_number = Column(Integer)
+    telegram_message_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index('ix_messages_archive_meeting_id_id', 'meeting_id', 'id'),
+    )
+
+
+class MeetingJob(Base):
+    """Queued meeting start requests, claimed by worker processes (Postgres meeting-state backend)."""
+    __tablename__ = 'meeting_jobs'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chat_id = Column(BigInteger, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
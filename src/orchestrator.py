@@ -1,316 +1,729 @@
 import asyncio
 import logging
-import json
 import os
-from datetime import datetime
 from src.db import AsyncSessionLocal
-from src.models import Meeting, Message
-from src.ai_engine import GeminiClient
-from sqlalchemy import select, update
-from sqlalchemy.orm import Session
+from src.models import Meeting
+from src.ai_engine import PRIORITY_SUMMARY, PRIORITY_INTRO
+from src.llm import LLMRouter
+from src.transcript import MeetingTranscript
+from src.persistence import MessageWriter
+from src.meeting_state import meeting_state_from_env, SIGNAL_STOP, SIGNAL_SUMMARY
+from src.supervisor import TaskSupervisor
+from src.pacing import PacingPolicy
+from src.prompts import PromptRegistry
+from src.search import DecisionIndex, MeetingSearch
+from src import metrics
+from sqlalchemy import select
 
 logger = logging.getLogger(__name__)
 
+# Chat ids from here up are synthetic chats of headless batch runs (src.batch), never Telegram chats
+BATCH_CHAT_ID_BASE = 1 << 60
+
 class Orchestrator:
-    def __init__(self, bot_manager, gemini_client):
+    def __init__(self, bot_manager, llm):
         self.bot_manager = bot_manager
-        self.gemini_client = gemini_client
+        # LLMRouter picks each persona's backend; a single client serves everyone
+        self.llm = llm if isinstance(llm, LLMRouter) else LLMRouter(llm)
         self.turn_order = ["CTO", "CFO", "Growth", "Product", "Devil"] 
         self.rounds = 3
-        self.active_meetings = {}  # chat_id -> {'meeting_id': int, 'stopped': bool}
+        # sequential: one speaker at a time
+        # parallel: independent rounds (round 1) are generated concurrently
+        # pipelined: parallel + the next speaker is generated while the current one is posted
+        self.execution_mode = os.getenv("MEETING_EXECUTION_MODE", "sequential").lower()
+        # Stream replies into Telegram as they are generated (sequential turns and the summary)
+        self.stream_responses = os.getenv("STREAM_RESPONSES", "0") == "1"
+        # Delays between messages (PACING_PRESET: realistic, fast, zero)
+        self.pacing = PacingPolicy.from_env()
+        # /ara: full-text search over past meetings, plus the optional in-process semantic index
+        self.search = MeetingSearch.from_env()
+        # Summaries of similar past meetings quoted in new meetings' prompts (None = off)
+        self.decisions = DecisionIndex.from_env()
+        self.active_meetings = {}  # chat_id -> {'meeting_id': int, 'topic': str, 'stopped': bool, 'transcript': MeetingTranscript, 'round': int, 'prompts': PromptVersion}
+        # Handles of every meeting, summary and generation task, per chat
+        self.supervisor = TaskSupervisor()
+        self._summarized = set()  # meeting ids whose summary has started
+        
+        # Buffered (write-behind) persistence of messages and meeting status
+        self.writer = MessageWriter.from_env()
+
+        # Chat ownership, /sus and /ozet signals and the meeting job queue, shared across workers
+        self.state = meeting_state_from_env()
+        # Whether this process takes meeting jobs, and how many meetings it runs at once
+        self.run_worker = os.getenv("MEETING_WORKER", "1") == "1"
+        self.worker_capacity = int(os.getenv("MEETING_WORKER_CAPACITY", "10"))
+        # Seconds between scans for orphaned meetings to resume (0 = only at startup)
+        self.resume_interval = float(os.getenv("MEETING_RESUME_INTERVAL", "60"))
+        self._slots = asyncio.Semaphore(self.worker_capacity)
         
-        # Load company context from readme.json
-        self.company_context = self._load_company_context()
-    
-    def _load_company_context(self):
-        """Load company info from readme.json"""
+        # Persona instructions, company context and prompt templates, reloaded when the JSON files change
+        self.prompts = PromptRegistry.from_env()
+
+    async def start(self):
+        """Connects the meeting state backend and, on worker processes, starts taking meeting jobs."""
+        await self.state.start()
+        self.state.subscribe(self._on_signal)
+        self.state.on_ownership_lost(self._on_ownership_lost)
+        metrics.track_active_meetings(lambda: len(self.active_meetings))
+        self.supervisor.spawn(None, metrics.monitor_event_loop(), "loop-lag")
+        if self.search.semantic is not None:
+            self.supervisor.spawn(None, self.search.semantic.bootstrap(), "search-index")
+        if self.prompts.reload_interval > 0:
+            self.supervisor.spawn(None, self.prompts.watch(), "prompt-reload")
+        if self.run_worker:
+            if self.decisions is not None:
+                self.supervisor.spawn(None, self.decisions.refresh(), "decision-index")
+            self.supervisor.spawn(None, self._work(), "worker")
+            self.supervisor.spawn(None, self._resume_periodically(), "resume-scan")
+
+    async def request_meeting(self, chat_id, topic, user_id):
+        """
+        Queues a meeting; whichever worker has capacity picks it up.
+        Returns the number of queued meetings if this worker is full, else 0.
+        Listener-only processes don't know the workers' load and always return 0.
+        """
+        await self.state.enqueue({'chat_id': chat_id, 'topic': topic, 'user_id': user_id})
+        # Running meetings, not the semaphore: the idle worker loop holds a slot while it waits for a job
+        if not self.run_worker or len(self.active_meetings) < self.worker_capacity:
+            return 0
+        return await self.state.pending_jobs()
+
+    async def status(self, chat_id):
+        """Live status for /durum: the chat's meeting and tasks, plus this worker's load."""
+        meeting_data = self.active_meetings.get(chat_id)
+        meeting = None
+        if meeting_data:
+            meeting = {key: meeting_data.get(key) for key in ('meeting_id', 'topic', 'round', 'stopped')}
+        return {
+            'meeting': meeting,
+            'running_elsewhere': meeting is None and await self.state.is_claimed(chat_id),
+            'tasks': self.supervisor.status(chat_id),
+            'running': len(self.active_meetings),
+            'capacity': self.worker_capacity,
+            'queued': await self.state.pending_jobs(),
+        }
+
+    async def _work(self):
+        while True:
+            # Only take a job when there is room for it, so busy workers leave it to the others
+            await self._slots.acquire()
+            try:
+                job = await self.state.next_job()
+            except asyncio.CancelledError:
+                self._slots.release()
+                raise
+            except Exception as e:
+                self._slots.release()
+                logger.error(f"Fetching meeting job failed: {e}")
+                await asyncio.sleep(5)
+                continue
+            self.supervisor.spawn(job['chat_id'], self._run_job(job), "job")
+
+    async def _run_job(self, job):
         try:
-            readme_path = os.path.join(os.path.dirname(__file__), 'readme.json')
-            with open(readme_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # Format as readable context
-            company = data.get('company', {})
-            budget = data.get('budget', {})
-            priorities = data.get('priorities', [])
-            tech = data.get('tech_stack', {})
-            
-            context = f"""
-ŞİRKET BİLGİLERİ:
-- Şirket: {company.get('name', 'Belirtilmemiş')}
-- Sektör: {company.get('sector', 'Belirtilmemiş')}
-- Açıklama: {company.get('description', '')}
-- Ekip: {company.get('team_size', '?')} kişi
-- Konum: {company.get('location', 'Belirtilmemiş')}
-
-BÜTÇE:
-- Aylık Bütçe: {budget.get('monthly_budget_try', '?')} {budget.get('currency', 'TRY')}
-- Not: {budget.get('notes', '')}
-
-TEKNOLOJİ:
-- Diller: {', '.join(tech.get('primary_languages', []))}
-- Framework: {', '.join(tech.get('frameworks', []))}
-- Altyapı: {', '.join(tech.get('infrastructure', []))}
-
-ÖNCELİKLER: {', '.join(priorities)}
-"""
-            logger.info("Company context loaded from readme.json")
-            return context
+            loop_task = await self.start_new_meeting(job['chat_id'], job['topic'], job.get('user_id'))
+            if loop_task:
+                await loop_task
         except Exception as e:
-            logger.warning(f"Could not load readme.json: {e}")
-            return ""
+            logger.error(f"Meeting job for chat {job['chat_id']} failed: {e}")
+        finally:
+            self._slots.release()
+
+    async def _resume_periodically(self):
+        while True:
+            try:
+                await self.resume_meetings()
+            except Exception as e:
+                logger.error(f"Resuming meetings failed: {e}")
+            if self.resume_interval <= 0:
+                return
+            await asyncio.sleep(self.resume_interval)
+
+    async def resume_meetings(self):
+        """
+        Continues active meetings that no worker owns (e.g. after a crash or
+        restart) from their next unplayed turn. Returns the loop tasks started.
+        """
+        async with AsyncSessionLocal() as session:
+            stmt = (
+                select(Meeting)
+                .where(Meeting.status == "active", Meeting.chat_id.isnot(None), Meeting.chat_id < BATCH_CHAT_ID_BASE)
+                .order_by(Meeting.id.desc())
+            )
+            meetings = (await session.execute(stmt)).scalars().all()
+
+        resumed = []
+        seen_chats = set()
+        for meeting in meetings:
+            chat_id = meeting.chat_id
+            if chat_id in seen_chats or chat_id in self.active_meetings:
+                if chat_id in seen_chats:
+                    # An older meeting the newer one in this chat replaced
+                    await self.writer.update_meeting(meeting.id, status="interrupted")
+                continue
+            seen_chats.add(chat_id)
+
+            if self._slots.locked():
+                break  # at capacity; another worker or the next scan picks the rest up
+            if not await self.state.claim(chat_id):
+                continue  # a live worker still runs it
+
+            await self._slots.acquire()
+            resumed.append(self.supervisor.spawn(chat_id, self._resume(meeting), "resume"))
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} meeting(s)")
+        return resumed
+
+    async def _resume(self, meeting):
+        meeting_id = None  # set once the meeting is registered locally
+        loop_task = None
+        try:
+            start_round = max(meeting.current_round or 0, 1)
+            start_speaker = meeting.next_speaker_index or 0
+            if start_speaker >= len(self.turn_order):
+                start_round, start_speaker = start_round + 1, 0
+
+            transcript = await MeetingTranscript.load(meeting.id)
+            self.active_meetings[meeting.chat_id] = {
+                'meeting_id': meeting.id,
+                'topic': meeting.topic,
+                'stopped': False,
+                'transcript': transcript,
+                'round': start_round,
+                'prompts': self.prompts.current  # the version it started with is not kept across restarts
+            }
+            meeting_id = meeting.id
+            logger.info(f"Resuming meeting {meeting.id} at round {start_round}, speaker {start_speaker}")
+            await self._retrieve_decisions(meeting.chat_id, meeting.id, meeting.topic)
+
+            round_label = f"Tur {start_round}/3" if start_round <= 3 else "özet"
+            resume_text = f"🔄 Toplantı kaldığı yerden devam ediyor ({round_label})."
+            await self.bot_manager.send_message(
+                "Chairman", meeting.chat_id, resume_text, reply_to_message_id=meeting.reply_to_message_id
+            )
+            self.pacing.posted(meeting.chat_id, resume_text)
+            loop_task = self._spawn_loop(
+                meeting.chat_id, meeting.id,
+                self.run_meeting_loop(meeting.chat_id, meeting.id, meeting.topic, start_round, start_speaker)
+            )
+            if loop_task:
+                await loop_task
+        except Exception as e:
+            logger.error(f"Resuming meeting {meeting.id} failed: {e}")
+        finally:
+            try:
+                if loop_task is None:
+                    await self._abandon_start(meeting.chat_id, meeting_id)
+            finally:
+                self._slots.release()
+
+    async def _on_signal(self, chat_id, signal):
+        """Acts on /sus and /ozet published by any worker, if this worker runs the chat's meeting."""
+        if chat_id not in self.active_meetings:
+            return
+        if signal == SIGNAL_STOP:
+            await self._stop_local(chat_id)
+        elif signal == SIGNAL_SUMMARY:
+            await self._summarize_local(chat_id)
+
+    async def _on_ownership_lost(self, chat_id):
+        """Another worker may claim the chat now: stop its meeting here but leave it 'active', so exactly one worker resumes it."""
+        meeting_data = self.active_meetings.get(chat_id)
+        if meeting_data is None:
+            return
+        logger.error(f"Lost ownership of chat {chat_id}, stopping meeting {meeting_data.get('meeting_id')} on this worker")
+        meeting_data['stopped'] = True  # also keeps _abandon_start from marking it interrupted
+        self.supervisor.cancel(chat_id)
 
     async def stop_meeting(self, chat_id):
-        """Stops the active meeting for a chat."""
+        """Stops the active meeting for a chat, wherever it runs."""
         if chat_id in self.active_meetings:
-            self.active_meetings[chat_id]['stopped'] = True
-            meeting_id = self.active_meetings[chat_id].get('meeting_id')
-            if meeting_id:
-                async with AsyncSessionLocal() as session:
-                    stmt = update(Meeting).where(Meeting.id == meeting_id).values(status="stopped")
-                    await session.execute(stmt)
-                    await session.commit()
+            await self._stop_local(chat_id)
+            return True
+        if await self.state.is_claimed(chat_id):
+            await self.state.publish(chat_id, SIGNAL_STOP)
             return True
         return False
 
+    async def _stop_local(self, chat_id):
+        self.active_meetings[chat_id]['stopped'] = True
+        meeting_id = self.active_meetings[chat_id].get('meeting_id')
+        if meeting_id:
+            # Written by _finish_meeting before the chat is released, so it is never resumed
+            await self.writer.checkpoint(meeting_id, status="stopped")
+        # Abort in-flight generations and sends right away instead of after the current turn
+        self.supervisor.cancel(chat_id)
+
     async def force_summary(self, chat_id):
-        """Forces summary of the active meeting."""
+        """Forces summary of the active meeting, wherever it runs."""
         if chat_id in self.active_meetings:
-            meeting_data = self.active_meetings[chat_id]
-            meeting_id = meeting_data.get('meeting_id')
-            topic = meeting_data.get('topic', 'Belirtilmemiş')
-            if meeting_id:
-                self.active_meetings[chat_id]['stopped'] = True
-                await self.summarize_meeting(chat_id, meeting_id, topic)
-                return True
-        return False 
+            return await self._summarize_local(chat_id)
+        if await self.state.is_claimed(chat_id):
+            await self.state.publish(chat_id, SIGNAL_SUMMARY)
+            return True
+        return False
 
-    async def start_new_meeting(self, chat_id, topic, user_id):
-        """Initiates a new meeting."""
-        
-        # 1. Create DB Record
-        async with AsyncSessionLocal() as session:
-            new_meeting = Meeting(topic=topic, status="active")
-            session.add(new_meeting)
-            await session.commit()
-            await session.refresh(new_meeting)
-            meeting_id = new_meeting.id
+    async def _summarize_local(self, chat_id):
+        meeting_data = self.active_meetings[chat_id]
+        meeting_id = meeting_data.get('meeting_id')
+        topic = meeting_data.get('topic', 'Belirtilmemiş')
+        if not meeting_id:
+            return False
+        if meeting_id in self._summarized or meeting_data.get('summary_pending'):
+            return True  # the summary is already being written
 
-        logger.info(f"Starting meeting {meeting_id} on '{topic}'")
-        
-        # Register active meeting
-        self.active_meetings[chat_id] = {
-            'meeting_id': meeting_id,
-            'topic': topic,
-            'stopped': False
-        }
+        meeting_data['stopped'] = True
+        meeting_data['summary_pending'] = True  # the summary task, not the loop, closes the meeting
+        # Drop the in-flight turn so its message can't land after (or race with) the summary
+        self.supervisor.cancel(chat_id, "meeting")
+        self.supervisor.spawn(chat_id, self._forced_summary(chat_id, meeting_id, topic), "summary")
+        return True
 
-        # 2. Chairman Opening
-        chairman_intro = f"🔔 **Yönetim Kurulu Toplantısı Başladı**\n\n📋 **Gündem:** {topic}\n\nToplantıyı açıyorum. Söz sırası: Teknoloji Lideri (CTO) ile başlıyoruz."
-        sent_msg = await self.bot_manager.send_message("Chairman", chat_id, chairman_intro)
+    async def _forced_summary(self, chat_id, meeting_id, topic):
+        try:
+            await self.summarize_meeting(chat_id, meeting_id, topic)
+        finally:
+            await self._finish_meeting(chat_id, meeting_id)
 
-        # 3. Log Chairman Message
-        await self.log_message(meeting_id, "Chairman", chairman_intro, 0, sent_msg.message_id if sent_msg else None)
+    async def start_new_meeting(self, chat_id, topic, user_id):
+        """Initiates a new meeting and returns its loop task (None if the chat already has one)."""
 
-        # 4. Start Orchestration Loop
-        asyncio.create_task(self.run_meeting_loop(chat_id, meeting_id, topic))
+        # 0. Become the chat's only owner
+        if not await self.state.claim(chat_id):
+            await self.bot_manager.send_message("Chairman", chat_id, "⏳ Bu sohbette zaten devam eden bir toplantı var. Önce /sus veya /ozet kullanın.")
+            return None
 
-    async def run_meeting_loop(self, chat_id, meeting_id, topic):
-        """Main loop that iterates through 3 rounds with different prompts."""
-        
-        # Small delay before starting
-        await asyncio.sleep(2)
-        
-        # Round definitions with specific purposes
-        round_configs = [
-            {
-                "round": 1,
-                "name": "İLK GÖRÜŞLER",
-                "prompt": f"'{topic}' konusu hakkında ilk değerlendirmeni yap. Kendi uzmanlık alanından (rolünden) bakarak kısa ve net bir görüş bildir. Henüz tartışma yok, sadece kendi fikrini söyle."
-            },
-            {
-                "round": 2,
-                "name": "TARTIŞMA",
-                "prompt": f"Diğer üyelerin '{topic}' hakkındaki görüşlerini duydun. Şimdi onların söylediklerine yanıt ver, eleştir veya destekle. Özellikle sana zıt görüşlere cevap ver. Tartışmacı ol ama profesyonel kal."
-            },
-            {
-                "round": 3,
-                "name": "SON SÖZLER",
-                "prompt": f"Tartışma bitti. '{topic}' hakkındaki SON fikrini söyle. Lehte mi aleyhte mi olduğunu net belirt. Tek cümlelik kesin bir yargı ver."
+        registered_id = None  # set once the meeting is registered locally
+        loop_task = None
+        try:
+            # 1. Create DB Record
+            async with AsyncSessionLocal() as session:
+                new_meeting = Meeting(topic=topic, status="active", chat_id=chat_id, current_round=0, next_speaker_index=0)
+                session.add(new_meeting)
+                await session.flush()  # assigns the id without a separate refresh query
+                meeting_id = new_meeting.id
+                await session.commit()
+
+            logger.info(f"Starting meeting {meeting_id} on '{topic}'")
+
+            # Register active meeting
+            self.active_meetings[chat_id] = {
+                'meeting_id': meeting_id,
+                'topic': topic,
+                'stopped': False,
+                'transcript': MeetingTranscript(meeting_id),
+                'prompts': self.prompts.current  # pinned: prompt reloads only affect new meetings
             }
-        ]
+            registered_id = meeting_id
+
+            # 2. Chairman Opening
+            chairman_intro = f"🔔 **Yönetim Kurulu Toplantısı Başladı**\n\n📋 **Gündem:** {topic}\n\nToplantıyı açıyorum. Söz sırası: Teknoloji Lideri (CTO) ile başlıyoruz."
+            sent_msg = await self.bot_manager.send_message("Chairman", chat_id, chairman_intro)
+            self.pacing.posted(chat_id, chairman_intro)
+
+            # 3. Log Chairman Message
+            intro_msg_id = sent_msg.message_id if sent_msg else None
+            await self.log_message(meeting_id, "Chairman", chairman_intro, 0, intro_msg_id,
+                                   checkpoint={'reply_to_message_id': intro_msg_id})
+
+            # 4. Earlier board decisions on similar topics
+            await self._retrieve_decisions(chat_id, meeting_id, topic)
+
+            # 5. Start Orchestration Loop (unless /sus or /ozet closed the meeting meanwhile)
+            loop_task = self._spawn_loop(chat_id, meeting_id, self.run_meeting_loop(chat_id, meeting_id, topic))
+            return loop_task
+        finally:
+            # Cancelled by /sus, summarized by /ozet or failed before the loop existed
+            if loop_task is None:
+                await self._abandon_start(chat_id, registered_id)
+
+    def _spawn_loop(self, chat_id, meeting_id, loop):
+        """
+        Spawns the meeting loop, unless /sus or /ozet closed the meeting while it
+        was being opened (then None; the caller closes or leaves it to the summary).
+        """
+        meeting_data = self.active_meetings.get(chat_id)
+        if not meeting_data or meeting_data.get('meeting_id') != meeting_id or meeting_data.get('stopped'):
+            loop.close()
+            return None
+        return self.supervisor.spawn(chat_id, loop, "meeting")
+
+    async def _abandon_start(self, chat_id, meeting_id):
+        """Closes a claimed chat whose meeting loop was never spawned, like the loop's own cleanup would."""
+        meeting_data = self.active_meetings.get(chat_id)
+        if meeting_id is None:
+            await self.state.release(chat_id)  # nothing registered yet
+            return
+        if meeting_data is None or meeting_data.get('meeting_id') != meeting_id:
+            return  # already finished, e.g. by a forced summary
+        if meeting_data.get('summary_pending'):
+            return  # the summary task closes the meeting
+        if not meeting_data.get('stopped'):
+            # Failed while opening; not resumed again
+            await self.writer.checkpoint(meeting_id, status="interrupted")
+        await self._finish_meeting(chat_id, meeting_id)
+
+    async def _retrieve_decisions(self, chat_id, meeting_id, topic):
+        """Stores the past-decisions prompt section for the meeting; a failure only costs the extra context."""
+        if self.decisions is None:
+            return
+        try:
+            with metrics.stage("decisions"):
+                decisions = await self.decisions.retrieve(chat_id, topic, exclude_meeting_id=meeting_id)
+        except Exception as e:
+            logger.error(f"Retrieving past decisions for meeting {meeting_id} failed: {e}")
+            return
+        meeting_data = self.active_meetings.get(chat_id)
+        if decisions and meeting_data and meeting_data.get('meeting_id') == meeting_id:
+            meeting_data['past_decisions'] = self.decisions.context_block(decisions)
+            logger.info(f"Meeting {meeting_id}: quoting {len(decisions)} past decision(s) "
+                        f"(meetings {', '.join(str(d['meeting_id']) for d in decisions)})")
+
+    def _prompts(self, chat_id):
+        """The prompt version the chat's meeting started with (the current one outside meetings)."""
+        meeting_data = self.active_meetings.get(chat_id) or {}
+        return meeting_data.get('prompts') or self.prompts.current
+
+    def _past_decisions(self, chat_id):
+        meeting_data = self.active_meetings.get(chat_id) or {}
+        return meeting_data.get('past_decisions', "")
+
+    def _is_stopped(self, chat_id):
+        return self.active_meetings.get(chat_id, {}).get('stopped', False)
+
+    async def run_meeting_loop(self, chat_id, meeting_id, topic, start_round=1, start_speaker=0):
+        """Main loop that iterates through 3 rounds with different prompts, optionally resuming mid-meeting."""
+        try:
+            await self._run_rounds(chat_id, meeting_id, topic, start_round, start_speaker)
+        except Exception as e:
+            # Not resumed: it would fail the same way again on every resume scan
+            logger.error(f"Meeting {meeting_id} failed: {e}")
+            await self.writer.checkpoint(meeting_id, status="interrupted")
+            raise
+        finally:
+            meeting_data = self.active_meetings.get(chat_id)
+            if not (meeting_data and meeting_data.get('summary_pending')):
+                await self._finish_meeting(chat_id, meeting_id)
+
+    async def _finish_meeting(self, chat_id, meeting_id):
+        """Stopped, finished or failed: forget the meeting and hand the chat back."""
+        meeting_data = self.active_meetings.get(chat_id)
+        if meeting_data and meeting_data.get('meeting_id') == meeting_id:
+            del self.active_meetings[chat_id]
+        self._summarized.discard(meeting_id)
+        self.pacing.forget(chat_id)
+        try:
+            # Persist the final status before another worker could see the chat as free
+            await self.writer.flush(meeting_id)
+        except Exception:
+            pass  # already logged; stays buffered for the next flush
+        await self.state.release(chat_id)
+
+    async def _run_rounds(self, chat_id, meeting_id, topic, start_round, start_speaker):
+        for config in self._prompts(chat_id).round_configs(topic):
+            current_round = config["round"]
+            if current_round < start_round:
+                continue  # already played before a restart
 
-        for config in round_configs:
             # Check if meeting was stopped
-            if self.active_meetings.get(chat_id, {}).get('stopped', False):
+            if self._is_stopped(chat_id):
                 logger.info(f"Meeting {meeting_id} was stopped by user.")
                 return
             
-            current_round = config["round"]
             round_name = config["name"]
             round_prompt = config["prompt"]
+            first_speaker = start_speaker if current_round == start_round else 0
             
-            logger.info(f"Meeting {meeting_id} - Round {current_round}: {round_name}")
-            
-            # Announce Round
-            await self.bot_manager.send_message("Chairman", chat_id, f"📢 **{round_name}** (Tur {current_round}/3)")
-            await asyncio.sleep(1)
-
-            for persona_key in self.turn_order:
-                # Check if meeting was stopped
-                if self.active_meetings.get(chat_id, {}).get('stopped', False):
-                    logger.info(f"Meeting {meeting_id} was stopped by user.")
-                    return
-                    
-                await self.play_turn(chat_id, meeting_id, topic, persona_key, current_round, round_prompt)
-                await asyncio.sleep(4)  # Wait between speakers for realism
+            logger.info(f"Meeting {meeting_id} - Round {current_round}: {round_name} ({self.execution_mode})")
             
-            await asyncio.sleep(2)  # Pause between rounds
+            meeting_data = self.active_meetings.get(chat_id)
+            if meeting_data:
+                meeting_data['round'] = current_round
+
+            # Announce Round (unless resuming in the middle of it)
+            if first_speaker == 0:
+                announcement = f"📢 **{round_name}** (Tur {current_round}/3)"
+                await self.pacing.round_break(chat_id)
+                await self.bot_manager.send_message("Chairman", chat_id, announcement)
+                self.pacing.posted(chat_id, announcement)
+                await self.writer.checkpoint(meeting_id, current_round=current_round, next_speaker_index=0)
+
+            if self.execution_mode in ("parallel", "pipelined") and config["independent"]:
+                completed = await self._play_round_parallel(chat_id, meeting_id, topic, current_round, round_prompt, first_speaker)
+            elif self.execution_mode == "pipelined":
+                completed = await self._play_round_pipelined(chat_id, meeting_id, topic, current_round, round_prompt, first_speaker)
+            else:
+                completed = await self._play_round_sequential(chat_id, meeting_id, topic, current_round, round_prompt, first_speaker)
+
+            if not completed:
+                logger.info(f"Meeting {meeting_id} was stopped by user.")
+                return
 
         # End of Rounds - Summary
         await self.summarize_meeting(chat_id, meeting_id, topic)
-        
-        # Cleanup
-        if chat_id in self.active_meetings:
-            del self.active_meetings[chat_id]
+
+    async def _play_round_sequential(self, chat_id, meeting_id, topic, round_num, round_prompt, first_speaker=0):
+        """Each speaker generates and speaks in turn. Returns False if the meeting was stopped."""
+        for persona_key in self.turn_order[first_speaker:]:
+            if self._is_stopped(chat_id):
+                return False
+
+            await self.play_turn(chat_id, meeting_id, topic, persona_key, round_num, round_prompt)
+        return True
+
+    async def _play_round_parallel(self, chat_id, meeting_id, topic, round_num, round_prompt, first_speaker=0):
+        """
+        All speakers generate concurrently from the same history; messages are
+        still delivered in turn_order. Returns False if the meeting was stopped.
+        """
+        transcript = await self._get_transcript(chat_id, meeting_id)
+        history = transcript.history()
+        speakers = self.turn_order[first_speaker:]
+        tasks = [
+            self.supervisor.spawn(
+                chat_id, self._generate_turn(chat_id, topic, persona_key, round_num, round_prompt, history), f"generate:{persona_key}"
+            )
+            for persona_key in speakers
+        ]
+
+        try:
+            for persona_key, task in zip(speakers, tasks):
+                response_text = await task
+                if self._is_stopped(chat_id):
+                    return False
+
+                await self._deliver_turn(chat_id, meeting_id, persona_key, round_num, response_text)
+            return True
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _play_round_pipelined(self, chat_id, meeting_id, topic, round_num, round_prompt, first_speaker=0):
+        """
+        Speculatively generates the next speaker while the current message is
+        being posted. The next speaker already sees the current message, so the
+        debate stays coherent. Returns False if the meeting was stopped.
+        """
+        transcript = await self._get_transcript(chat_id, meeting_id)
+        pending = []  # generated but not yet logged messages
+
+        def spawn(persona_key):
+            history = transcript.history() + pending
+            return self.supervisor.spawn(
+                chat_id, self._generate_turn(chat_id, topic, persona_key, round_num, round_prompt, history), f"generate:{persona_key}"
+            )
+
+        speakers = self.turn_order[first_speaker:]
+        next_task = spawn(speakers[0])
+        try:
+            for index, persona_key in enumerate(speakers):
+                response_text = await next_task
+                if self._is_stopped(chat_id):
+                    return False
+
+                entry = {"bot_name": persona_key, "content": response_text, "round_number": round_num, "is_user": False}
+                pending.append(entry)
+                if index + 1 < len(speakers):
+                    next_task = spawn(speakers[index + 1])
+
+                await self._deliver_turn(chat_id, meeting_id, persona_key, round_num, response_text)
+                pending.remove(entry)  # now part of the transcript
+            return True
+        finally:
+            next_task.cancel()
 
     async def play_turn(self, chat_id, meeting_id, topic, persona_key, round_num, round_prompt):
         """Executes a single turn for a bot."""
-        
-        # 1. Fetch History (Context)
-        history = await self.get_meeting_history(meeting_id)
-        
-        # Determine Reply Target
-        reply_to_id = None
-        if history:
-            async with AsyncSessionLocal() as session:
-                stmt = select(Message).where(Message.meeting_id == meeting_id).order_by(Message.id.desc()).limit(1)
-                result = await session.execute(stmt)
-                last_msg = result.scalar_one_or_none()
-                if last_msg:
-                    reply_to_id = last_msg.telegram_message_id
-
-        # 2. Prepare System Prompt & Input
-        persona = self.bot_manager.bot_info.get(persona_key)
-        system_instruction = persona.get('system_instruction', '')
-        
-        # Use the round-specific prompt with company context
-        user_input_prompt = f"""
-{self.company_context}
+        with metrics.span("turn", chat_id=chat_id, meeting_id=meeting_id, persona=persona_key, round=round_num):
+            # 1. History (Context) comes from the in-memory transcript
+            with metrics.stage("history"):
+                transcript = await self._get_transcript(chat_id, meeting_id)
+                history = transcript.history()
 
-TOPLANTI KONUSU: {topic}
-TUR: {round_num}/3
+            if self.stream_responses:
+                # 2+3. Stream the response straight into a Telegram message, then log it
+                await self._stream_turn(chat_id, meeting_id, topic, persona_key, round_num, round_prompt, history)
+                return
 
-{round_prompt}
+            # 2. Generate AI Response
+            response_text = await self._generate_turn(chat_id, topic, persona_key, round_num, round_prompt, history)
 
-ÖNEMLİ: 
-- Maksimum 4-5 cümle yaz
-- Rolüne uygun konuş
-- Gereksiz emoji kullanma
-- Şirket bilgilerini göz önünde bulundur (bütçe, teknoloji, öncelikler)
-"""
+            # 3. Send to Telegram and log
+            await self._deliver_turn(chat_id, meeting_id, persona_key, round_num, response_text)
 
-        # 3. Generate AI Response
-        try:
-            await self.bot_manager.get_bot_app(persona_key).bot.send_chat_action(chat_id=chat_id, action="typing")
-        except Exception as e:
-            logger.warning(f"Could not send typing action: {e}")
-        
-        # Simulate thinking time
-        await asyncio.sleep(2) 
-        response_text = await self.gemini_client.generate_response(system_instruction, history, user_input_prompt)
+    async def _generate_turn(self, chat_id, topic, persona_key, round_num, round_prompt, history):
+        """Generates a bot's message for a turn without posting it."""
+
+        # Prepare System Prompt & Input
+        prompts = self._prompts(chat_id)
+        system_instruction = prompts.system_instruction(persona_key)
+        user_input_prompt = prompts.turn_prompt(topic, round_num, round_prompt, self._past_decisions(chat_id))
 
-        # 4. Clean Response (Optional: Remove markdown code blocks if raw json comes)
+        await self.bot_manager.send_chat_action(persona_key, chat_id, "typing")
         
-        # 5. Send Message to Telegram
-        sent_msg = await self.bot_manager.send_message(persona_key, chat_id, response_text, reply_to_message_id=reply_to_id)
+        # Generation overlaps the reading time of the previous message (see PacingPolicy)
+        with metrics.stage("llm", persona=persona_key):
+            return await self.llm.for_persona(persona_key).generate_response(
+                system_instruction, history, user_input_prompt, chat_id=chat_id, static_context=prompts.company_context
+            )
+
+    async def _stream_turn(self, chat_id, meeting_id, topic, persona_key, round_num, round_prompt, history):
+        """Streams a bot's message into Telegram as it is generated, then logs it."""
+        prompts = self._prompts(chat_id)
+        system_instruction = prompts.system_instruction(persona_key)
+        user_input_prompt = prompts.turn_prompt(topic, round_num, round_prompt, self._past_decisions(chat_id))
+
+        with metrics.stage("reply_target"):
+            transcript = await self._get_transcript(chat_id, meeting_id)
+            reply_to_id = transcript.last_telegram_message_id
+
+        # The reply is visible while it is generated, so the previous one gets its reading time first
+        await self.pacing.wait(chat_id)
+
+        # Generation and delivery overlap, so they are timed together
+        with metrics.stage("stream", persona=persona_key):
+            chunks = self.llm.for_persona(persona_key).stream_response(
+                system_instruction, history, user_input_prompt, chat_id=chat_id, static_context=prompts.company_context
+            )
+            sent_msg, response_text = await self.bot_manager.send_streaming_message(
+                persona_key, chat_id, chunks, reply_to_message_id=reply_to_id
+            )
+        self.pacing.posted(chat_id, response_text)
+
+        msg_id_to_save = sent_msg.message_id if sent_msg else None
+        with metrics.stage("db_log"):
+            await self.log_message(meeting_id, persona_key, response_text, round_num, msg_id_to_save,
+                                   checkpoint=self._turn_checkpoint(round_num, persona_key, msg_id_to_save))
+
+    async def _deliver_turn(self, chat_id, meeting_id, persona_key, round_num, response_text):
+        """Posts a generated message as a reply to the latest message and logs it."""
+        with metrics.stage("reply_target"):
+            transcript = await self._get_transcript(chat_id, meeting_id)
+            reply_to_id = transcript.last_telegram_message_id
+
+        # Only waits for the part of the previous message's reading time that generation did not cover
+        await self.pacing.wait(chat_id)
+        with metrics.stage("telegram", persona=persona_key):
+            sent_msg = await self.bot_manager.send_message(persona_key, chat_id, response_text, reply_to_message_id=reply_to_id)
+        self.pacing.posted(chat_id, response_text)
         
-        # 6. Log to DB
         msg_id_to_save = sent_msg.message_id if sent_msg else None
-        await self.log_message(meeting_id, persona_key, response_text, round_num, msg_id_to_save)
+        with metrics.stage("db_log"):
+            await self.log_message(meeting_id, persona_key, response_text, round_num, msg_id_to_save,
+                                   checkpoint=self._turn_checkpoint(round_num, persona_key, msg_id_to_save))
+
+    def _turn_checkpoint(self, round_num, persona_key, telegram_message_id):
+        """Meeting progress after persona_key has spoken in round_num."""
+        return {
+            'current_round': round_num,
+            'next_speaker_index': self.turn_order.index(persona_key) + 1,
+            'reply_to_message_id': telegram_message_id,
+        }
 
     async def summarize_meeting(self, chat_id, meeting_id, topic):
-        """Chairman summarizes and closes the meeting."""
-        
-        history = await self.get_meeting_history(meeting_id)
-        persona = self.bot_manager.bot_info.get("Chairman")
-        
-        prompt = f"""
-        Toplantı bitti. Konu: '{topic}'.
-        Tüm konuşmaları analiz et.
-        1. Ortak Karar (Konsensüs) var mı?
-        2. En büyük risk nedir?
-        3. Sonuç: Yapalım mı, yapmayalım mı?
-        4. Oylama Sonucu (Sanal bir oylama uydur, örn: 3 Evet, 2 Hayır).
-        
-        Lider gibi konuş ve toplantıyı resmi olarak kapat.
-        """
-        
-        try:
-            await self.bot_manager.get_bot_app("Chairman").bot.send_chat_action(chat_id=chat_id, action="typing")
-        except Exception as e:
-            logger.warning(f"Could not send typing action: {e}")
-        
-        await asyncio.sleep(2)
-        summary_text = await self.gemini_client.generate_response(persona['system_instruction'], history, prompt)
+        """Chairman summarizes and closes the meeting (once, even if the loop and /ozet both ask)."""
+        async with self.supervisor.lock(chat_id, "summary"):
+            if meeting_id in self._summarized:
+                return
+            self._summarized.add(meeting_id)
+            await self._write_summary(chat_id, meeting_id, topic)
+
+    async def _write_summary(self, chat_id, meeting_id, topic):
+        transcript = await self._get_transcript(chat_id, meeting_id)
+        history = transcript.history()
+        prompts = self._prompts(chat_id)
+        system_instruction = prompts.system_instruction("Chairman")
+        prompt = prompts.summary_prompt(topic, self._past_decisions(chat_id))
+
+        if self.stream_responses:
+            await self.pacing.wait(chat_id)
+            chunks = self.llm.for_persona("Chairman").stream_response(
+                system_instruction, history, prompt, chat_id=chat_id, priority=PRIORITY_SUMMARY
+            )
+            sent_msg, summary_text = await self.bot_manager.send_streaming_message("Chairman", chat_id, chunks)
+        else:
+            await self.bot_manager.send_chat_action("Chairman", chat_id, "typing")
+
+            summary_text = await self.llm.for_persona("Chairman").generate_response(
+                system_instruction, history, prompt, chat_id=chat_id, priority=PRIORITY_SUMMARY
+            )
+            await self.pacing.wait(chat_id)
+            sent_msg = await self.bot_manager.send_message("Chairman", chat_id, summary_text)
 
-        sent_msg = await self.bot_manager.send_message("Chairman", chat_id, summary_text)
         await self.log_message(meeting_id, "Chairman", summary_text, 99, sent_msg.message_id if sent_msg else None)
         
-        # Close Meeting in DB
-        async with AsyncSessionLocal() as session:
-            stmt = update(Meeting).where(Meeting.id == meeting_id).values(status="completed", is_processed=True)
-            await session.execute(stmt)
-            await session.commit()
+        # Close Meeting in DB (flushes the meeting's buffered messages in the same transaction)
+        await self.writer.update_meeting(meeting_id, status="completed", is_processed=True)
+        if self.decisions is not None:
+            try:
+                await self.decisions.add_summary(chat_id, meeting_id, topic, summary_text)
+            except Exception as e:
+                logger.error(f"Indexing the decision of meeting {meeting_id} failed: {e}")
 
-    async def log_message(self, meeting_id, bot_name, content, round_num, telegram_message_id=None):
-        async with AsyncSessionLocal() as session:
-            msg = Message(
-                meeting_id=meeting_id, 
-                bot_name=bot_name, 
-                content=content, 
-                round_number=round_num,
-                telegram_message_id=telegram_message_id
-            )
-            session.add(msg)
-            await session.commit()
+    async def log_message(self, meeting_id, bot_name, content, round_num, telegram_message_id=None, checkpoint=None):
+        # Buffered; written in bulk by the MessageWriter, together with the meeting's progress checkpoint
+        await self.writer.add_message(meeting_id, bot_name, content, round_num, telegram_message_id, checkpoint)
+
+        # Keep the live transcript in sync so turns never re-read the meeting from the DB
+        chat_id, meeting_data = self._find_meeting(meeting_id)
+        if meeting_data is None:
+            return
+        transcript = meeting_data.get('transcript')
+        if transcript is not None:
+            transcript.append(bot_name, content, round_num, telegram_message_id)
+
+        # Search results are scoped to the chat the meeting runs in
+        await self.search.index_message(chat_id, meeting_id, bot_name, content, round_num)
+
+    def _find_meeting(self, meeting_id):
+        """(chat_id, meeting_data) of a registered meeting, or (None, None)."""
+        for chat_id, meeting_data in self.active_meetings.items():
+            if meeting_data.get('meeting_id') == meeting_id:
+                return chat_id, meeting_data
+        return None, None
+
+    def _find_transcript(self, meeting_id):
+        _, meeting_data = self._find_meeting(meeting_id)
+        return meeting_data.get('transcript') if meeting_data else None
+
+    async def _get_transcript(self, chat_id, meeting_id):
+        """Returns the live transcript, rebuilding it from the DB only if it is not in memory (e.g. after a restart)."""
+        transcript = self._find_transcript(meeting_id)
+        if transcript is None:
+            await self.writer.flush(meeting_id)
+            transcript = await MeetingTranscript.load(meeting_id)
+            meeting_data = self.active_meetings.get(chat_id)
+            if meeting_data and meeting_data.get('meeting_id') == meeting_id:
+                meeting_data['transcript'] = transcript
+        return transcript
+
+    async def shutdown(self):
+        """Cancels running tasks, writes all buffered messages and releases owned chats; call before the process exits."""
+        # Meetings stay 'active' in the DB, so a restarted worker resumes them
+        await self.supervisor.shutdown()
+        await self.writer.close()
+        await self.state.close()
+        await self.llm.close()
 
     async def introduce_team(self, chat_id):
         """Bots introduce themselves sequentially."""
         
         introduction_order = ["Chairman"] + self.turn_order
+        prompts = self.prompts.current
         
         for persona_key in introduction_order:
-            persona = self.bot_manager.bot_info.get(persona_key)
-            
             # Simple static introduction or dynamic
             # Let's use a dynamic one using Gemini for flavor, or static for speed.
             # Using prompt for flavor:
-            prompt = f"Kısaca kendini tanıt. Kimsin, ne iş yaparsın ve tarzın ne? Tek bir cümle ile söyle. Merhaba diyerek başla."
+            prompt = prompts.intro_prompt()
             
-            try:
-                await self.bot_manager.get_bot_app(persona_key).bot.send_chat_action(chat_id=chat_id, action="typing")
-            except Exception as e:
-                logger.warning(f"Could not send typing action: {e}")
+            await self.bot_manager.send_chat_action(persona_key, chat_id, "typing")
             
-            # Fast response
-            intro_text = await self.gemini_client.generate_response(persona['system_instruction'], [], prompt)
+            # Fast response; intros only depend on the persona, so they come from the response cache when possible
+            intro_text = await self.llm.for_persona(persona_key).generate_response(
+                prompts.system_instruction(persona_key), [], prompt, chat_id=chat_id, priority=PRIORITY_INTRO, cache=True
+            )
             
+            await self.pacing.wait(chat_id)
             await self.bot_manager.send_message(persona_key, chat_id, intro_text)
-            await asyncio.sleep(1.5) # Short pause between introductions
-
-    async def get_meeting_history(self, meeting_id):
-        async with AsyncSessionLocal() as session:
-            # Fetch last 30 messages to fit in context
-            stmt = select(Message).where(Message.meeting_id == meeting_id).order_by(Message.id.asc())
-            result = await session.execute(stmt)
-            messages = result.scalars().all()
-            
-            history_data = []
-            for m in messages:
-                history_data.append({
-                    "bot_name": m.bot_name,
-                    "content": m.content,
-                    "is_user": False # All db logs are treated as 'context'
-                })
-            return history_data
+            self.pacing.posted(chat_id, intro_text)
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PacingPolicy:
+    """
+    Decides how long a meeting waits between messages.
+
+    When a message is posted, the chat gets a reading time proportional to its
+    length (clamped to [min_gap, max_gap]). The next message is generated
+    meanwhile and only held back by whatever reading time is left when it is
+    ready, so slow generations add no extra delay. `round_pause` is added
+    on top before a new round is announced.
+    """
+
+    PRESETS = {
+        "realistic": {'reading_wpm': 300, 'min_gap': 2.0, 'max_gap': 8.0, 'round_pause': 2.0},
+        "fast": {'reading_wpm': 1200, 'min_gap': 0.5, 'max_gap': 2.0, 'round_pause': 0.5},
+        "zero": {'reading_wpm': 0, 'min_gap': 0.0, 'max_gap': 0.0, 'round_pause': 0.0},  # tests and batch runs
+    }
+
+    def __init__(self, reading_wpm=300, min_gap=2.0, max_gap=8.0, round_pause=2.0):
+        self.reading_wpm = reading_wpm  # 0 = no reading time
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self.round_pause = round_pause
+        self._ready_at = {}  # chat_id -> monotonic time the last message has been read
+
+    @classmethod
+    def preset(cls, name):
+        if name not in cls.PRESETS:
+            raise ValueError(f"Unknown pacing preset '{name}' (expected one of {', '.join(cls.PRESETS)})")
+        return cls(**cls.PRESETS[name])
+
+    @classmethod
+    def from_env(cls):
+        """PACING_PRESET (realistic, fast, zero), with optional per-value overrides."""
+        name = os.getenv("PACING_PRESET", "realistic").lower()
+        if name not in cls.PRESETS:
+            raise ValueError(f"Unknown PACING_PRESET '{name}' (expected one of {', '.join(cls.PRESETS)})")
+        values = dict(cls.PRESETS[name])
+        for key in values:
+            override = os.getenv(f"PACING_{key.upper()}")
+            if override:
+                values[key] = float(override)
+        return cls(**values)
+
+    def reading_time(self, text):
+        if not self.reading_wpm:
+            return 0.0
+        words = len(text.split()) if text else 0
+        return min(self.max_gap, max(self.min_gap, words / self.reading_wpm * 60))
+
+    def posted(self, chat_id, text):
+        """Records that `text` was just posted in the chat."""
+        self._ready_at[chat_id] = time.monotonic() + self.reading_time(text)
+
+    async def wait(self, chat_id, pause=0.0):
+        """Sleeps until the last message has been read, plus `pause`."""
+        delay = self._ready_at.get(chat_id, 0.0) + pause - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def round_break(self, chat_id):
+        await self.wait(chat_id, self.round_pause)
+
+    def forget(self, chat_id):
+        self._ready_at.pop(chat_id, None)
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+
+from sqlalchemy import insert, update
+
+from src.db import AsyncSessionLocal
+from src.models import Meeting, Message
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriter:
+    """
+    Write-behind persistence for meeting messages.
+
+    Messages are buffered per meeting and written with one bulk INSERT per flush.
+    A flush happens every `flush_interval` seconds, as soon as `batch_size`
+    messages are buffered, and synchronously whenever a meeting's status changes
+    (stop / completion) or the writer is closed at shutdown.
+    A batch size of 1 makes it write-through (one commit per message).
+    """
+
+    def __init__(self, flush_interval=2.0, batch_size=50):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._buffers = {}          # meeting_id -> [row dict]
+        self._meeting_updates = {}  # meeting_id -> {column: value}
+        self._lock = asyncio.Lock()
+        self._flusher = None
+        self._closed = False
+
+        # Counters for benchmarks / metrics
+        self.commits = 0
+        self.rows_written = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            flush_interval=float(os.getenv("DB_FLUSH_INTERVAL", "2.0")),
+            batch_size=int(os.getenv("DB_FLUSH_BATCH_SIZE", "50")),
+        )
+
+    @property
+    def pending(self):
+        return sum(len(rows) for rows in self._buffers.values())
+
+    async def add_message(self, meeting_id, bot_name, content, round_number, telegram_message_id=None, checkpoint=None):
+        """Buffers a message; `checkpoint` meeting columns are written in the same transaction."""
+        if checkpoint:
+            self._meeting_updates.setdefault(meeting_id, {}).update(checkpoint)
+        self._buffers.setdefault(meeting_id, []).append({
+            "meeting_id": meeting_id,
+            "bot_name": bot_name,
+            "content": content,
+            "round_number": round_number,
+            "telegram_message_id": telegram_message_id,
+        })
+        self._ensure_flusher()
+        if self.pending >= self.batch_size:
+            await self.flush()
+
+    async def checkpoint(self, meeting_id, **values):
+        """Queues meeting columns for the next flush, without forcing one."""
+        self._meeting_updates.setdefault(meeting_id, {}).update(values)
+        if self.batch_size <= 1:
+            await self.flush(meeting_id)
+        else:
+            self._ensure_flusher()
+
+    async def update_meeting(self, meeting_id, **values):
+        """Queues a status update for the meeting and flushes it together with its pending messages."""
+        self._meeting_updates.setdefault(meeting_id, {}).update(values)
+        await self.flush(meeting_id)
+
+    async def flush(self, meeting_id=None):
+        """Writes buffered rows (of one meeting, or all) in a single transaction."""
+        async with self._lock:
+            meeting_ids = [meeting_id] if meeting_id is not None else list(set(self._buffers) | set(self._meeting_updates))
+            rows = []
+            updates = {}
+            for mid in meeting_ids:
+                rows.extend(self._buffers.pop(mid, []))
+                if mid in self._meeting_updates:
+                    updates[mid] = self._meeting_updates.pop(mid)
+            if not rows and not updates:
+                return
+
+            try:
+                async with AsyncSessionLocal() as session:
+                    if rows:
+                        await session.execute(insert(Message), rows)
+                    for mid, values in updates.items():
+                        await session.execute(update(Meeting).where(Meeting.id == mid).values(**values))
+                    await session.commit()
+            except Exception as e:
+                # Put everything back so the next flush retries it
+                logger.error(f"Flushing {len(rows)} message(s) failed: {e}")
+                for row in reversed(rows):
+                    self._buffers.setdefault(row["meeting_id"], []).insert(0, row)
+                for mid, values in updates.items():
+                    self._meeting_updates[mid] = {**values, **self._meeting_updates.get(mid, {})}
+                raise
+
+            self.commits += 1
+            self.rows_written += len(rows)
+
+    async def close(self):
+        """Stops the periodic flusher and writes everything that is still buffered."""
+        self._closed = True
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def _ensure_flusher(self):
+        if self._closed or self.batch_size <= 1:
+            return
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass  # already logged; rows stay buffered for the next attempt
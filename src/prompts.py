@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+SRC_DIR = os.path.dirname(__file__)
+
+# Templates are parsed once; only str.format substitution happens per call
+COMPANY_CONTEXT_TEMPLATE = """
+ŞİRKET BİLGİLERİ:
+- Şirket: {name}
+- Sektör: {sector}
+- Açıklama: {description}
+- Ekip: {team_size} kişi
+- Konum: {location}
+
+BÜTÇE:
+- Aylık Bütçe: {monthly_budget} {currency}
+- Not: {budget_notes}
+
+TEKNOLOJİ:
+- Diller: {languages}
+- Framework: {frameworks}
+- Altyapı: {infrastructure}
+
+ÖNCELİKLER: {priorities}
+"""
+
+# Company context is passed separately as the static, cacheable prefix.
+# Past decisions differ per meeting, so they stay out of that prefix.
+TURN_TEMPLATE = """{past_decisions}
+TOPLANTI KONUSU: {topic}
+TUR: {round_num}/3
+
+{round_prompt}
+
+ÖNEMLİ:
+- Maksimum 4-5 cümle yaz
+- Rolüne uygun konuş
+- Gereksiz emoji kullanma
+- Şirket bilgilerini göz önünde bulundur (bütçe, teknoloji, öncelikler)
+"""
+
+SUMMARY_TEMPLATE = """{past_decisions}
+        Toplantı bitti. Konu: '{topic}'.
+        Tüm konuşmaları analiz et.
+        1. Ortak Karar (Konsensüs) var mı?
+        2. En büyük risk nedir?
+        3. Sonuç: Yapalım mı, yapmayalım mı?
+        4. Oylama Sonucu (Sanal bir oylama uydur, örn: 3 Evet, 2 Hayır).
+
+        Lider gibi konuş ve toplantıyı resmi olarak kapat.
+        """
+
+INTRO_PROMPT = "Kısaca kendini tanıt. Kimsin, ne iş yaparsın ve tarzın ne? Tek bir cümle ile söyle. Merhaba diyerek başla."
+
+# Round definitions with specific purposes
+ROUNDS = [
+    {
+        "round": 1,
+        "name": "İLK GÖRÜŞLER",
+        "prompt": "'{topic}' konusu hakkında ilk değerlendirmeni yap. Kendi uzmanlık alanından (rolünden) bakarak kısa ve net bir görüş bildir. Henüz tartışma yok, sadece kendi fikrini söyle.",
+        # Opinions are independent by design, so they can be generated concurrently
+        "independent": True
+    },
+    {
+        "round": 2,
+        "name": "TARTIŞMA",
+        "prompt": "Diğer üyelerin '{topic}' hakkındaki görüşlerini duydun. Şimdi onların söylediklerine yanıt ver, eleştir veya destekle. Özellikle sana zıt görüşlere cevap ver. Tartışmacı ol ama profesyonel kal.",
+        "independent": False
+    },
+    {
+        "round": 3,
+        "name": "SON SÖZLER",
+        "prompt": "Tartışma bitti. '{topic}' hakkındaki SON fikrini söyle. Lehte mi aleyhte mi olduğunu net belirt. Tek cümlelik kesin bir yargı ver.",
+        "independent": False
+    }
+]
+
+
+def render_company_context(data):
+    """Formats readme.json as readable context."""
+    company = data.get('company', {})
+    budget = data.get('budget', {})
+    tech = data.get('tech_stack', {})
+    return COMPANY_CONTEXT_TEMPLATE.format(
+        name=company.get('name', 'Belirtilmemiş'),
+        sector=company.get('sector', 'Belirtilmemiş'),
+        description=company.get('description', ''),
+        team_size=company.get('team_size', '?'),
+        location=company.get('location', 'Belirtilmemiş'),
+        monthly_budget=budget.get('monthly_budget_try', '?'),
+        currency=budget.get('currency', 'TRY'),
+        budget_notes=budget.get('notes', ''),
+        languages=', '.join(tech.get('primary_languages', [])),
+        frameworks=', '.join(tech.get('frameworks', [])),
+        infrastructure=', '.join(tech.get('infrastructure', [])),
+        priorities=', '.join(data.get('priorities', [])),
+    )
+
+
+class PromptVersion:
+    """
+    One immutable snapshot of personas.json and readme.json with the prompts
+    built from them. `version` is a hash of both files' contents. The static
+    parts (persona instructions, company context) are rendered once, so equal
+    content always yields the same prefix text and keeps provider-side caches
+    warm across reloads.
+    """
+
+    def __init__(self, personas, company_context, version):
+        self.personas = personas
+        self.company_context = company_context
+        self.version = version
+
+    def system_instruction(self, persona_key):
+        return self.personas.get(persona_key, {}).get('system_instruction', '')
+
+    def round_configs(self, topic):
+        return [{**config, "prompt": config["prompt"].format(topic=topic)} for config in ROUNDS]
+
+    def turn_prompt(self, topic, round_num, round_prompt, past_decisions=""):
+        return TURN_TEMPLATE.format(past_decisions=past_decisions, topic=topic, round_num=round_num, round_prompt=round_prompt)
+
+    def summary_prompt(self, topic, past_decisions=""):
+        return SUMMARY_TEMPLATE.format(past_decisions=past_decisions, topic=topic)
+
+    def intro_prompt(self):
+        return INTRO_PROMPT
+
+
+class PromptRegistry:
+    """
+    Holds the current PromptVersion and swaps in a new one when personas.json
+    or readme.json changes on disk, without a restart. Meetings keep a reference
+    to the version they started with, so a reload only affects new meetings.
+    A file that fails to parse is logged and the current version stays.
+
+    Only prompt text is reloaded: bot tokens and per-persona LLM backends are
+    read once at startup.
+    """
+
+    def __init__(self, personas_file=None, readme_file=None, reload_interval=5.0):
+        self.personas_file = personas_file or os.path.join(SRC_DIR, 'personas.json')
+        self.readme_file = readme_file or os.path.join(SRC_DIR, 'readme.json')
+        self.reload_interval = reload_interval
+        self._fingerprints = None
+        self.current = self._load()
+
+    @classmethod
+    def from_env(cls):
+        return cls(reload_interval=float(os.getenv("PROMPTS_RELOAD_INTERVAL", "5")))
+
+    def _fingerprint(self):
+        fingerprints = []
+        for path in (self.personas_file, self.readme_file):
+            try:
+                stat = os.stat(path)
+                fingerprints.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                fingerprints.append(None)
+        return fingerprints
+
+    def _load(self):
+        self._fingerprints = self._fingerprint()
+        with open(self.personas_file, 'rb') as f:
+            personas_raw = f.read()
+        personas = json.loads(personas_raw)
+        if not isinstance(personas, dict) or not all(isinstance(p, dict) for p in personas.values()):
+            raise ValueError(f"{self.personas_file} must map persona keys to objects")
+
+        try:
+            with open(self.readme_file, 'rb') as f:
+                readme_raw = f.read()
+            company_context = render_company_context(json.loads(readme_raw))
+        except Exception as e:
+            logger.warning(f"Could not load readme.json: {e}")
+            readme_raw, company_context = b"", ""
+
+        version = hashlib.sha256(personas_raw + b"\x00" + readme_raw).hexdigest()[:12]
+        return PromptVersion(personas, company_context, version)
+
+    def check(self):
+        """Reloads if a file changed since the last load. Returns True if a new version is now current."""
+        if self._fingerprint() == self._fingerprints:
+            return False
+        try:
+            version = self._load()
+        except Exception as e:
+            logger.error(f"Prompt files changed but could not be loaded, keeping version {self.current.version}: {e}")
+            return False
+        if version.version == self.current.version:
+            return False
+        previous, self.current = self.current, version  # new meetings pick it up from here on
+        logger.info(f"Prompts reloaded: version {previous.version} -> {version.version}")
+        return True
+
+    async def watch(self):
+        """Polls both files every reload_interval seconds."""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            self.check()
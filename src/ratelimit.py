@@ -0,0 +1,48 @@
+import time
+
+
+class TokenBucket:
+    """
+    Classic token bucket. `capacity` tokens are available in a burst and the
+    bucket refills at `rate` tokens per second. A capacity of 0 disables the limit.
+    """
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    @property
+    def enabled(self):
+        return self.capacity > 0 and self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay_for(self, amount=1):
+        """Seconds until `amount` tokens are available (0 if they are available now)."""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        # Never ask for more than a full bucket, otherwise a huge request would wait forever
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount=1):
+        """Takes `amount` tokens. May drive the bucket negative to account for overshoot."""
+        if not self.enabled:
+            return
+        self._refill()
+        self.tokens -= amount
+
+    def refund(self, amount):
+        """Gives back tokens that were reserved but not used."""
+        if not self.enabled:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
@@ -0,0 +1,434 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import or_, select, text
+
+from src.ai_engine import estimate_tokens
+from src.db import AsyncSessionLocal, engine
+from src.models import Meeting, MeetingArchive, Message, MessageArchive
+
+logger = logging.getLogger(__name__)
+
+# Must match the expression indexes of migration 0007
+TS_CONFIG = "turkish"
+KEYWORD_HIT_LIMIT = 200
+SNIPPET_CHARS = 160
+RRF_K = 60  # reciprocal rank fusion constant
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _words(text_value):
+    return [word.lower() for word in _WORD.findall(text_value)]
+
+
+def snippet(content, query):
+    """The part of `content` around the first query word, at most SNIPPET_CHARS long."""
+    lowered = content.lower()
+    positions = [lowered.find(word) for word in _words(query)]
+    positions = [p for p in positions if p >= 0]
+    start = max(0, min(positions) - SNIPPET_CHARS // 3) if positions else 0
+    piece = " ".join(content[start:start + SNIPPET_CHARS].split())
+    return ("…" if start else "") + piece + ("…" if start + SNIPPET_CHARS < len(content) else "")
+
+
+class HashingEmbedder:
+    """
+    Dependency-free sparse embedding: hashed words plus 4-character n-grams,
+    so Turkish inflections of a word ('maliyet', 'maliyetleri') stay close.
+    """
+
+    def __init__(self, ngram=4):
+        self.ngram = ngram
+
+    def embed(self, text_value):
+        features = defaultdict(float)
+        for word in _words(text_value):
+            features["w:" + word] += 1.0
+            padded = f"^{word}$"
+            for i in range(max(1, len(padded) - self.ngram + 1)):
+                features["g:" + padded[i:i + self.ngram]] += 0.5
+        norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+        return {k: v / norm for k, v in features.items()}
+
+
+class SentenceTransformerEmbedder:
+    """Dense embeddings from a local sentence-transformers model (SEARCH_EMBEDDING_MODEL)."""
+
+    def __init__(self, model_name):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError("SEARCH_EMBEDDING_MODEL requires the 'sentence-transformers' package")
+        self.model = SentenceTransformer(model_name)
+
+    def embed(self, text_value):
+        vector = self.model.encode(text_value, normalize_embeddings=True)
+        return {i: float(v) for i, v in enumerate(vector)}
+
+
+class SemanticIndex:
+    """
+    In-process approximate nearest neighbour index over message embeddings.
+
+    Each message is reduced to a SimHash signature (random hyperplanes derived
+    from feature hashes), so the cosine similarity of two messages is estimated
+    from the Hamming distance of their signatures. Signatures are split into
+    bands; a query only scores messages of the same chat sharing at least one
+    band with it. Only signatures and short snippets are kept, up to
+    max_entries messages.
+    """
+
+    BITS = 128
+
+    def __init__(self, embedder, max_entries=200_000, bands=16):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.bands = bands  # more (narrower) bands: better recall, more candidates to score
+        self.entries = {}  # entry id -> (signature, chat_id, meeting_id, bot_name, snippet)
+        self.buckets = defaultdict(set)  # (chat_id, band, band value) -> entry ids
+        self._next_id = 0
+        self._band_bits = self.BITS // bands
+
+    def _signature(self, text_value):
+        totals = [0.0] * self.BITS
+        for feature, weight in self.embedder.embed(text_value).items():
+            h = int.from_bytes(hashlib.blake2b(str(feature).encode('utf-8'), digest_size=self.BITS // 8).digest(), 'big')
+            for bit in range(self.BITS):
+                totals[bit] += weight if h >> bit & 1 else -weight
+        return sum(1 << bit for bit, total in enumerate(totals) if total > 0)
+
+    def _bands(self, chat_id, signature):
+        mask = (1 << self._band_bits) - 1
+        return [(chat_id, band, signature >> (band * self._band_bits) & mask) for band in range(self.bands)]
+
+    def add(self, chat_id, meeting_id, bot_name, content, signature=None):
+        if signature is None:
+            signature = self._signature(content)
+        entry_id = self._next_id
+        self._next_id += 1
+        self.entries[entry_id] = (signature, chat_id, meeting_id, bot_name, content[:SNIPPET_CHARS * 2])
+        for band in self._bands(chat_id, signature):
+            self.buckets[band].add(entry_id)
+        if len(self.entries) > self.max_entries:
+            self._evict(next(iter(self.entries)))
+
+    def _evict(self, entry_id):
+        signature, chat_id = self.entries.pop(entry_id)[:2]
+        for band in self._bands(chat_id, signature):
+            self.buckets[band].discard(entry_id)
+            if not self.buckets[band]:
+                del self.buckets[band]
+
+    def search(self, query, chat_id, limit=KEYWORD_HIT_LIMIT):
+        """Returns (meeting_id, bot_name, content, similarity) tuples of `chat_id`'s messages, most similar first."""
+        signature = self._signature(query)
+        candidates = set()
+        for band in self._bands(chat_id, signature):
+            candidates |= self.buckets.get(band, set())
+        scored = []
+        for entry_id in candidates:
+            entry_signature, _, meeting_id, bot_name, content = self.entries[entry_id]
+            distance = bin(signature ^ entry_signature).count("1")
+            scored.append((meeting_id, bot_name, content, math.cos(math.pi * distance / self.BITS)))
+        scored.sort(key=lambda hit: hit[3], reverse=True)
+        return scored[:limit]
+
+    async def bootstrap(self, batch_size=1000):
+        """
+        Indexes the newest max_entries stored messages (archive included; archived
+        rows keep their ids, so ids order both tables). Signatures are computed
+        in a worker thread so the bot keeps serving meanwhile. Meetings archived
+        before migration 0008 have no chat id and are not searchable.
+        """
+        async with AsyncSessionLocal() as session:
+            ids = select(Message.id).union_all(select(MessageArchive.id)).subquery()
+            first_id = (await session.execute(
+                select(ids.c.id).order_by(ids.c.id.desc()).offset(self.max_entries).limit(1)
+            )).scalar() or 0
+
+        indexed = 0
+        for meeting_model, model in ((MeetingArchive, MessageArchive), (Meeting, Message)):
+            last_id = first_id
+            while True:
+                async with AsyncSessionLocal() as session:
+                    rows = (await session.execute(
+                        select(model.id, model.meeting_id, model.bot_name, model.content, model.round_number,
+                               meeting_model.chat_id)
+                        .join(meeting_model, meeting_model.id == model.meeting_id)
+                        .where(model.id > last_id)
+                        .order_by(model.id)
+                        .limit(batch_size)
+                    )).all()
+                if not rows:
+                    break
+                rows_to_index = [
+                    row for row in rows
+                    if row.chat_id is not None and MeetingSearch.indexable(row.bot_name, row.round_number)
+                ]
+                signatures = await asyncio.to_thread(lambda: [self._signature(row.content) for row in rows_to_index])
+                for row, signature in zip(rows_to_index, signatures):
+                    self.add(row.chat_id, row.meeting_id, row.bot_name, row.content, signature)
+                indexed += len(rows_to_index)
+                last_id = rows[-1].id
+        logger.info(f"Semantic search index built with {indexed} message(s)")
+
+
+class MeetingSearch:
+    """
+    Backs /ara: keyword search (PostgreSQL full-text index, LIKE scans on SQLite)
+    over a chat's live and archived transcripts, optionally fused with the
+    semantic index, ranked and grouped by meeting.
+    """
+
+    def __init__(self, semantic=None):
+        self.semantic = semantic
+
+    @classmethod
+    def from_env(cls):
+        if os.getenv("SEARCH_SEMANTIC", "0") != "1":
+            return cls()
+        model_name = os.getenv("SEARCH_EMBEDDING_MODEL")
+        embedder = SentenceTransformerEmbedder(model_name) if model_name else HashingEmbedder()
+        return cls(SemanticIndex(embedder, max_entries=int(os.getenv("SEARCH_SEMANTIC_MAX_ENTRIES", "200000"))))
+
+    @staticmethod
+    def indexable(bot_name, round_number):
+        """Board opinions and summaries; not the Chairman's announcements."""
+        return bot_name != "Chairman" or round_number == 99
+
+    async def index_message(self, chat_id, meeting_id, bot_name, content, round_number):
+        """Called for every logged message; the full-text index is maintained by PostgreSQL itself."""
+        if self.semantic is not None and content and self.indexable(bot_name, round_number):
+            signature = await asyncio.to_thread(self.semantic._signature, content)
+            self.semantic.add(chat_id, meeting_id, bot_name, content, signature)
+
+    async def _keyword_hits(self, query, chat_id):
+        """(meeting_id, bot_name, content, score) tuples of `chat_id`'s meetings, best first."""
+        if engine.dialect.name == "postgresql":
+            branches = " UNION ALL ".join(
+                f"""SELECT msg.meeting_id, msg.bot_name, msg.content,
+                           ts_rank(to_tsvector('{TS_CONFIG}', msg.content), websearch_to_tsquery('{TS_CONFIG}', :query)) AS score
+                    FROM {messages} msg JOIN {meetings} m ON m.id = msg.meeting_id
+                    WHERE m.chat_id = :chat_id
+                      AND to_tsvector('{TS_CONFIG}', msg.content) @@ websearch_to_tsquery('{TS_CONFIG}', :query)"""
+                for messages, meetings in (("messages", "meetings"), ("messages_archive", "meetings_archive"))
+            )
+            stmt = text(f"{branches} ORDER BY score DESC LIMIT {KEYWORD_HIT_LIMIT}")
+            async with AsyncSessionLocal() as session:
+                return [tuple(row) for row in (await session.execute(stmt, {"query": query, "chat_id": chat_id})).all()]
+
+        words = _words(query)
+        if not words:
+            return []
+        hits = []
+        async with AsyncSessionLocal() as session:
+            for meeting_model, model in ((Meeting, Message), (MeetingArchive, MessageArchive)):
+                stmt = (
+                    select(model.meeting_id, model.bot_name, model.content)
+                    .join(meeting_model, meeting_model.id == model.meeting_id)
+                    .where(meeting_model.chat_id == chat_id)
+                    .where(or_(*[model.content.ilike(f"%{word}%") for word in words]))
+                    .limit(KEYWORD_HIT_LIMIT)
+                )
+                for meeting_id, bot_name, content in (await session.execute(stmt)).all():
+                    lowered = content.lower()
+                    hits.append((meeting_id, bot_name, content, sum(lowered.count(word) for word in words) / len(words)))
+        hits.sort(key=lambda hit: hit[3], reverse=True)
+        return hits[:KEYWORD_HIT_LIMIT]
+
+    async def _meetings(self, meeting_ids):
+        found = {}
+        async with AsyncSessionLocal() as session:
+            for model in (Meeting, MeetingArchive):
+                missing = [meeting_id for meeting_id in meeting_ids if meeting_id not in found]
+                if not missing:
+                    break
+                rows = (await session.execute(
+                    select(model.id, model.topic, model.created_at).where(model.id.in_(missing))
+                )).all()
+                found.update({row.id: row for row in rows})
+        return found
+
+    async def search(self, query, chat_id, limit=5, hits_per_meeting=2):
+        """
+        Meetings of `chat_id` matching `query`, best first:
+        [{'meeting_id', 'topic', 'created_at', 'score', 'hits': [{'bot_name', 'snippet'}]}]
+        """
+        result_lists = [await self._keyword_hits(query, chat_id)]
+        if self.semantic is not None:
+            result_lists.append(self.semantic.search(query, chat_id))
+
+        # Reciprocal rank fusion of each list's meeting ranking
+        scores = defaultdict(float)
+        hits = defaultdict(list)
+        for result in result_lists:
+            seen = []
+            for meeting_id, bot_name, content, _ in result:
+                if meeting_id not in seen:
+                    seen.append(meeting_id)
+                if len(hits[meeting_id]) < hits_per_meeting and all(h['content'] != content for h in hits[meeting_id]):
+                    hits[meeting_id].append({'bot_name': bot_name, 'content': content})
+            for rank, meeting_id in enumerate(seen):
+                scores[meeting_id] += 1 / (RRF_K + rank + 1)
+
+        best = sorted(scores, key=scores.get, reverse=True)[:limit]
+        meetings = await self._meetings(best)
+        return [
+            {
+                'meeting_id': meeting_id,
+                'topic': meetings[meeting_id].topic,
+                'created_at': meetings[meeting_id].created_at,
+                'score': scores[meeting_id],
+                'hits': [{'bot_name': h['bot_name'], 'snippet': snippet(h['content'], query)} for h in hits[meeting_id]],
+            }
+            for meeting_id in best if meeting_id in meetings
+        ]
+
+
+class DecisionIndex:
+    """
+    Chairman summaries of completed meetings, indexed by their topics, so a new
+    meeting can be given the board's earlier decisions on similar topics.
+    (Topics are matched against topics: a short topic is a poor query for a
+    long summary's signature.) Only decisions taken in the same chat are
+    retrieved; batch meetings never share a chat id, not even across runs, so
+    they neither quote nor are quoted by other meetings.
+
+    The index is loaded on first use (archive included) and then kept current:
+    add() indexes summaries written by this process, and every refresh_interval
+    seconds the summaries other workers wrote since are picked up by id.
+    """
+
+    def __init__(self, embedder, token_budget=1000, max_decisions=3, min_similarity=0.5, refresh_interval=300):
+        # Topics are short and few compared to messages; 4-bit bands still find topics at ~0.5 similarity
+        self.semantic = SemanticIndex(embedder, max_entries=1_000_000, bands=32)
+        self.token_budget = token_budget
+        self.max_decisions = max_decisions
+        self.min_similarity = min_similarity
+        self.refresh_interval = refresh_interval
+        self.decisions = {}  # meeting_id -> (chat_id, topic, summary, created_at)
+        self._last_message_id = 0
+        self._refreshed_at = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """None when DECISION_CONTEXT_TOKEN_BUDGET is 0 (retrieval off)."""
+        token_budget = int(os.getenv("DECISION_CONTEXT_TOKEN_BUDGET", "1000"))
+        if token_budget <= 0:
+            return None
+        model_name = os.getenv("SEARCH_EMBEDDING_MODEL")
+        return cls(
+            SentenceTransformerEmbedder(model_name) if model_name else HashingEmbedder(),
+            token_budget=token_budget,
+            max_decisions=int(os.getenv("DECISION_CONTEXT_MAX_MEETINGS", "3")),
+            min_similarity=float(os.getenv("DECISION_CONTEXT_MIN_SIMILARITY", "0.5")),
+            refresh_interval=float(os.getenv("DECISION_CONTEXT_REFRESH_SECONDS", "300")),
+        )
+
+    def add(self, chat_id, meeting_id, topic, summary, created_at=None, signature=None):
+        if meeting_id in self.decisions or not summary:
+            return
+        if signature is None:
+            signature = self.semantic._signature(topic)
+        self.decisions[meeting_id] = (chat_id, topic, summary, created_at)
+        self.semantic.add(chat_id, meeting_id, "Chairman", "", signature)
+
+    async def add_summary(self, chat_id, meeting_id, topic, summary):
+        """Called when this process completes a meeting."""
+        signature = await asyncio.to_thread(self.semantic._signature, topic)
+        self.add(chat_id, meeting_id, topic, summary, created_at=datetime.now(timezone.utc), signature=signature)
+
+    async def _load(self, archive, batch_size=1000):
+        """Indexes completed meetings' summaries written after the last one seen."""
+        pairs = [(Meeting, Message)] + ([(MeetingArchive, MessageArchive)] if archive else [])
+        last_seen = self._last_message_id
+        for meeting_model, message_model in pairs:
+            last_id = last_seen
+            while True:
+                async with AsyncSessionLocal() as session:
+                    rows = (await session.execute(
+                        select(message_model.id, message_model.meeting_id, message_model.content,
+                               meeting_model.chat_id, meeting_model.topic, meeting_model.created_at)
+                        .join(meeting_model, meeting_model.id == message_model.meeting_id)
+                        .where(
+                            message_model.id > last_id,
+                            message_model.round_number == 99,
+                            message_model.bot_name == "Chairman",
+                            meeting_model.status == "completed",
+                            meeting_model.is_processed.is_(True),
+                        )
+                        .order_by(message_model.id)
+                        .limit(batch_size)
+                    )).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                # Meetings archived before migration 0008 have no chat to be retrieved for
+                new_rows = [row for row in rows if row.meeting_id not in self.decisions and row.chat_id is not None]
+                signatures = await asyncio.to_thread(
+                    lambda: [self.semantic._signature(row.topic) for row in new_rows]
+                )
+                for row, signature in zip(new_rows, signatures):
+                    self.add(row.chat_id, row.meeting_id, row.topic, row.content, row.created_at, signature)
+                self._last_message_id = max(self._last_message_id, last_id)
+
+    async def refresh(self):
+        """Builds the index on first call, afterwards catches up at most every refresh_interval seconds."""
+        async with self._lock:
+            now = time.monotonic()
+            if self._refreshed_at is None:
+                await self._load(archive=True)
+                logger.info(f"Decision index built with {len(self.decisions)} meeting summary(ies)")
+            elif now - self._refreshed_at >= self.refresh_interval:
+                await self._load(archive=False)  # archived summaries were already live, and seen, before
+            else:
+                return
+            self._refreshed_at = now
+
+    async def retrieve(self, chat_id, topic, exclude_meeting_id=None):
+        """
+        Past decisions of `chat_id` most similar to `topic`:
+        [{'meeting_id', 'topic', 'summary', 'created_at', 'similarity'}]
+        """
+        await self.refresh()
+        found = []
+        for meeting_id, _, _, similarity in self.semantic.search(topic, chat_id, limit=self.max_decisions + 1):
+            if similarity < self.min_similarity or meeting_id == exclude_meeting_id:
+                continue
+            _, past_topic, summary, created_at = self.decisions[meeting_id]
+            found.append({'meeting_id': meeting_id, 'topic': past_topic, 'summary': summary,
+                          'created_at': created_at, 'similarity': similarity})
+        return found[:self.max_decisions]
+
+    def context_block(self, decisions):
+        """Prompt section quoting the decisions, most similar first, cut to token_budget."""
+        if not decisions:
+            return ""
+        header = (
+            "--- KURULUN GEÇMİŞ KARARLARI (benzer konular) ---\n"
+            "Bu kararları dikkate al; daha önce karar verilmiş noktaları yeniden tartışmak yerine "
+            "neyin değiştiğine ve yeni bilgilere odaklan.\n"
+        )
+        remaining = self.token_budget - estimate_tokens(header)
+        parts = [header]
+        for decision in decisions:
+            date = decision['created_at'].strftime('%d.%m.%Y') if decision['created_at'] else "?"
+            title = f"\n[{date}] Konu: {decision['topic']}\n"
+            room = remaining - estimate_tokens(title)
+            if room < 50:
+                break
+            summary = " ".join(decision['summary'].split())
+            if estimate_tokens(summary) > room:
+                summary = summary[:room * 4 - 1] + "…"
+            parts.append(title + summary + "\n")
+            remaining = room - estimate_tokens(summary)
+        return "".join(parts) if len(parts) > 1 else ""
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TaskSupervisor:
+    """
+    Owns every background task the orchestrator starts, grouped by chat.
+
+    Tasks are registered with a chat id (None for process-wide tasks) and a
+    name ('meeting', 'summary', 'generate:CTO', ...), so /sus can cancel a
+    chat's in-flight LLM and Telegram calls at once, /durum can list them, and
+    failures are logged instead of disappearing with an unreferenced task.
+    """
+
+    def __init__(self):
+        self._tasks = {}  # task -> (chat_id, name, started_at)
+        self._locks = {}  # (chat_id, name) -> asyncio.Lock
+
+    def spawn(self, chat_id, coro, name):
+        task = asyncio.create_task(coro, name=f"{name}:{chat_id}")
+        self._tasks[task] = (chat_id, name, time.monotonic())
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task):
+        chat_id, name, _ = self._tasks.pop(task, (None, None, None))
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Task '{name}' for chat {chat_id} failed", exc_info=task.exception())
+
+    def tasks(self, chat_id=None, name=None):
+        """Running tasks, optionally filtered by chat and name."""
+        return [
+            task for task, (task_chat, task_name, _) in self._tasks.items()
+            if (chat_id is None or task_chat == chat_id) and (name is None or task_name == name)
+        ]
+
+    def cancel(self, chat_id, name=None):
+        """Cancels a chat's tasks (all, or those with `name`), except the calling task. Returns the count."""
+        current = asyncio.current_task()
+        cancelled = 0
+        for task in self.tasks(chat_id, name):
+            if task is not current and not task.done():
+                task.cancel()
+                cancelled += 1
+        return cancelled
+
+    def lock(self, chat_id, name):
+        """Per-chat lock for work that must not overlap (e.g. the summary)."""
+        return self._locks.setdefault((chat_id, name), asyncio.Lock())
+
+    def status(self, chat_id=None):
+        now = time.monotonic()
+        return [
+            {'chat_id': task_chat, 'name': task_name, 'age': now - started_at}
+            for task, (task_chat, task_name, started_at) in self._tasks.items()
+            if chat_id is None or task_chat == chat_id
+        ]
+
+    async def shutdown(self):
+        """Cancels every task and waits for them to unwind."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
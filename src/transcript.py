@@ -0,0 +1,57 @@
+from sqlalchemy import select
+
+from src.db import AsyncSessionLocal
+from src.models import Message
+
+
+class MeetingTranscript:
+    """
+    In-memory transcript of a live meeting.
+    Appended to by Orchestrator.log_message, so turns can read history and the
+    reply target without going back to the database.
+    """
+
+    def __init__(self, meeting_id, entries=None):
+        self.meeting_id = meeting_id
+        self.entries = list(entries or [])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def append(self, bot_name, content, round_number, telegram_message_id=None):
+        self.entries.append({
+            "bot_name": bot_name,
+            "content": content,
+            "round_number": round_number,
+            "telegram_message_id": telegram_message_id,
+        })
+
+    def history(self):
+        """History in the format GeminiClient expects."""
+        return [
+            {
+                "bot_name": entry["bot_name"],
+                "content": entry["content"],
+                "round_number": entry["round_number"],
+                "is_user": False  # All logs are treated as 'context'
+            }
+            for entry in self.entries
+        ]
+
+    @property
+    def last_telegram_message_id(self):
+        """Telegram id of the latest message, used as the reply target of the next turn."""
+        if not self.entries:
+            return None
+        return self.entries[-1]["telegram_message_id"]
+
+    @classmethod
+    async def load(cls, meeting_id):
+        """Rebuilds the transcript from the database (e.g. when a meeting is resumed after a restart)."""
+        async with AsyncSessionLocal() as session:
+            stmt = select(Message).where(Message.meeting_id == meeting_id).order_by(Message.id.asc())
+            result = await session.execute(stmt)
+            transcript = cls(meeting_id)
+            for m in result.scalars().all():
+                transcript.append(m.bot_name, m.content, m.round_number, m.telegram_message_id)
+            return transcript
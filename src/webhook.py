@@ -0,0 +1,102 @@
+import hashlib
+import hmac
+import logging
+import os
+
+from aiohttp import web
+from telegram import Update
+
+from src.metrics import handle_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def route_id(token):
+    """Path segment of a bot's webhook: a hash of its token, so URLs and access logs never carry the token."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:32]
+
+
+class WebhookServer:
+    """
+    Single HTTP endpoint receiving Telegram updates for every listening bot.
+    Each bot's webhook points at `<public_url><path>/<route id>`, the route id
+    being a hash of the bot's token, and updates are routed by it to the
+    matching Application's update queue.
+    """
+
+    def __init__(self, applications, public_url=None, host="0.0.0.0", port=8080, path="/telegram", secret=None):
+        self.applications = applications  # token -> Application
+        self.routes = {route_id(token): application for token, application in applications.items()}
+        self.public_url = public_url.rstrip('/') if public_url else None
+        self.host = host
+        self.port = port
+        self.path = "/" + path.strip('/')
+        self.secret = secret
+        self.received = 0
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_post(f"{self.path}/{{route}}", self.handle_update)
+        self.app.router.add_get("/healthz", self.handle_health)
+        self.app.router.add_get("/metrics", handle_metrics)
+
+    @classmethod
+    def from_env(cls, applications):
+        return cls(
+            applications,
+            public_url=os.getenv("WEBHOOK_URL"),
+            host=os.getenv("WEBHOOK_LISTEN_HOST", "0.0.0.0"),
+            port=int(os.getenv("WEBHOOK_PORT", "8080")),
+            path=os.getenv("WEBHOOK_PATH", "/telegram"),
+            secret=os.getenv("WEBHOOK_SECRET") or None,
+        )
+
+    async def handle_update(self, request):
+        # Secret first, so the response doesn't reveal which routes exist
+        if self.secret:
+            received_secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not hmac.compare_digest(received_secret, self.secret):
+                return web.Response(status=403)
+
+        application = self.routes.get(request.match_info['route'])
+        if application is None:
+            return web.Response(status=404)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        update = Update.de_json(data, application.bot)
+        await application.update_queue.put(update)
+        self.received += 1
+        return web.Response(status=200)
+
+    async def handle_health(self, request):
+        return web.json_response({"status": "ok", "bots": len(self.applications), "received": self.received})
+
+    async def start(self):
+        # No access log: request lines would put every update's path in the logs
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+
+    async def register_webhooks(self, allowed_updates=None):
+        """Points every listening bot's webhook at this server (requires WEBHOOK_URL)."""
+        if not self.public_url:
+            logger.warning("WEBHOOK_URL is not set, webhooks must be registered manually")
+            return
+        for token, application in self.applications.items():
+            await application.bot.set_webhook(
+                url=f"{self.public_url}{self.path}/{route_id(token)}",
+                secret_token=self.secret,
+                allowed_updates=allowed_updates,
+            )
+        logger.info(f"Registered webhooks for {len(self.applications)} bot(s)")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None